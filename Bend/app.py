@@ -1,31 +1,42 @@
+import math
 import os
+import time
+import uuid
 import logging
-import psycopg2
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from config import Config
-from routes.card_routes import init_routes
+from routes.card_routes import init_routes, not_ready_response
+from services import admission, replica_router
+from services.compression import ResponseCompressor
+from services.encryption_service import load_key_material
+from services.logging_service import configure_logging, request_id_var
+from services.metrics import metrics
+from services.startup import Startup
 import secrets
 
 def create_app():
     """Crează și configurează aplicația Flask"""
+    boot_started = time.perf_counter()
     app = Flask(__name__)
     
     # Configure CORS
     CORS(app, 
          resources={r"/api/*": {"origins": ["http://localhost:5173"]}},
          supports_credentials=True,
-         allow_headers=["Content-Type", "Authorization"],
-         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+         allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+         expose_headers=["X-Next-Cursor", "ETag", "X-Request-ID"],
+         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
     
     # Configure CSP headers
     @app.after_request
     def add_security_headers(response):
         # Add CORS headers to every response
         response.headers['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, If-None-Match'
         response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, ETag, X-Request-ID'
         
         # Add CSP headers
         csp_directives = [
@@ -49,38 +60,155 @@ def create_app():
 
     # Load configuration
     app.config.from_object(Config)
+    metrics.configure(app.config)
+    configure_logging(app.config)
+    startup = Startup(app.config)
+    app.extensions['startup'] = startup
     
-    # Configure logging
-    logging.basicConfig(level=logging.INFO)
+    access_logger = logging.getLogger('bcard.access')
+    
+    # Latența pe rută (până la trimiterea headerelor; fluxurile NDJSON continuă după)
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        # ID-ul cererii (preluat de la proxy dacă există), inclus în fiecare eveniment de log
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_id_token = request_id_var.set(g.request_id)
+        g.stages_token = metrics.begin_request()
+        g.rsa_budget_token = admission.begin_request(app.config.get('RSA_REQUEST_BUDGET'))
+        # Read-your-writes: clientul care a scris recent citește de pe primar
+        g.read_state_token = replica_router.begin_request(
+            request.cookies.get(replica_router.LAST_WRITE_COOKIE),
+            app.config.get('DB_READ_YOUR_WRITES_WINDOW', 5.0)
+        )
+    
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            # Șablonul rutei, nu calea, ca numărul de serii să rămână limitat
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            labels = (('method', request.method), ('route', route), ('status', str(response.status_code)))
+            metrics.observe('bcard_http_request_duration_seconds', elapsed, labels)
+            if response.status_code >= 500:
+                metrics.inc('bcard_http_errors_total', 1, labels)
+            stages = metrics.end_request(g.pop('stages_token'))
+            if app.config.get('LOG_REQUESTS'):
+                access_logger.info('%s %s %s', request.method, route, response.status_code, extra={
+                    'event': 'request',
+                    'method': request.method,
+                    'route': route,
+                    'status': response.status_code,
+                    'duration_ms': round(elapsed * 1000, 3),
+                    'stages_ms': {stage: round(value * 1000, 3) for stage, value in stages.items()}
+                })
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+    
+    # Momentul ultimei scrieri, trimis înapoi de client la cererile următoare (doar cu replici)
+    @app.after_request
+    def remember_last_write(response):
+        if app.config.get('DB_REPLICA_HOSTS') and replica_router.wrote():
+            response.set_cookie(replica_router.LAST_WRITE_COOKIE, f"{time.time():.3f}",
+                                max_age=math.ceil(app.config.get('DB_READ_YOUR_WRITES_WINDOW', 5.0)),
+                                httponly=True, samesite='Lax')
+        return response
+    
+    # Compresia rulează prima dintre hook-urile after_request (ordinea este inversă înregistrării)
+    compressor = ResponseCompressor(app.config)
+    
+    @app.after_request
+    def compress_response(response):
+        return compressor.process(response, request.accept_encodings)
+    
+    @app.teardown_request
+    def clear_request_id(exc):
+        budget_token = g.pop('rsa_budget_token', None)
+        if budget_token is not None:
+            admission.end_request(budget_token)
+        read_state_token = g.pop('read_state_token', None)
+        if read_state_token is not None:
+            replica_router.end_request(read_state_token)
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            try:
+                request_id_var.reset(token)
+            except ValueError:
+                request_id_var.set(None)
     
     # Rută de test pentru baza de date
     @app.route('/api/db-test', methods=['GET'])
     def test_db():
+        if not startup.ensure():
+            return not_ready_response(startup)
         try:
-            conn = psycopg2.connect(
-                host=Config.DB_HOST,
-                port=Config.DB_PORT,
-                dbname=Config.DB_NAME,
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD
-            )
-            conn.close()
-            return jsonify({"status": "Database connection successful"}), 200
+            db_service = app.extensions['db_service']
+            db_service.test_connection()
+            return jsonify({
+                "status": "Database connection successful",
+                "pool": db_service.pool_stats()
+            }), 200
         except Exception as e:
-            app.logger.error(f"Database connection error: {str(e)}")
+            app.logger.error("Database connection error: %s", e)
             return jsonify({"error": "Database connection failed", "details": str(e)}), 500
     
+    # Statistici pentru pool-ul de conexiuni
+    @app.route('/api/db-pool', methods=['GET'])
+    def db_pool_stats():
+        if not startup.ensure():
+            return not_ready_response(startup)
+        return jsonify(app.extensions['db_service'].pool_stats()), 200
+    
+    # Metrici în format Prometheus
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics_endpoint():
+        gauges = [('bcard_ready', 'Serviciile sunt initializate (1) sau nu (0)', int(startup.ready))]
+        # Fără a declanșa inițializarea: scrape-ul nu trebuie să blocheze pornirea lazy
+        if startup.ready:
+            pool = app.extensions['db_service'].pool_stats()
+            cache = app.extensions['response_cache'].stats()
+            rsa = app.extensions['admission'].stats()
+            gauges += [
+                ('bcard_db_pool_size', 'Conexiuni deschise in pool', pool.get('size', 0)),
+                ('bcard_db_pool_in_use', 'Conexiuni folosite', pool.get('in_use', 0)),
+                ('bcard_db_pool_waiting', 'Cereri care asteapta o conexiune', pool.get('waiting', 0)),
+                ('bcard_db_pool_timeouts', 'Timeout-uri la obtinerea unei conexiuni', pool.get('timeouts', 0)),
+                ('bcard_response_cache_bytes', 'Dimensiunea cache-ului de raspunsuri', cache['bytes']),
+                ('bcard_response_cache_hits', 'Raspunsuri servite din cache', cache['hits']),
+                ('bcard_response_cache_misses', 'Cautari fara rezultat in cache', cache['misses']),
+                ('bcard_admission_in_flight', 'Apeluri RSA in executie', rsa['in_flight']),
+                ('bcard_admission_waiting', 'Apeluri RSA care asteapta un loc', rsa['waiting']),
+                ('bcard_admission_max_concurrent', 'Limita de apeluri RSA simultane', rsa['max_concurrent']),
+            ]
+        return app.response_class(metrics.render(gauges), status=200,
+                                  mimetype='text/plain; version=0.0.4')
+    
+    # Statistici pentru cache-ul de răspunsuri
+    @app.route('/api/cache-stats', methods=['GET'])
+    def cache_stats():
+        if not startup.ensure():
+            return not_ready_response(startup)
+        return jsonify(app.extensions['response_cache'].stats()), 200
+    
+    # Cheile RSA sunt generate (dacă lipsesc) și parsate o singură dată, înainte de fork;
+    # în modul background și acest pas rulează în firul de inițializare
+    if startup.mode != 'background':
+        with startup.phase('keys'):
+            load_key_material(app.config)
+    
     # Initialize routes
     try:
-        init_routes(app)
+        with startup.phase('routes'):
+            init_routes(app)
     except Exception as e:
-        app.logger.error(f"Error initializing routes: {str(e)}")
+        app.logger.error("Error initializing routes: %s", e)
         raise
     
     # Error handler for 400 errors
     @app.errorhandler(400)
     def handle_400_error(error):
-        app.logger.error(f"Bad request error: {str(error)}")
+        app.logger.error("Bad request error: %s", error)
         return jsonify({
             "error": "Bad Request",
             "message": str(error)
@@ -89,17 +217,26 @@ def create_app():
     # Error handler for 500 errors
     @app.errorhandler(500)
     def handle_500_error(error):
-        app.logger.error(f"Internal server error: {str(error)}")
+        app.logger.error("Internal server error: %s", error)
         return jsonify({
             "error": "Internal server error",
             "message": str(error)
         }), 500
     
-    # Rută de test/sănătate
+    # Rută de test/sănătate (procesul răspunde; nu verifică serviciile)
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return jsonify({"status": "ok"}), 200
     
+    # Disponibilitate: serviciile sunt inițializate (în modul lazy, le inițializează)
+    @app.route('/api/ready', methods=['GET'])
+    def readiness_check():
+        if not startup.ensure():
+            return not_ready_response(startup)
+        return jsonify(startup.status()), 200
+    
+    app.logger.info("create_app finished in %.1f ms (startup mode %s)",
+                    (time.perf_counter() - boot_started) * 1000, startup.mode)
     return app
 
 if __name__ == '__main__':
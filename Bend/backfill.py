@@ -0,0 +1,29 @@
+import argparse
+import json
+import logging
+from config import Config
+from services.backfill_service import DerivedFieldsBackfillService
+from services.encryption_service import EncryptionService
+from services.response_cache import ResponseCache
+from services.storage import create_storage
+
+def main():
+    """Completează last4/brand și indexul orb pentru cardurile existente (după migrările 006/007)"""
+    parser = argparse.ArgumentParser(description="Completare last4/brand/card_number_index pentru cardurile existente")
+    parser.add_argument('--batch-size', type=int, help="Rânduri per lot")
+    parser.add_argument('--max-rows', type=int, help="Se oprește după acest număr de rânduri")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    if args.batch_size:
+        config['BACKFILL_BATCH_SIZE'] = args.batch_size
+    
+    # Cu RESPONSE_CACHE_REDIS_URL invalidarea ajunge la workerii aplicației; altfel
+    # răspunsurile din cache expiră după RESPONSE_CACHE_TTL
+    service = DerivedFieldsBackfillService(create_storage(config), EncryptionService(config), config,
+                                           ResponseCache(config))
+    print(json.dumps(service.run(max_rows=args.max_rows), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import sys
+from benchmarks import suite
+
+def print_results(document):
+    print(f"{'benchmark':<52} {'p50 (us)':>12} {'p95 (us)':>12} {'ops/s':>10}")
+    for name, result in sorted(document['results'].items()):
+        print(f"{name:<52} {result['p50_us']:>12.1f} {result['p95_us']:>12.1f} {result['ops_per_sec']:>10.1f}")
+
+def print_comparison(rows, metric):
+    print(f"{'benchmark':<52} {'baseline':>12} {'current':>12} {'change':>9}  {metric}")
+    for name, reference, current, change, status in rows:
+        reference = f"{reference:.1f}" if reference is not None else '-'
+        change = f"{change:+.1%}" if change is not None else '-'
+        marker = '  <-- REGRESSION' if status == 'regression' else ''
+        print(f"{name:<52} {reference:>12} {current:>12.1f} {change:>9}{marker}")
+
+def main():
+    """Rulează benchmark-urile sau compară două seturi de rezultate"""
+    parser = argparse.ArgumentParser(description="Benchmark-uri BCard")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help="Rulează benchmark-urile și salvează rezultatele ca JSON")
+    run_parser.add_argument('--groups', default='crypto,validation,serialization,formats,routes',
+                            help="Grupurile rulate (crypto, validation, serialization, formats, routes; "
+                                 "db rulează pe PostgreSQL din DB_*)")
+    run_parser.add_argument('--rows', default=','.join(str(count) for count in suite.ROW_COUNTS),
+                            help="Dimensiunile tabelei pentru benchmark-urile pe rute")
+    run_parser.add_argument('--encryption-type', choices=['sync', 'async', 'hybrid'], default='sync',
+                            help="Tipul de criptare al cardurilor folosite de rute")
+    run_parser.add_argument('--min-time', type=float, default=0.5,
+                            help="Durata minimă de măsurare per benchmark, în secunde")
+    run_parser.add_argument('--output', '-o', help="Fișierul JSON în care se salvează rezultatele")
+    
+    compare_parser = commands.add_parser('compare', help="Compară rezultatele cu o referință")
+    compare_parser.add_argument('baseline', help="Rezultatele de referință (JSON)")
+    compare_parser.add_argument('current', help="Rezultatele noi (JSON)")
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Creșterea relativă considerată regresie (implicit 0.10 = 10%%)")
+    compare_parser.add_argument('--metric', choices=['p50_us', 'p95_us', 'mean_us'], default='p50_us')
+    http_parser = commands.add_parser('http', help="Încărcare HTTP pe un server deja pornit")
+    http_parser.add_argument('url', help="Adresa serverului, ex. http://127.0.0.1:5000")
+    http_parser.add_argument('--path', default='/api/cards', help="Ruta cerută (GET)")
+    http_parser.add_argument('--concurrency', type=int, default=8, help="Clienți simultani")
+    http_parser.add_argument('--duration', type=float, default=10.0, help="Durata, în secunde")
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        document = suite.run(
+            groups=args.groups.split(','),
+            row_counts=[int(count) for count in args.rows.split(',')],
+            encryption_type=args.encryption_type,
+            min_time=args.min_time
+        )
+        print_results(document)
+        if args.output:
+            suite.save(document, args.output)
+            print(f"Results saved to {args.output}")
+        return 0
+    
+    if args.command == 'http':
+        print(json.dumps(suite.http_load(args.url, args.path, args.concurrency, args.duration), indent=2))
+        return 0
+    
+    rows = suite.compare(suite.load(args.baseline), suite.load(args.current), args.threshold, args.metric)
+    print_comparison(rows, args.metric)
+    regressions = [row[0] for row in rows if row[4] == 'regression']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {json.dumps(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
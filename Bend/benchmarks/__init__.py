@@ -0,0 +1 @@
+"""Benchmark-uri pentru criptare, validare și rutele API (vezi benchmark.py)"""
@@ -0,0 +1,508 @@
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+from config import Config
+
+ROW_COUNTS = (10, 1000, 100000)
+
+SAMPLE_CARD = {
+    'card_holder_name': 'Ion Popescu',
+    'card_number': '4111 1111 1111 1111',
+    'expiry_date': '12/2030',
+    'cvv': '123',
+    'card_type': 'credit',
+    'encryption_type': 'sync'
+}
+
+
+def measure(fn, setup=None, min_time=0.5, min_iterations=5, max_iterations=100000):
+    """Rulează fn până la min_time secunde; întoarce statisticile în microsecunde
+
+    setup (opțional) se apelează înainte de fiecare iterație, în afara măsurătorii,
+    iar rezultatul lui este transmis lui fn.
+    """
+    argument = setup() if setup else None
+    fn(argument) if setup else fn()  # încălzire
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations:
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        fn(argument) if setup else fn()
+        samples.append(time.perf_counter() - start)
+        if len(samples) >= min_iterations and time.perf_counter() - started >= min_time:
+            break
+
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    return {
+        'iterations': len(samples),
+        'mean_us': round(mean * 1e6, 2),
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 2),
+        'p95_us': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6, 2),
+        'ops_per_sec': round(1 / mean, 1) if mean else None
+    }
+
+
+def bench_crypto(config, min_time):
+    """Operațiile individuale din EncryptionService"""
+    from services.encryption_service import EncryptionService
+    service = EncryptionService(config)
+    plaintext = '4111111111111111'
+    sync_ciphertext = service.encrypt_sync(plaintext)
+    async_ciphertext = service.encrypt_async(plaintext)
+    return {
+        'crypto.encrypt_sync': measure(lambda: service.encrypt_sync(plaintext), min_time=min_time),
+        'crypto.decrypt_sync': measure(lambda: service.decrypt_sync(sync_ciphertext), min_time=min_time),
+        'crypto.encrypt_async': measure(lambda: service.encrypt_async(plaintext), min_time=min_time),
+        'crypto.decrypt_async': measure(lambda: service.decrypt_async(async_ciphertext), min_time=min_time),
+    }
+
+
+def bench_validation(min_time, batch_size=10000):
+    """CardValidator.validate_card_data pe un card valid și validate_batch pe un lot"""
+    from collections import deque
+    from utils.validators import CardValidator
+    batch = [SAMPLE_CARD] * batch_size
+    return {
+        'validation.validate_card_data': measure(
+            lambda: CardValidator.validate_card_data(SAMPLE_CARD), min_time=min_time
+        ),
+        f'validation.validate_batch[rows={batch_size}]': measure(
+            lambda: deque(CardValidator.validate_batch(batch), maxlen=0), min_time=min_time
+        )
+    }
+
+
+def _row_memory(build, count):
+    """Memoria (octeți per rând) ocupată de `count` rânduri construite de build()"""
+    import tracemalloc
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rows
+    return round(used / count, 1)
+
+
+def bench_serialization(min_time, count=1000):
+    """Rândurile unei pagini mari: dicționare (reprezentarea anterioară) față de Card
+
+    Pornește de la tupluri, ca cele întoarse de cursorul PostgreSQL. Varianta dict
+    reproduce drumul anterior: rând RealDictCursor, copie dict(card) și formatare câmp cu
+    câmp. Ambele variante sunt codificate cu același encoder (dumps), deci diferența
+    vine doar din reprezentarea rândurilor și din serializor.
+
+    serializer.* măsoară doar apelul serializorului pe carduri deja construite: lista
+    completă și vederea mascată (funcțiile scrise explicit) și o proiecție ?fields=
+    (serializorul generic).
+    """
+    from models.card import CARD_FIELDS, MASKED_FIELDS, Card, card_serializer, dumps
+    now = datetime.now()
+    tuples = [
+        (index, 'Ion Popescu', 'ciphertext', '12/2030', 'ciphertext', 'credit', 'sync',
+         None, 'v1', '1111', 'visa', now, now)
+        for index in range(count)
+    ]
+
+    def dict_rows():
+        return [dict(zip(CARD_FIELDS, row)) for row in tuples]
+
+    def dict_serialize():
+        rows = []
+        for card in dict_rows():
+            formatted = dict(card)
+            formatted.pop('data_key', None)
+            formatted.pop('key_id', None)
+            number = '4111111111111111'
+            formatted['card_number'] = ' '.join([number[i:i + 4] for i in range(0, len(number), 4)])
+            formatted['cvv'] = '123'
+            for field in ('created_at', 'updated_at'):
+                value = card.get(field)
+                formatted[field] = value if value is None or isinstance(value, str) else value.isoformat()
+            rows.append(formatted)
+        return dumps(rows)
+
+    def card_rows():
+        return [Card(*row) for row in tuples]
+
+    serialize = card_serializer()
+
+    def card_serialize():
+        return dumps([serialize(card, '4111111111111111', '123') for card in card_rows()])
+
+    results = {}
+    for name, build, encode in (('dict_rows', dict_rows, dict_serialize),
+                                ('card_rows', card_rows, card_serialize)):
+        result = measure(encode, min_time=min_time)
+        result['rows_per_sec'] = round(count * 1e6 / result['mean_us'], 1)
+        result['bytes_per_row'] = _row_memory(build, count)
+        result['json_bytes_per_row'] = round(len(encode()) / count, 1)
+        results[f"serialize.{name}[rows={count}]"] = result
+
+    cards = card_rows()
+    for name, serialize in (('list', card_serializer()),
+                            ('masked', card_serializer(MASKED_FIELDS, True)),
+                            ('fields', card_serializer(('id', 'card_holder_name', 'last4', 'created_at')))):
+        result = measure(lambda: [serialize(card, '4111111111111111', '123') for card in cards], min_time=min_time)
+        result['rows_per_sec'] = round(count * 1e6 / result['mean_us'], 1)
+        results[f"serializer.{name}[rows={count}]"] = result
+    return results
+
+
+def bench_formats(config, min_time, count=10000):
+    """Formatele listei de carduri (json, columnar, msgpack) pe o pagină mare
+
+    Pentru fiecare format: timpul de serializare, octeții per rând și dimensiunea
+    corpului comprimat gzip / brotli (cu nivelurile din configurație).
+    """
+    from models.card import MASKED_FIELDS, Card, card_serializer, public_fields
+    from services.compression import ResponseCompressor, brotli
+    from services.response_formats import available_formats, encode
+    now = datetime.now()
+    cards = [
+        Card(index, 'Ion Popescu', None, '12/2030', None, 'credit', 'sync',
+             None, 'v1', '1111', 'visa', now, now)
+        for index in range(count)
+    ]
+    compressor = ResponseCompressor(config)
+    encodings = ('gzip', 'br') if brotli is not None else ('gzip',)
+
+    def build(response_format):
+        if response_format == 'columnar':
+            serialize = card_serializer(MASKED_FIELDS, True, 'row')
+            return lambda: encode({"columns": list(public_fields(MASKED_FIELDS)),
+                                   "rows": [serialize(card) for card in cards]}, response_format)
+        serialize = card_serializer(MASKED_FIELDS, True)
+        return lambda: encode([serialize(card) for card in cards], response_format)
+
+    results = {}
+    for response_format in available_formats():
+        body = build(response_format)
+        result = measure(body, min_time=min_time)
+        data = body()
+        result['rows_per_sec'] = round(count * 1e6 / result['mean_us'], 1)
+        result['bytes_per_row'] = round(len(data) / count, 1)
+        for encoding in encodings:
+            result[f'{encoding}_bytes_per_row'] = round(len(compressor.compress(data, encoding)) / count, 2)
+        results[f"formats.{response_format}[rows={count}]"] = result
+    return results
+
+
+def create_bench_app():
+    """Aplicația Flask completă, cu backend-ul de stocare în memorie în locul PostgreSQL
+
+    Blueprint-ul de carduri se poate înregistra o singură dată per proces, deci
+    aplicația este creată o dată, iar tabela este repopulată pentru fiecare scenariu.
+    """
+    from app import create_app
+    Config.STORAGE_BACKEND = 'memory'
+    return create_app()
+
+
+def seed_rows(encryption_service, count, encryption_type):
+    """Rânduri criptate pentru tabela din memorie; textul criptat este refolosit între rânduri"""
+    card = dict(SAMPLE_CARD, card_number=SAMPLE_CARD['card_number'].replace(' ', ''))
+    (card_number, cvv), data_key = encryption_service.encrypt_fields(
+        [card['card_number'], card['cvv']], encryption_type
+    )
+    row = dict(card, card_number=card_number, cvv=cvv, encryption_type=encryption_type,
+               data_key=data_key, key_id=encryption_service.key_id)
+    return [row] * count
+
+
+def bench_routes(row_counts, encryption_type, min_time):
+    """Cereri complete prin clientul de test Flask, pentru fiecare dimensiune a tabelei"""
+    import routes.card_routes as card_routes
+    from utils.pagination import encode_cursor
+    app = create_bench_app()
+    db = app.extensions['db_service']
+    client = app.test_client()
+    body = dict(SAMPLE_CARD, encryption_type=encryption_type)
+
+    def check(response, status):
+        if response.status_code != status:
+            raise RuntimeError(f"Unexpected status {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    results = {}
+    for count in row_counts:
+        db.reset(seed_rows(card_routes.encryption_service, count, encryption_type))
+        ids = list(range(1, count + 1))
+        position = [0]
+
+        def next_id():
+            position[0] = (position[0] + 1) % len(ids)
+            return ids[position[0]]
+
+        def insert_row():
+            return db.create_card(seed_rows(card_routes.encryption_service, 1, encryption_type)[0]).id
+
+        suffix = f"[rows={count},type={encryption_type}]"
+        results[f"routes.list{suffix}"] = measure(
+            lambda: check(client.get('/api/cards'), 200), min_time=min_time)
+        results[f"routes.list_full{suffix}"] = measure(
+            lambda: check(client.get('/api/cards?view=full'), 200), min_time=min_time)
+        results[f"routes.get{suffix}"] = measure(
+            lambda: check(client.get(f'/api/cards/{next_id()}'), 200), min_time=min_time)
+        results[f"routes.create{suffix}"] = measure(
+            lambda: check(client.post('/api/cards', json=body), 201), min_time=min_time)
+        results[f"routes.update{suffix}"] = measure(
+            lambda: check(client.put(f'/api/cards/{next_id()}', json=body), 200), min_time=min_time)
+        results[f"routes.delete{suffix}"] = measure(
+            lambda card_id: check(client.delete(f'/api/cards/{card_id}'), 200),
+            setup=insert_row, min_time=min_time)
+
+        # Clientul cu o copie locală: un card modificat între două sincronizări (vederea completă)
+        # Poziția inițială este capul fluxului; backend-ul din memorie folosește ceasul local
+        token = [encode_cursor(datetime.now(), 0)]
+
+        def modify_row():
+            db.update_card(next_id(), {'card_holder_name': SAMPLE_CARD['card_holder_name']})
+            return token[0]
+
+        def sync_changes(since):
+            response = client.get(f'/api/cards/changes?view=full&since={since}')
+            check(response, 200)
+            token[0] = response.get_json()['next']
+
+        results[f"routes.changes_one{suffix}"] = measure(sync_changes, setup=modify_row, min_time=min_time)
+    return results
+
+
+def _planning_time(conn, query, params, prepared, runs):
+    """Timpul mediu de planificare (microsecunde) raportat de EXPLAIN ANALYZE pentru query
+
+    Cu prepared=True interogarea trece prin PREPARE/EXECUTE; primele execuții (planuri
+    specifice, până când serverul alege planul generic) nu intră în medie.
+    """
+    from services.queries import positional
+    statement = query
+    with conn.cursor() as cursor:
+        if prepared:
+            cursor.execute(f"PREPARE bench_planning AS {positional(query)}")
+            statement = f"EXECUTE bench_planning ({', '.join(['%s'] * len(params))})" if params else \
+                "EXECUTE bench_planning"
+        total = 0.0
+        for run in range(runs + 5):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", params)
+            if run >= 5:
+                total += cursor.fetchone()[0][0]['Planning Time']
+        if prepared:
+            cursor.execute("DEALLOCATE bench_planning")
+    conn.rollback()
+    return round(total / runs * 1000, 2)
+
+
+def bench_db(config, row_counts, min_time, planning_runs=50):
+    """Interogările fixe ale DatabaseService pe PostgreSQL (DB_*), fără și cu instrucțiuni pregătite
+
+    Rândurile sunt inserate pentru fiecare dimensiune și șterse direct la final (fără jurnalul
+    ștergerilor), deci grupul nu se rulează pe o bază folosită de clienți. Pentru fiecare
+    interogare: latența apelului (pool, execuție, citirea rândurilor) și planning_us, timpul
+    de planificare raportat de EXPLAIN ANALYZE.
+    """
+    from services.db_service import DatabaseService
+    from services.encryption_service import EncryptionService
+    from services.queries import render
+    from models.card import MASKED_FIELDS
+    from routes.card_routes import SENSITIVE_FIELDS
+    services = {
+        mode: DatabaseService(dict(config, DB_PREPARED_STATEMENTS=mode == 'prepared', DB_REPLICA_HOSTS=[],
+                                   DB_POOL_MIN_SIZE=1, DB_POOL_MAX_SIZE=1))
+        for mode in ('plain', 'prepared')
+    }
+    row = seed_rows(EncryptionService(config), 1, 'sync')[0]
+    # Proiecția vederii mascate a listei (fără textul criptat)
+    columns = [column for column in DatabaseService.CARD_COLUMNS
+               if column in MASKED_FIELDS and column not in SENSITIVE_FIELDS]
+
+    results = {}
+    for count in row_counts:
+        db = services['plain']
+        ids = []
+        for start in range(0, count, 1000):
+            ids += db.create_cards([dict(row, card_number_index=f"bench-{index}")
+                                    for index in range(start, min(count, start + 1000))])
+        # Statistici proaspete și hint bits setate, ca primul mod măsurat să nu plătească pentru ele
+        with db.get_connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("VACUUM ANALYZE cards")
+            finally:
+                conn.autocommit = False
+        position = [0]
+
+        def next_id():
+            position[0] = (position[0] + 1) % len(ids)
+            return ids[position[0]]
+
+        page_query, page_params = db._build_cards_query(limit=100, columns=columns)
+        since = (datetime.now(), 0)
+        cases = {
+            'card_by_id': (lambda db: db.get_card_by_id(next_id()), render('card_by_id'), (ids[0],)),
+            'card_version': (lambda db: db.get_card_version(next_id()), render('card_version'), (ids[0],)),
+            'cards_version': (lambda db: db.get_cards_version(), render('cards_version'), ()),
+            'list_page': (lambda db: db.get_cards(limit=100, columns=columns), page_query, page_params),
+            'by_number_index': (lambda db: db.find_cards_by_number_index(f"bench-{next_id() - ids[0]}"),
+                                render('cards_by_number_index'), ('bench-0',)),
+            'changes': (lambda db: db.get_changes(since, 100), render('changes_cards', limit=100),
+                        (*since, datetime.now())),
+        }
+        try:
+            for name, (call, query, params) in cases.items():
+                for mode, service in services.items():
+                    result = measure(lambda: call(service), min_time=min_time)
+                    with service.get_connection() as conn:
+                        result['planning_us'] = _planning_time(conn, query, params, mode == 'prepared',
+                                                               planning_runs)
+                    results[f"db.{name}[rows={count},mode={mode}]"] = result
+        finally:
+            with db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("DELETE FROM cards WHERE id = ANY(%s)", (ids,))
+                conn.commit()
+    for service in services.values():
+        service.close()
+    return results
+
+
+def _http_client(url, path, duration):
+    """Un client cu conexiune keep-alive care trimite cereri până la expirarea duratei"""
+    import http.client
+    from urllib.parse import urlsplit
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    def send():
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            try:
+                status = send()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Conexiune keep-alive închisă de server (ex. worker oprit la reload):
+                # ca un browser, se reîncearcă o dată pe o conexiune nouă
+                connection.close()
+                status = send()
+            if status != 200:
+                errors += 1
+                continue
+        except Exception:
+            errors += 1
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies, errors
+
+
+def http_load(url, path='/api/cards', concurrency=8, duration=10.0):
+    """Încărcare HTTP pe un server pornit separat (dev server sau gunicorn)
+
+    Fiecare client rulează în propriul proces, ca GIL-ul clientului să nu limiteze măsurătoarea.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(_http_client, [url] * concurrency, [path] * concurrency,
+                                 [duration] * concurrency))
+    latencies = sorted(latency for outcome, _ in outcomes for latency in outcome)
+    errors = sum(errors for _, errors in outcomes)
+    if not latencies:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': round(len(latencies) / duration, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(groups=('crypto', 'validation', 'serialization', 'formats', 'routes'), row_counts=ROW_COUNTS,
+        encryption_type='sync', min_time=0.5):
+    """Rulează grupurile de benchmark-uri alese; întoarce documentul JSON cu rezultatele"""
+    # Logging-ul pe fiecare cerere ar domina măsurătorile
+    logging.disable(logging.INFO)
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+
+    results = {}
+    if 'crypto' in groups:
+        results.update(bench_crypto(config, min_time))
+    if 'validation' in groups:
+        results.update(bench_validation(min_time))
+    if 'serialization' in groups:
+        results.update(bench_serialization(min_time))
+    if 'formats' in groups:
+        results.update(bench_formats(config, min_time))
+    if 'routes' in groups:
+        results.update(bench_routes(row_counts, encryption_type, min_time))
+    if 'db' in groups:
+        results.update(bench_db(config, row_counts, min_time))
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+
+def compare(baseline, current, threshold=0.10, metric='p50_us'):
+    """Compară două documente de rezultate
+
+    Întoarce o listă de (nume, valoare de referință, valoare curentă, variație relativă,
+    stare), unde starea este 'regression' dacă valoarea crește cu mai mult de threshold.
+    """
+    rows = []
+    for name, result in sorted(current['results'].items()):
+        reference = baseline['results'].get(name)
+        if reference is None:
+            rows.append((name, None, result[metric], None, 'new'))
+            continue
+        change = (result[metric] - reference[metric]) / reference[metric] if reference[metric] else 0.0
+        if change > threshold:
+            status = 'regression'
+        elif change < -threshold:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append((name, reference[metric], result[metric], change, status))
+    return rows
+
+
+def load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
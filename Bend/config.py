@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 from Crypto.PublicKey import RSA
 
@@ -16,14 +17,158 @@ class Config:
     DB_USER = os.environ.get('DB_USER', 'postgres')
     DB_PASSWORD = os.environ.get('DB_PASSWORD', 'morbius')
     
+    # Pool de conexiuni (dimensiuni, timeout la obținere, verificarea conexiunilor inactive)
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+    DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300.0))
+    DB_POOL_CHECK_AFTER = float(os.environ.get('DB_POOL_CHECK_AFTER', 5.0))
+    # Instrucțiuni pregătite pe server (PREPARE/EXECUTE), ținute per conexiune (cel mult
+    # DB_PREPARED_STATEMENTS_MAX). Se dezactivează în spatele unui pooler în mod tranzacție (PgBouncer)
+    DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+    DB_PREPARED_STATEMENTS_MAX = int(os.environ.get('DB_PREPARED_STATEMENTS_MAX', 100))
+    
+    # Replici de citire (host[:port] sau [ipv6]:port, separate prin virgulă; aceleași
+    # DB_NAME/DB_USER/DB_PASSWORD).
+    # Fără replici totul merge la primar. Strategia: round_robin sau least_connections
+    DB_REPLICA_HOSTS = [host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+    DB_REPLICA_STRATEGY = os.environ.get('DB_REPLICA_STRATEGY', 'round_robin').lower()
+    # O replică rămasă în urmă peste DB_REPLICA_MAX_LAG secunde (verificată cel mult o dată la
+    # DB_REPLICA_CHECK_INTERVAL) sau inaccesibilă (ocolită DB_REPLICA_RETRY_AFTER secunde) cedează primarului
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5.0))
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5.0))
+    DB_REPLICA_RETRY_AFTER = float(os.environ.get('DB_REPLICA_RETRY_AFTER', 30.0))
+    DB_REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2))
+    # Read-your-writes: după o scriere, citirile aceluiași client (cookie) merg la primar atâtea secunde
+    DB_READ_YOUR_WRITES_WINDOW = float(os.environ.get('DB_READ_YOUR_WRITES_WINDOW', 5.0))
+    
+    # Paginare pentru GET /api/cards
+    CARDS_PAGE_SIZE = int(os.environ.get('CARDS_PAGE_SIZE', 100))
+    CARDS_MAX_PAGE_SIZE = int(os.environ.get('CARDS_MAX_PAGE_SIZE', 1000))
+    
+    # Vederea implicită a listei: masked (fără decriptare) sau full
+    CARDS_DEFAULT_VIEW = os.environ.get('CARDS_DEFAULT_VIEW', 'masked').lower()
+    
+    # Un număr de card poate apărea o singură dată (409 la duplicat; vezi migrarea 008)
+    CARDS_UNIQUE_NUMBER = os.environ.get('CARDS_UNIQUE_NUMBER', 'false').lower() == 'true'
+    
+    # Export în flux (NDJSON): rânduri aduse de cursorul server-side la fiecare pas
+    CARDS_STREAM_BATCH_SIZE = int(os.environ.get('CARDS_STREAM_BATCH_SIZE', 1000))
+    CARDS_STREAM_MAX_BATCH_SIZE = int(os.environ.get('CARDS_STREAM_MAX_BATCH_SIZE', 10000))
+    
+    # Cache pentru răspunsurile decriptate (opt-in: conține PAN-uri în clar, criptate în memorie)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    # Redis opțional pentru invalidarea coerentă între workeri (doar contoare de versiune)
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL') or None
+
+    # Compresia răspunsurilor (gzip sau brotli, după Accept-Encoding); fluxurile sunt
+    # comprimate incremental, restul doar peste COMPRESSION_MIN_SIZE octeți
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Fluxul de modificări (GET /api/cards/changes): pagina implicită, câte secunde se păstrează
+    # jurnalul ștergerilor (o poziție mai veche primește 410) și marja față de tranzacțiile în curs
+    CHANGES_PAGE_SIZE = int(os.environ.get('CHANGES_PAGE_SIZE', 500))
+    CHANGES_TOMBSTONE_RETENTION = float(os.environ.get('CHANGES_TOMBSTONE_RETENTION', 7 * 24 * 3600))
+    CHANGES_SETTLE_SECONDS = float(os.environ.get('CHANGES_SETTLE_SECONDS', 0.5))
+    # Server-Sent Events: dezactivate implicit (406), pentru că fiecare abonat ține ocupat un fir
+    # al worker-ului până la CHANGES_STREAM_MAX_DURATION; clienții cer periodic ?since=
+    CHANGES_STREAM_ENABLED = os.environ.get('CHANGES_STREAM_ENABLED', 'false').lower() == 'true'
+    # Intervalul de verificare, heartbeat-ul și durata maximă a unei conexiuni SSE
+    # (EventSource se reconectează singur)
+    CHANGES_POLL_INTERVAL = float(os.environ.get('CHANGES_POLL_INTERVAL', 1.0))
+    CHANGES_STREAM_KEEPALIVE = float(os.environ.get('CHANGES_STREAM_KEEPALIVE', 15.0))
+    CHANGES_STREAM_MAX_DURATION = float(os.environ.get('CHANGES_STREAM_MAX_DURATION', 300.0))
+    
+    # Import în lot (POST /api/cards/bulk): rânduri per cerere și per tranzacție
+    BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', 50000))
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 1000))
+    
     # Configurație pentru criptare
     # Cheie pentru criptare simetrică (AES)
     SYMMETRIC_KEY = os.environ.get('SYMMETRIC_KEY', 'default-symmetric-key-12345')
     
+    # Cheia HMAC pentru indexul orb al numărului de card (căutare fără decriptare);
+    # nu se rotește odată cu SYMMETRIC_KEY. Dacă lipsește, este derivată din SYMMETRIC_KEY
+    BLIND_INDEX_KEY = os.environ.get('BLIND_INDEX_KEY') or None
+    
+    # Versiunea cheilor curente (SYMMETRIC_KEY + perechea RSA), salvată pe fiecare rând
+    ENCRYPTION_KEY_ID = os.environ.get('ENCRYPTION_KEY_ID', 'v1')
+    # Chei anterioare, păstrate pentru citire în timpul rotației (JSON: {"v0": "..."})
+    PREVIOUS_SYMMETRIC_KEYS = json.loads(os.environ.get('PREVIOUS_SYMMETRIC_KEYS', '{}'))
+    # Căile cheilor private RSA anterioare (JSON: {"v0": "keys/v0/private_key.pem"})
+    PREVIOUS_RSA_KEYS = json.loads(os.environ.get('PREVIOUS_RSA_KEYS', '{}'))
+    
     # Căi pentru cheile de criptare asimetrică (RSA)
     RSA_PUBLIC_KEY_PATH = os.environ.get('RSA_PUBLIC_KEY_PATH', 'keys/public_key.pem')
     RSA_PRIVATE_KEY_PATH = os.environ.get('RSA_PRIVATE_KEY_PATH', 'keys/private_key.pem')
+    
+    # Decriptare RSA în lot: număr de procese worker și pragul de la care se paralelizează
+    RSA_WORKERS = int(os.environ.get('RSA_WORKERS', 0)) or os.cpu_count()
+    RSA_PARALLEL_MIN_BATCH = int(os.environ.get('RSA_PARALLEL_MIN_BATCH', 16))
+    
+    # Control de admitere pentru operațiile cu cheia privată RSA: apeluri simultane (implicit
+    # numărul de CPU), apeluri în așteptare, așteptarea maximă (s) și operații RSA per cerere;
+    # la depășire, cererea primește 503 cu Retry-After (ADMISSION_RETRY_AFTER secunde)
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true'
+    RSA_MAX_CONCURRENT = int(os.environ.get('RSA_MAX_CONCURRENT', 0)) or os.cpu_count()
+    RSA_MAX_QUEUE = int(os.environ.get('RSA_MAX_QUEUE', 32))
+    RSA_MAX_WAIT = float(os.environ.get('RSA_MAX_WAIT', 0.5))
+    RSA_REQUEST_BUDGET = int(os.environ.get('RSA_REQUEST_BUDGET', 2000))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+    
+    # Criptare hibridă: cache pentru cheile de date despachetate (0 dezactivează cache-ul)
+    HYBRID_KEY_CACHE_SIZE = int(os.environ.get('HYBRID_KEY_CACHE_SIZE', 1024))
+    HYBRID_KEY_CACHE_TTL = float(os.environ.get('HYBRID_KEY_CACHE_TTL', 300))
 
+    # Re-criptare / rotația cheilor (reencrypt.py sau fir de execuție în fundal)
+    REENCRYPT_BATCH_SIZE = int(os.environ.get('REENCRYPT_BATCH_SIZE', 500))
+    REENCRYPT_ROWS_PER_SECOND = float(os.environ.get('REENCRYPT_ROWS_PER_SECOND', 200))
+    REENCRYPT_CHECKPOINT_PATH = os.environ.get('REENCRYPT_CHECKPOINT_PATH', 'reencrypt_checkpoint.json')
+    REENCRYPT_TARGET_TYPE = os.environ.get('REENCRYPT_TARGET_TYPE') or None
+    # Fiecare worker pornește migrarea, dar lock-ul pe checkpoint lasă o singură rulare activă
+    REENCRYPT_IN_BACKGROUND = os.environ.get('REENCRYPT_IN_BACKGROUND', 'false').lower() == 'true'
+    
+    # Backend-ul de stocare: postgres (implicit), memory sau sqlite
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'postgres').lower()
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', 'bcard.sqlite3')
+    
+    # Completarea last4/brand/card_number_index pentru cardurile existente (backfill.py)
+    BACKFILL_BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', 500))
+    
+    # Pornire: eager (servicii create în create_app), lazy (la prima cerere) sau background;
+    # /api/ready răspunde 503 până când serviciile sunt gata
+    STARTUP_MODE = os.environ.get('STARTUP_MODE', 'eager').lower()
+    STARTUP_RETRY_INTERVAL = float(os.environ.get('STARTUP_RETRY_INTERVAL', 5.0))
+    
+    # Server de producție (gunicorn -c gunicorn.conf.py wsgi:app): procese worker pre-fork,
+    # fire per worker, timeout-uri și repornirea periodică a workerilor (0 = niciodată)
+    WEB_BIND = os.environ.get('WEB_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 0)) or os.cpu_count()
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5))
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+    
+    # Logging: evenimente JSON (sau text) scrise de un fir separat, printr-o coadă
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', 'true').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Cel mult LOG_ERROR_SAMPLE_BURST erori identice (același loc din cod) pe fereastră
+    LOG_ERROR_SAMPLE_BURST = int(os.environ.get('LOG_ERROR_SAMPLE_BURST', 10))
+    LOG_ERROR_SAMPLE_WINDOW = float(os.environ.get('LOG_ERROR_SAMPLE_WINDOW', 60.0))
+    # Un eveniment per cerere (metodă, rută, status, durată, durate pe etape)
+    LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'true').lower() == 'true'
+    
+    # Metrici (expuse pe /api/metrics în format Prometheus)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
     # Conexiune PostgreSQL
     SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -0,0 +1,36 @@
+# Configurația gunicorn pentru producție: gunicorn -c gunicorn.conf.py wsgi:app
+# Valorile vin din Config (variabilele WEB_*); comparația cu serverul de dezvoltare
+# este în benchmarks/SERVING.md
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread' if Config.WEB_THREADS > 1 else 'sync'
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = Config.WEB_KEEPALIVE
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS // 10
+
+# Aplicația este creată în master înainte de fork: cheile RSA, modulele și expresiile
+# regulate compilate sunt partajate (copy-on-write) de toți workerii
+preload_app = True
+
+# Logging-ul aplicației (JSON, prin coadă) înlocuiește jurnalul de acces gunicorn
+accesslog = None
+
+
+def post_fork(server, worker):
+    """Resursele per worker: pool-ul de conexiuni, pool-ul RSA și firul de log se recreează
+    singure după fork (os.register_at_fork / verificarea PID-ului); aici repornim doar
+    inițializarea în fundal, dacă nu se terminase în master"""
+    from wsgi import app
+    app.extensions['startup'].after_fork()
+
+
+def worker_exit(server, worker):
+    """Oprire curată la reload (SIGHUP) sau oprire (SIGTERM), după terminarea cererilor în curs"""
+    from routes.card_routes import shutdown_services
+    from wsgi import app
+    shutdown_services(app)
@@ -0,0 +1,14 @@
+-- Schema de bază pentru tabela de carduri
+-- Aplicare: psql -d BCard -f migrations/001_create_cards.sql
+
+CREATE TABLE IF NOT EXISTS cards (
+    id SERIAL PRIMARY KEY,
+    card_holder_name VARCHAR(100) NOT NULL,
+    card_number TEXT NOT NULL,
+    expiry_date VARCHAR(7) NOT NULL,
+    cvv TEXT NOT NULL,
+    card_type VARCHAR(10) NOT NULL,
+    encryption_type VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- Indexuri pentru paginarea keyset (created_at, id) și filtrele din GET /api/cards
+-- Aplicare: psql -d BCard -f migrations/002_cards_list_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_cards_created_id
+    ON cards (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_cards_type_created_id
+    ON cards (card_type, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_cards_encryption_created_id
+    ON cards (encryption_type, created_at DESC, id DESC);
+
+-- expiry_date este stocat ca MM/YYYY; indexăm forma YYYYMM pentru filtrele pe interval
+CREATE INDEX IF NOT EXISTS idx_cards_expiry_ym
+    ON cards ((substring(expiry_date from 4 for 4) || substring(expiry_date from 1 for 2)));
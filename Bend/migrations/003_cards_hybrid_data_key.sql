@@ -0,0 +1,4 @@
+-- Cheia de date (AES) împachetată RSA pentru cardurile cu encryption_type = 'hybrid'
+-- Aplicare: psql -d BCard -f migrations/003_cards_hybrid_data_key.sql
+
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS data_key TEXT;
@@ -0,0 +1,5 @@
+-- Versiunea cheilor cu care a fost criptat fiecare rând (vezi ENCRYPTION_KEY_ID)
+-- Rândurile existente au fost criptate cu cheile inițiale, adică 'v1'
+-- Aplicare: psql -d BCard -f migrations/004_cards_key_id.sql
+
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS key_id VARCHAR(32) NOT NULL DEFAULT 'v1';
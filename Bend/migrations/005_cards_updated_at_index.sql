@@ -0,0 +1,4 @@
+-- Index pentru max(updated_at), folosit la calculul ETag-ului listei de carduri
+-- Aplicare: psql -d BCard -f migrations/005_cards_updated_at_index.sql
+
+CREATE INDEX IF NOT EXISTS idx_cards_updated_at ON cards (updated_at);
@@ -0,0 +1,10 @@
+-- Ultimele 4 cifre și rețeaua cardului, stocate necriptat la scriere, pentru
+-- listarea mascată (fără nicio operație de decriptare)
+-- Rândurile existente se completează cu: python backfill.py
+-- Aplicare: psql -d BCard -f migrations/006_cards_last4_brand.sql
+
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS last4 VARCHAR(4);
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS brand VARCHAR(16);
+
+-- Indexul parțial acoperă rândurile rămase de completat
+CREATE INDEX IF NOT EXISTS idx_cards_last4_missing ON cards (id) WHERE last4 IS NULL;
@@ -0,0 +1,13 @@
+-- Indexul orb al numărului de card: HMAC-SHA256 (hex) peste cifre, cu BLIND_INDEX_KEY
+-- Permite căutarea după număr (GET /api/cards/lookup) fără a decripta rândurile
+-- Rândurile existente se completează cu: python backfill.py
+-- Aplicare: psql -d BCard -f migrations/007_cards_number_index.sql
+
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS card_number_index VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_cards_number_index ON cards (card_number_index);
+
+-- Backfill-ul caută acum și rândurile fără index orb
+DROP INDEX IF EXISTS idx_cards_last4_missing;
+CREATE INDEX IF NOT EXISTS idx_cards_backfill_missing ON cards (id)
+    WHERE last4 IS NULL OR card_number_index IS NULL;
@@ -0,0 +1,7 @@
+-- Opțional: un număr de card poate apărea o singură dată (împreună cu CARDS_UNIQUE_NUMBER=true)
+-- Se aplică după backfill.py; eșuează dacă există deja numere duplicate
+-- Aplicare (în afara unei tranzacții, din cauza CONCURRENTLY):
+--   psql -d BCard -f migrations/008_cards_number_index_unique.sql
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_number_index_unique ON cards (card_number_index);
+DROP INDEX CONCURRENTLY IF EXISTS idx_cards_number_index;
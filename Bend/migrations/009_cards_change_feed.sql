@@ -0,0 +1,13 @@
+-- Fluxul de modificări (GET /api/cards/changes): jurnalul ștergerilor și indexul (updated_at, id)
+-- folosit la paginarea keyset a modificărilor (servește și max(updated_at) pentru ETag)
+-- Aplicare: psql -d BCard -f migrations/009_cards_change_feed.sql
+
+CREATE TABLE IF NOT EXISTS card_deletions (
+    card_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_card_deletions_deleted_at ON card_deletions (deleted_at, card_id);
+
+CREATE INDEX IF NOT EXISTS idx_cards_updated_at_id ON cards (updated_at, id);
+DROP INDEX IF EXISTS idx_cards_updated_at;
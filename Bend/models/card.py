@@ -0,0 +1,208 @@
+import json
+from functools import lru_cache
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:  # encoderul standard, mai lent, dacă orjson nu este instalat
+    orjson = None
+
+# Coloanele unui card, în ordinea din SELECT-uri (și din constructorul Card)
+CARD_FIELDS = (
+    'id', 'card_holder_name', 'card_number', 'expiry_date',
+    'cvv', 'card_type', 'encryption_type', 'data_key', 'key_id',
+    'last4', 'brand', 'created_at', 'updated_at'
+)
+TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+# Coloanele interne, care nu apar niciodată în răspunsuri
+PRIVATE_FIELDS = ('data_key', 'key_id')
+# Câmpurile care pot fi cerute la listare prin ?fields= (toate câmpurile publice)
+LIST_FIELDS = (
+    'id', 'card_holder_name', 'card_number', 'expiry_date', 'cvv', 'card_type',
+    'encryption_type', 'last4', 'brand', 'created_at', 'updated_at'
+)
+# Vederea mascată: numărul cardului este reconstruit din last4, fără CVV și fără decriptare
+MASKED_FIELDS = tuple(field for field in LIST_FIELDS if field != 'cvv')
+
+
+class Card:
+    """Un rând din tabela cards
+
+    Atributele sunt fixe (__slots__), deci un rând ocupă mult mai puțină memorie decât
+    un dicționar. Backend-urile construiesc cardul direct din tuplul cursorului
+    (Card(*row), în ordinea CARD_FIELDS); coloanele necitite rămân None.
+    """
+
+    __slots__ = CARD_FIELDS
+
+    def __init__(self, id=None, card_holder_name=None, card_number=None, expiry_date=None,
+                 cvv=None, card_type=None, encryption_type=None, data_key=None, key_id=None,
+                 last4=None, brand=None, created_at=None, updated_at=None):
+        self.id = id
+        self.card_holder_name = card_holder_name
+        self.card_number = card_number
+        self.expiry_date = expiry_date
+        self.cvv = cvv
+        self.card_type = card_type
+        self.encryption_type = encryption_type
+        self.data_key = data_key
+        self.key_id = key_id
+        self.last4 = last4
+        self.brand = brand
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_mapping(cls, row):
+        """Construiește cardul dintr-un dicționar (backend-urile memory și sqlite)"""
+        return cls(*[row.get(field) for field in CARD_FIELDS])
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in CARD_FIELDS}
+
+    def __repr__(self):
+        return f"Card(id={self.id!r}, encryption_type={self.encryption_type!r}, key_id={self.key_id!r})"
+
+
+def group_card_number(card_number):
+    """XXXX XXXX XXXX XXXX, pentru lizibilitate"""
+    if not card_number:
+        return card_number
+    return ' '.join([card_number[i:i + 4] for i in range(0, len(card_number), 4)])
+
+
+def mask_card_number(last4):
+    return f"**** **** **** {last4 or '****'}"
+
+
+def iso_timestamp(value):
+    return value if value is None or isinstance(value, str) else value.isoformat()
+
+
+def public_fields(fields):
+    """Câmpurile proiecției care ajung în răspuns (fără data_key și key_id)"""
+    return tuple(field for field in fields if field not in PRIVATE_FIELDS)
+
+
+# Proiecțiile implicite (lista completă și vederea mascată) sunt scrise explicit: un singur
+# literal dict/tuplu, fără bucle per câmp, la fel de rapid ca o funcție generată cu eval
+
+
+def _list_object(card, card_number=None, cvv=None):
+    return {
+        'id': card.id,
+        'card_holder_name': card.card_holder_name,
+        'card_number': group_card_number(card_number),
+        'expiry_date': card.expiry_date,
+        'cvv': cvv,
+        'card_type': card.card_type,
+        'encryption_type': card.encryption_type,
+        'last4': card.last4,
+        'brand': card.brand,
+        'created_at': iso_timestamp(card.created_at),
+        'updated_at': iso_timestamp(card.updated_at)
+    }
+
+
+def _list_row(card, card_number=None, cvv=None):
+    return (
+        card.id, card.card_holder_name, group_card_number(card_number), card.expiry_date, cvv,
+        card.card_type, card.encryption_type, card.last4, card.brand,
+        iso_timestamp(card.created_at), iso_timestamp(card.updated_at)
+    )
+
+
+def _masked_object(card, card_number=None, cvv=None):
+    return {
+        'id': card.id,
+        'card_holder_name': card.card_holder_name,
+        'card_number': mask_card_number(card.last4),
+        'expiry_date': card.expiry_date,
+        'card_type': card.card_type,
+        'encryption_type': card.encryption_type,
+        'last4': card.last4,
+        'brand': card.brand,
+        'created_at': iso_timestamp(card.created_at),
+        'updated_at': iso_timestamp(card.updated_at)
+    }
+
+
+def _masked_row(card, card_number=None, cvv=None):
+    return (
+        card.id, card.card_holder_name, mask_card_number(card.last4), card.expiry_date,
+        card.card_type, card.encryption_type, card.last4, card.brand,
+        iso_timestamp(card.created_at), iso_timestamp(card.updated_at)
+    )
+
+
+_FAST_SERIALIZERS = {
+    (LIST_FIELDS, False, 'object'): _list_object,
+    (LIST_FIELDS, False, 'row'): _list_row,
+    (MASKED_FIELDS, True, 'object'): _masked_object,
+    (MASKED_FIELDS, True, 'row'): _masked_row,
+}
+
+
+@lru_cache(maxsize=64)
+def card_serializer(fields=CARD_FIELDS, masked=False, layout='object'):
+    """Funcția (card, card_number, cvv) -> rând pentru proiecția `fields`, construită o singură dată
+
+    card_number și cvv sunt valorile decriptate; numărul este grupat (sau mascat din last4
+    cu masked=True), iar timestamp-urile sunt formatate ISO. layout='object' produce un
+    dict, layout='row' un tuplu în ordinea public_fields(fields) (formatul columnar).
+    data_key și key_id nu apar niciodată în răspuns.
+
+    Lista completă și vederea mascată folosesc funcțiile scrise explicit de mai sus; celelalte
+    proiecții (?fields=) citesc atributele dintr-o singură apelare attrgetter, iar doar câmpurile
+    care au nevoie de formatare (număr, CVV, timestamp-uri) mai trec printr-o funcție.
+    """
+    unknown = set(fields) - set(CARD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if layout not in ('object', 'row'):
+        raise ValueError(f"Unknown layout: {layout}")
+    keys = public_fields(fields)
+    fast = _FAST_SERIALIZERS.get((keys, masked, layout))
+    if fast is not None:
+        return fast
+    return _build_serializer(keys, masked, layout)
+
+
+def _build_serializer(keys, masked, layout):
+    """Serializorul generic pentru o proiecție oarecare (câmpurile publice `keys`, în ordine)"""
+    sources = []
+    transforms = []
+    for index, field in enumerate(keys):
+        if field == 'card_number':
+            sources.append('last4')
+            if masked:
+                transforms.append((index, lambda last4, card_number, cvv: mask_card_number(last4)))
+            else:
+                transforms.append((index, lambda last4, card_number, cvv: group_card_number(card_number)))
+        elif field == 'cvv':
+            sources.append('id')
+            transforms.append((index, lambda value, card_number, cvv: cvv))
+        else:
+            sources.append(field)
+            if field in TIMESTAMP_FIELDS:
+                transforms.append((index, lambda value, card_number, cvv: iso_timestamp(value)))
+    # attrgetter cu un singur atribut întoarce valoarea, nu un tuplu
+    getter = attrgetter(*sources) if len(sources) > 1 else (lambda card: (getattr(card, sources[0]),))
+    transforms = tuple(transforms)
+
+    def values(card, card_number, cvv):
+        row = list(getter(card))
+        for index, transform in transforms:
+            row[index] = transform(row[index], card_number, cvv)
+        return row
+
+    if layout == 'object':
+        return lambda card, card_number=None, cvv=None: dict(zip(keys, values(card, card_number, cvv)))
+    return lambda card, card_number=None, cvv=None: tuple(values(card, card_number, cvv))
+
+
+def dumps(value):
+    """Serializează în JSON (bytes, UTF-8) cu orjson, sau cu modulul json dacă lipsește"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
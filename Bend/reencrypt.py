@@ -0,0 +1,41 @@
+import argparse
+import json
+import logging
+from config import Config
+from services.encryption_service import EncryptionService
+from services.reencryption_service import ReencryptionService
+from services.response_cache import ResponseCache
+from services.storage import create_storage
+
+def main():
+    """Re-criptează cardurile cu cheile curente (ENCRYPTION_KEY_ID), reluând de la checkpoint"""
+    parser = argparse.ArgumentParser(description="Re-criptare carduri / rotația cheilor")
+    parser.add_argument('--to', dest='target_type', choices=['sync', 'async', 'hybrid'],
+                        help="Tipul de criptare țintă (implicit: se păstrează tipul fiecărui card)")
+    parser.add_argument('--batch-size', type=int, help="Rânduri per lot/tranzacție")
+    parser.add_argument('--rate', type=float, help="Limita de rânduri pe secundă (0 = nelimitat)")
+    parser.add_argument('--checkpoint', help="Fișierul în care se salvează progresul")
+    parser.add_argument('--max-rows', type=int, help="Se oprește după acest număr de rânduri")
+    parser.add_argument('--reset', action='store_true', help="Ignoră checkpoint-ul existent")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    if args.batch_size:
+        config['REENCRYPT_BATCH_SIZE'] = args.batch_size
+    if args.rate is not None:
+        config['REENCRYPT_ROWS_PER_SECOND'] = args.rate
+    if args.checkpoint:
+        config['REENCRYPT_CHECKPOINT_PATH'] = args.checkpoint
+    
+    # Cu RESPONSE_CACHE_REDIS_URL invalidarea ajunge la workerii aplicației; altfel
+    # răspunsurile din cache expiră după RESPONSE_CACHE_TTL
+    service = ReencryptionService(create_storage(config), EncryptionService(config), config,
+                                  ResponseCache(config))
+    checkpoint = service.run(target_type=args.target_type, reset=args.reset, max_rows=args.max_rows)
+    if checkpoint is None:
+        parser.exit(1, "O altă re-criptare folosește deja acest checkpoint\n")
+    print(json.dumps(checkpoint, indent=2))
+
+if __name__ == '__main__':
+    main()
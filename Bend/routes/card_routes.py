@@ -1,103 +1,598 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models.card import LIST_FIELDS, MASKED_FIELDS, card_serializer, dumps, public_fields
+from services.admission import AdmissionRejected, begin_request, end_request
+from services.change_feed import ChangeFeed, ChangesExpiredError
 from services.encryption_service import EncryptionService
-from services.db_service import DatabaseService
+from services.storage import create_storage, DuplicateCardError
+from services.reencryption_service import ReencryptionService
+from services.response_cache import ResponseCache
+from services.response_formats import FORMATS, encode, negotiate_format
+from services.metrics import metrics
 from utils.validators import CardValidator
+from utils.pagination import encode_cursor, decode_cursor, expiry_to_sort_key
+import hashlib
+import json
 import logging
-import traceback
+import time
+from itertools import islice
 
 # Creare blueprint pentru API carduri
 card_bp = Blueprint('cards', __name__)
 
-def init_routes(app):
-    # Inițializare servicii cu configurație
+# Câmpurile stocate criptat: citite și decriptate doar în vederea completă
+SENSITIVE_FIELDS = ('card_number', 'cvv')
+
+def parse_list_args(args, config):
+    """Extrage paginarea și filtrele pentru listarea cardurilor din query string"""
+    errors = {}
+    filters = {}
+    
+    limit = config.get('CARDS_PAGE_SIZE', 100)
+    max_limit = config.get('CARDS_MAX_PAGE_SIZE', 1000)
+    if args.get('limit'):
+        try:
+            limit = int(args['limit'])
+            if limit < 1 or limit > max_limit:
+                raise ValueError()
+        except ValueError:
+            errors['limit'] = f"Limita trebuie să fie un număr între 1 și {max_limit}"
+    
+    if args.get('after'):
+        try:
+            filters['after'] = decode_cursor(args['after'])
+        except ValueError as e:
+            errors['after'] = str(e)
+    
+    if args.get('card_type'):
+        if args['card_type'] not in ['credit', 'debit']:
+            errors['card_type'] = "Tipul cardului trebuie să fie credit sau debit"
+        filters['card_type'] = args['card_type']
+    
+    if args.get('encryption_type'):
+        if args['encryption_type'] not in ['sync', 'async', 'hybrid']:
+            errors['encryption_type'] = "Tipul criptării trebuie să fie sync, async sau hybrid"
+        filters['encryption_type'] = args['encryption_type']
+    
+    for key in ('expires_from', 'expires_to'):
+        if args.get(key):
+            try:
+                filters[key] = expiry_to_sort_key(args[key])
+            except ValueError as e:
+                errors[key] = str(e)
+    
+    if errors:
+        raise ValueError(errors)
+    return limit, filters
+
+def parse_batch_size(args, config):
+    """Dimensiunea lotului pentru exportul NDJSON (?batch_size=, limitată la CARDS_STREAM_MAX_BATCH_SIZE)"""
+    batch_size = config.get('CARDS_STREAM_BATCH_SIZE', 1000)
+    if args.get('batch_size'):
+        try:
+            batch_size = min(max(int(args['batch_size']), 1), config.get('CARDS_STREAM_MAX_BATCH_SIZE', 10000))
+        except ValueError:
+            raise ValueError({"batch_size": "Dimensiunea lotului trebuie să fie un număr"})
+    return batch_size
+
+def parse_projection(args, config):
+    """Extrage proiecția listării: (câmpuri, mascat) din ?view= și ?fields=
+    
+    ?fields= are prioritate față de ?view=; câmpurile sensibile cerute explicit
+    sunt decriptate, iar vederea mascată nu decriptează nimic.
+    """
+    if args.get('fields'):
+        fields = tuple(dict.fromkeys(field.strip() for field in args['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in LIST_FIELDS]
+        if unknown or not fields:
+            raise ValueError({"fields": f"Câmpuri permise: {', '.join(LIST_FIELDS)}"})
+        return fields, False
+    
+    view = args.get('view') or config.get('CARDS_DEFAULT_VIEW', 'masked')
+    if view == 'masked':
+        return MASKED_FIELDS, True
+    if view == 'full':
+        return LIST_FIELDS, False
+    raise ValueError({"view": "Vederea trebuie să fie masked sau full"})
+
+def projection_columns(fields, masked):
+    """Coloanele citite din baza de date pentru o proiecție (plus cele cerute de paginare)"""
+    columns = set(fields) | {'id', 'created_at'}
+    if masked:
+        columns -= set(SENSITIVE_FIELDS)
+        if 'card_number' in fields:
+            columns.add('last4')
+    elif columns & set(SENSITIVE_FIELDS):
+        columns |= {'encryption_type', 'data_key', 'key_id'}
+    return [column for column in db_service.CARD_COLUMNS if column in columns]
+
+def make_etag(*parts):
+    """ETag puternic derivat din versiunea datelor, fără a atinge conținutul decriptat"""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+def with_etag(response, etag):
+    """Atașează ETag-ul și obligă clientul să revalideze înainte de a refolosi răspunsul
+    
+    Răspunsurile comprimate primesc varianta slabă a ETag-ului, deci revalidarea
+    (If-None-Match) folosește comparația slabă.
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept')
+    return response
+
+def cached_response(cached):
+    """Reconstruiește un răspuns JSON din cache (sau 304 dacă clientul are deja versiunea)"""
+    body, meta = cached
+    if request.if_none_match.contains_weak(meta['etag']):
+        return with_etag(current_app.response_class(status=304), meta['etag'])
+    response = current_app.response_class(body, status=200, mimetype=meta.get('mimetype', 'application/json'))
+    if meta.get('next_cursor'):
+        response.headers['X-Next-Cursor'] = meta['next_cursor']
+    return with_etag(response, meta['etag'])
+
+def wants_stream(req):
+    """Clientul a cerut lista în flux (NDJSON) prin ?stream=1 sau Accept"""
+    if req.args.get('stream') in ('1', 'true'):
+        return True
+    best = req.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def json_response(value, status=200):
+    """Răspuns JSON serializat cu encoderul rapid din models.card"""
+    return current_app.response_class(dumps(value), status=status, mimetype='application/json')
+
+def decrypt_card(card):
+    """Decriptează numărul și CVV-ul unui card (o singură despachetare pentru cheia hibridă)"""
+    card_number, cvv = encryption_service.decrypt_many([
+        (card.card_number, card.encryption_type, card.data_key, card.key_id),
+        (card.cvv, card.encryption_type, card.data_key, card.key_id)
+    ])
+    for value in (card_number, cvv):
+        if isinstance(value, Exception):
+            raise value
+    return card_number, cvv
+
+def decrypt_card_rows(cards, fields=LIST_FIELDS, masked=False, layout='object'):
+    """Construiește rândurile pentru proiecția cerută, decriptând în lot doar câmpurile sensibile cerute
+    
+    layout='row' întoarce tupluri (formatul columnar). Rândurile care nu pot fi decriptate sunt omise.
+    """
+    serialize = card_serializer(fields, masked, layout)
+    sensitive = [] if masked else [field for field in SENSITIVE_FIELDS if field in fields]
+    if not sensitive or not cards:
+        return [serialize(card) for card in cards]
+    
+    items = [
+        (getattr(card, field), card.encryption_type, card.data_key, card.key_id)
+        for card in cards
+        for field in sensitive
+    ]
+    plaintexts = encryption_service.decrypt_many(items)
+    
+    width = len(sensitive)
+    decrypted_cards = []
+    for index, card in enumerate(cards):
+        values = dict(zip(sensitive, plaintexts[index * width:(index + 1) * width]))
+        error = next((value for value in values.values() if isinstance(value, Exception)), None)
+        if error is not None:
+            logging.error("Error decrypting card %s: %s", card.id, error)
+            continue
+        decrypted_cards.append(serialize(card, values.get('card_number'), values.get('cvv')))
+    return decrypted_cards
+
+def stream_cards(limit, filters, fields=LIST_FIELDS, masked=False, batch_size=1000):
+    """Trimite cardurile ca NDJSON, rând cu rând, fără a materializa lista"""
+    def generate():
+        count = 0
+        # Exportul nu are buget de operații RSA; fiecare lot trece totuși prin semafor
+        budget_token = begin_request(None)
+        try:
+            cards = db_service.iter_cards(batch_size=batch_size, limit=limit, **filters)
+            # Decriptăm câte un lot odată, ca RSA să poată rula în paralel; fiecare lot
+            # pleacă într-o singură bucată (comprimată și golită separat, dacă e cazul)
+            for batch in iter(lambda: list(islice(cards, batch_size)), []):
+                rows = decrypt_card_rows(batch, fields, masked)
+                count += len(rows)
+                yield b''.join([dumps(row) + b'\n' for row in rows])
+        except Exception as e:
+            # Statusul a fost deja trimis; putem doar întrerupe fluxul
+            logging.error("Error streaming cards after %s rows: %s", count, e, exc_info=True)
+            return
+        finally:
+            end_request(budget_token)
+        logging.info("Successfully streamed %s cards", count)
+    
+    return Response(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
+
+def encode_card_list(cards, fields, masked, response_format):
+    """Corpul listei de carduri în formatul negociat (json, columnar sau msgpack)
+    
+    Decriptează doar datele sensibile cerute (vederea mascată nu decriptează nimic).
+    """
+    columnar = response_format == 'columnar'
+    rows = decrypt_card_rows(cards, fields, masked, layout='row' if columnar else 'object')
+    logging.info("Successfully fetched %s cards (%s)", len(rows), 'masked' if masked else 'decrypted')
+    with metrics.stage('serialize'):
+        if columnar:
+            return encode({"columns": list(public_fields(fields)), "rows": rows}, response_format)
+        return encode(rows, response_format)
+
+def parse_changes_args(req, config):
+    """Extrage poziția (?since= sau Last-Event-ID la reconectarea SSE) și limita fluxului de modificări"""
+    errors = {}
+    after = None
+    since = req.headers.get('Last-Event-ID') or req.args.get('since')
+    if since:
+        try:
+            after = decode_cursor(since)
+        except ValueError:
+            errors['since'] = "Token de sincronizare invalid"
+    
+    limit = config.get('CHANGES_PAGE_SIZE', 500)
+    max_limit = config.get('CARDS_MAX_PAGE_SIZE', 1000)
+    if req.args.get('limit'):
+        try:
+            limit = int(req.args['limit'])
+            if limit < 1 or limit > max_limit:
+                raise ValueError()
+        except ValueError:
+            errors['limit'] = f"Limita trebuie să fie un număr între 1 și {max_limit}"
+    
+    if errors:
+        raise ValueError(errors)
+    return after, limit
+
+def wants_event_stream(req):
+    """Clientul (EventSource) a cerut modificările ca Server-Sent Events"""
+    return req.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream'
+
+def read_changes(after, limit, fields, masked, columns):
+    """O pagină din fluxul de modificări: (corpul răspunsului, poziția următoare)
+    
+    Doar rândurile modificate sunt decriptate (și doar câmpurile sensibile cerute).
+    """
+    cards, deleted, position, has_more = change_feed.read(after, limit, columns)
+    return {
+        "changes": decrypt_card_rows(cards, fields, masked),
+        "deleted": deleted,
+        "next": encode_cursor(*position),
+        "has_more": has_more
+    }, position
+
+def sse_event(event, data, event_id=None):
+    """Un eveniment Server-Sent Events cu date JSON (orjson nu produce linii noi)"""
+    header = f"event: {event}\n" + (f"id: {event_id}\n" if event_id else "")
+    return header.encode('utf-8') + b'data: ' + dumps(data) + b'\n\n'
+
+def changes_expired_response(error):
+    """410: poziția este mai veche decât jurnalul ștergerilor, clientul trebuie să reia de la zero"""
+    return jsonify({"error": "Sync token expired", "details": str(error)}), 410
+
+def stream_changes(after, limit, fields, masked, columns):
+    """Trimite modificările ca Server-Sent Events, pe măsură ce apar
+    
+    Evenimentele `changes` au ca id poziția următoare, deci EventSource reia fluxul de unde
+    a rămas după o reconectare (Last-Event-ID); `reset` cere o resincronizare completă.
+    Conexiunea se închide după CHANGES_STREAM_MAX_DURATION secunde.
+    """
+    config = current_app.config
+    poll_interval = config.get('CHANGES_POLL_INTERVAL', 1.0)
+    keepalive = config.get('CHANGES_STREAM_KEEPALIVE', 15.0)
+    max_duration = config.get('CHANGES_STREAM_MAX_DURATION', 300.0)
+    
+    def generate():
+        position = after
+        events = 0
+        # Ca la exportul în flux: fără buget de operații RSA pe durata conexiunii
+        budget_token = begin_request(None)
+        started = last_sent = time.monotonic()
+        try:
+            while True:
+                version = change_feed.version
+                try:
+                    body, position = read_changes(position, limit, fields, masked, columns)
+                except ChangesExpiredError as e:
+                    yield sse_event('reset', {"error": "Sync token expired", "details": str(e)})
+                    return
+                now = time.monotonic()
+                if body['changes'] or body['deleted']:
+                    events += 1
+                    last_sent = now
+                    yield sse_event('changes', body, body['next'])
+                elif now - last_sent >= keepalive:
+                    last_sent = now
+                    yield b': keep-alive\n\n'
+                if body['has_more']:
+                    continue
+                if now - started >= max_duration:
+                    return
+                change_feed.wait(version, poll_interval)
+        except Exception as e:
+            logging.error("Error streaming card changes after %s events: %s", events, e, exc_info=True)
+        finally:
+            end_request(budget_token)
+    
+    response = Response(stream_with_context(generate()), status=200, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Proxy-urile (nginx) nu trebuie să țină evenimentele în buffer
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def cards_changed(card_id=None):
+    """După o scriere: invalidează cache-ul listei (și al cardului) și trezește abonații fluxului"""
+    response_cache.invalidate(['cards', f"card:{card_id}"] if card_id is not None else ['cards'])
+    change_feed.notify()
+
+def clean_card_data(data):
+    """Normalizează datele validate ale unui card înainte de criptare"""
+    return {
+        'card_holder_name': data['card_holder_name'].strip(),
+        'card_number': data['card_number'].replace(' ', ''),
+        **CardValidator.public_fields(data['card_number']),
+        'card_number_index': encryption_service.number_index(data['card_number']),
+        'expiry_date': data['expiry_date'].strip(),
+        'cvv': str(data['cvv']).strip(),
+        'card_type': data['card_type'].lower().strip(),
+        'encryption_type': data['encryption_type'].lower().strip()
+    }
+
+def duplicate_card_response(card_id=None):
+    """Răspunsul 409 pentru un număr de card deja existent (CARDS_UNIQUE_NUMBER)"""
+    body = {
+        "error": "Duplicate card",
+        "details": {"card_number": "Numărul cardului există deja"}
+    }
+    if card_id is not None:
+        body["id"] = card_id
+    return jsonify(body), 409
+
+def parse_bulk_body(req):
+    """Citește înregistrările pentru importul în lot (array JSON sau NDJSON)
+    
+    Liniile NDJSON invalide devin instanțe ValueError, raportate per rând.
+    """
+    if req.mimetype == 'application/x-ndjson':
+        records = []
+        for line in req.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(ValueError(f"JSON invalid: {str(e)}"))
+        return records
+    
+    data = req.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Corpul cererii trebuie să fie un array JSON sau NDJSON")
+    return data
+
+def init_services(app, startup):
+    """Creează serviciile folosite de rute (apelat de Startup: la pornire, la prima cerere sau în fundal)"""
+    global db_service, encryption_service, response_cache, change_feed
     try:
-        global db_service, encryption_service
-        db_service = DatabaseService(app.config)
-        encryption_service = EncryptionService(app.config)
+        with startup.phase('encryption'):
+            encryption_service = EncryptionService(app.config)
+        with startup.phase('storage'):
+            db_service = create_storage(app.config)
+        response_cache = ResponseCache(app.config)
+        change_feed = ChangeFeed(db_service, app.config)
+        app.extensions['db_service'] = db_service
+        app.extensions['response_cache'] = response_cache
+        app.extensions['change_feed'] = change_feed
+        app.extensions['admission'] = encryption_service.admission
+        
+        # Re-criptare opțională în fundal (rotația cheilor fără oprirea aplicației)
+        if app.config.get('REENCRYPT_IN_BACKGROUND'):
+            reencryption_service = ReencryptionService(db_service, encryption_service, app.config,
+                                                       response_cache)
+            reencryption_service.start_background()
+            app.extensions['reencryption_service'] = reencryption_service
     except Exception as e:
-        logging.error(f"Eroare la inițializarea serviciilor: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Eroare la inițializarea serviciilor: %s", e, exc_info=True)
         raise
+
+def shutdown_services(app):
+    """Oprește serviciile unui worker (re-criptarea în fundal, pool-ul RSA, conexiunile)"""
+    reencryption_service = app.extensions.get('reencryption_service')
+    if reencryption_service:
+        reencryption_service.stop(timeout=5)
+    if app.extensions['startup'].ready:
+        encryption_service.shutdown()
+        db_service.close()
+
+def not_ready_response(startup):
+    """503 cât timp serviciile nu sunt inițializate (pornire lazy/background sau bază indisponibilă)"""
+    response = jsonify({"error": "Service not ready", "details": startup.status()})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, int(startup.retry_interval)))
+    return response
+
+def overloaded_response(error):
+    """503 când controlul de admitere respinge operațiile RSA ale cererii"""
+    response = jsonify({
+        "error": "Service overloaded",
+        "details": {"reason": error.reason, "message": str(error)}
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def init_routes(app):
+    startup = app.extensions['startup']
+    
+    @card_bp.before_request
+    def require_services():
+        if not startup.ensure():
+            return not_ready_response(startup)
     
     @card_bp.route('', methods=['GET'])
     def get_cards():
         """Obține toate cardurile"""
         try:
-            logging.info("Attempting to fetch all cards")
-            # Obține cardurile din baza de date
-            cards = db_service.get_cards()
+            logging.info("Attempting to fetch cards")
+            try:
+                limit, filters = parse_list_args(request.args, current_app.config)
+                fields, masked = parse_projection(request.args, current_app.config)
+                filters['columns'] = projection_columns(fields, masked)
+                # NDJSON (flux) sau un format negociat prin ?format= / Accept
+                stream = wants_stream(request)
+                response_format = 'ndjson' if stream else negotiate_format(request)
+                if stream:
+                    batch_size = parse_batch_size(request.args, current_app.config)
+            except ValueError as e:
+                return jsonify({"error": "Invalid query parameters", "details": e.args[0]}), 400
+            
+            # ETag din (număr rânduri, max(updated_at), max(id)): o interogare pe indexuri,
+            # fără decriptare; dacă clientul are deja versiunea curentă răspundem 304
+            if not stream:
+                cache_key = f"cards|{response_format}|{request.full_path}"
+                cached = response_cache.get(cache_key, ['cards'])
+                if cached is not None:
+                    return cached_response(cached)
+                cache_versions = response_cache.versions(['cards'])
+            
+            etag = make_etag('cards', *db_service.get_cards_version(), response_format)
+            if request.if_none_match.contains_weak(etag):
+                return with_etag(current_app.response_class(status=304), etag)
+            
+            if stream:
+                # Exportul în flux nu are limită implicită de pagină
+                return with_etag(stream_cards(limit if request.args.get('limit') else None, filters,
+                                              fields, masked, batch_size), etag)
+            
+            # Cerem un rând în plus pentru a ști dacă există o pagină următoare
+            cards = db_service.get_cards(limit=limit + 1, **filters)
+            next_cursor = None
+            if len(cards) > limit:
+                cards = cards[:limit]
+                next_cursor = encode_cursor(cards[-1].created_at, cards[-1].id)
+            
             if not cards:
                 logging.info("No cards found in database")
-                return jsonify([]), 200
             
-            # Decriptează datele sensibile
-            decrypted_cards = []
-            for card in cards:
-                try:
-                    decrypted_card = dict(card)
-                    if card.get('card_number'):
-                        decrypted_card['card_number'] = encryption_service.decrypt(
-                            card['card_number'], card['encryption_type']
-                        )
-                        # Adaugă spații pentru lizibilitate (XXXX XXXX XXXX XXXX)
-                        decrypted_card['card_number'] = ' '.join([
-                            decrypted_card['card_number'][i:i+4] 
-                            for i in range(0, len(decrypted_card['card_number']), 4)
-                        ])
-                    
-                    if card.get('cvv'):
-                        decrypted_card['cvv'] = encryption_service.decrypt(
-                            card['cvv'], card['encryption_type']
-                        )
-                    
-                    # Convertește timestamp-urile la string pentru JSON
-                    if isinstance(card.get('created_at'), str):
-                        decrypted_card['created_at'] = card['created_at']
-                    else:
-                        decrypted_card['created_at'] = card['created_at'].isoformat() if card.get('created_at') else None
-                    
-                    if isinstance(card.get('updated_at'), str):
-                        decrypted_card['updated_at'] = card['updated_at']
-                    else:
-                        decrypted_card['updated_at'] = card['updated_at'].isoformat() if card.get('updated_at') else None
-                    
-                    decrypted_cards.append(decrypted_card)
-                except Exception as e:
-                    logging.error(f"Error decrypting card {card.get('id')}: {str(e)}\n{traceback.format_exc()}")
-                    continue
+            mimetype = FORMATS[response_format]
+            response = current_app.response_class(encode_card_list(cards, fields, masked, response_format),
+                                                  status=200, mimetype=mimetype)
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            response_cache.put(cache_key, cache_versions, response.get_data(),
+                               {'etag': etag, 'next_cursor': next_cursor, 'mimetype': mimetype})
+            return with_etag(response, etag), 200
+            
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except Exception as e:
+            logging.error("Error fetching cards: %s", e, exc_info=True)
+            return jsonify({"error": "Error fetching cards"}), 500
+    
+    @card_bp.route('/changes', methods=['GET'])
+    def get_changes():
+        """Cardurile create sau modificate și ID-urile șterse de la poziția ?since=
+        
+        Fără ?since= fluxul pornește de la început (sincronizarea inițială, pe pagini).
+        Proiecția este cea a listei (?view=, ?fields=); cu Accept: text/event-stream
+        modificările sunt trimise ca Server-Sent Events (doar cu CHANGES_STREAM_ENABLED,
+        altfel 406 și clientul revine la cereri periodice).
+        """
+        try:
+            try:
+                after, limit = parse_changes_args(request, current_app.config)
+                fields, masked = parse_projection(request.args, current_app.config)
+            except ValueError as e:
+                return jsonify({"error": "Invalid query parameters", "details": e.args[0]}), 400
+            # updated_at este citit mereu: din el se calculează poziția următoare
+            columns = projection_columns(fields + ('updated_at',), masked)
+            
+            if wants_event_stream(request):
+                if not current_app.config.get('CHANGES_STREAM_ENABLED'):
+                    return jsonify({
+                        "error": "Event stream disabled",
+                        "details": "Poll this endpoint with ?since= instead"
+                    }), 406
+                return stream_changes(after, limit, fields, masked, columns)
+            
+            body, _ = read_changes(after, limit, fields, masked, columns)
+            logging.info("Fetched %s changed and %s deleted cards", len(body['changes']), len(body['deleted']))
+            response = json_response(body)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+            
+        except ChangesExpiredError as e:
+            return changes_expired_response(e)
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except Exception as e:
+            logging.error("Error fetching card changes: %s", e, exc_info=True)
+            return jsonify({"error": "Error fetching card changes"}), 500
+    
+    @card_bp.route('/lookup', methods=['GET', 'POST'])
+    def lookup_cards():
+        """Caută cardurile după număr prin indexul orb (vederea mascată, fără decriptare)
+        
+        Numărul vine în ?card_number= sau, ca să nu apară în URL/loguri, în corpul JSON (POST).
+        """
+        try:
+            if request.method == 'POST':
+                card_number = (request.get_json(silent=True) or {}).get('card_number')
+            else:
+                card_number = request.args.get('card_number')
+            if not isinstance(card_number, str) or not CardValidator.is_valid_card_number(card_number):
+                return jsonify({
+                    "error": "Invalid query parameters",
+                    "details": {"card_number": "Numărul cardului trebuie să conțină 16 cifre"}
+                }), 400
             
-            logging.info(f"Successfully fetched and decrypted {len(decrypted_cards)} cards")
-            return jsonify(decrypted_cards), 200
+            cards = db_service.find_cards_by_number_index(
+                encryption_service.number_index(card_number),
+                columns=projection_columns(MASKED_FIELDS, True)
+            )
+            response = json_response({"cards": decrypt_card_rows(cards, MASKED_FIELDS, masked=True)})
+            # Rezultatul depinde de numărul cardului; nu se păstrează în cache-uri intermediare
+            response.headers['Cache-Control'] = 'no-store'
+            return response, 200
             
         except Exception as e:
-            logging.error(f"Error fetching cards: {str(e)}\n{traceback.format_exc()}")
-            return jsonify({"error": "Error fetching cards", "details": str(e)}), 500
+            logging.error("Error looking up cards: %s", e, exc_info=True)
+            return jsonify({"error": "Error looking up cards"}), 500
     
     @card_bp.route('/<int:card_id>', methods=['GET'])
     def get_card(card_id):
         """Obține un card după ID"""
         try:
+            cache_key = f"card|{card_id}"
+            cached = response_cache.get(cache_key, [f"card:{card_id}"])
+            if cached is not None:
+                return cached_response(cached)
+            cache_versions = response_cache.versions([f"card:{card_id}"])
+            
+            # Revalidare: doar updated_at, fără a citi sau decripta cardul
+            if request.if_none_match:
+                updated_at = db_service.get_card_version(card_id)
+                if updated_at is None:
+                    return jsonify({"error": "Card negăsit"}), 404
+                etag = make_etag('card', card_id, updated_at)
+                if request.if_none_match.contains_weak(etag):
+                    return with_etag(current_app.response_class(status=304), etag)
+            
             # Obține cardul din baza de date
             card = db_service.get_card_by_id(card_id)
             
             if not card:
                 return jsonify({"error": "Card negăsit"}), 404
             
-            # Decriptează datele sensibile
-            card['card_number'] = encryption_service.decrypt(
-                card['card_number'], card['encryption_type']
-            )
-            card['cvv'] = encryption_service.decrypt(
-                card['cvv'], card['encryption_type']
-            )
+            etag = make_etag('card', card_id, card.updated_at)
+            card_number, cvv = decrypt_card(card)
             
-            # Formatează timestamp-urile pentru JSON
-            card['created_at'] = card['created_at'].isoformat() if card['created_at'] else None
-            card['updated_at'] = card['updated_at'].isoformat() if card['updated_at'] else None
-            
-            return jsonify(card), 200
+            with metrics.stage('serialize'):
+                response = json_response(card_serializer()(card, card_number, cvv))
+            response_cache.put(cache_key, cache_versions, response.get_data(), {'etag': etag})
+            return with_etag(response, etag), 200
             
+        except AdmissionRejected as e:
+            return overloaded_response(e)
         except Exception as e:
-            app.logger.error(f"Eroare la obținerea cardului: {str(e)}")
+            app.logger.error("Eroare la obținerea cardului: %s", e)
             return jsonify({"error": "Eroare la obținerea cardului"}), 500
     
     @card_bp.route('', methods=['POST'])
@@ -106,7 +601,6 @@ def init_routes(app):
         try:
             # Obține datele din cerere
             data = request.get_json()
-            logging.info(f"Received POST request with data: {data}")
             
             if not data:
                 logging.error("No data received in request")
@@ -118,7 +612,7 @@ def init_routes(app):
             # Validează datele
             validation_errors = CardValidator.validate_card_data(data)
             if validation_errors:
-                logging.error(f"Validation errors: {validation_errors}")
+                logging.error("Validation errors: %s", validation_errors)
                 return jsonify({
                     "error": "Validation failed",
                     "details": validation_errors
@@ -127,36 +621,33 @@ def init_routes(app):
             # După validare, criptează datele sensibile
             try:
                 # Curăță datele de intrare
-                card_data = {
-                    'card_holder_name': data['card_holder_name'].strip(),
-                    'card_number': data['card_number'].replace(' ', ''),
-                    'expiry_date': data['expiry_date'].strip(),
-                    'cvv': str(data['cvv']).strip(),
-                    'card_type': data['card_type'].lower().strip(),
-                    'encryption_type': data['encryption_type'].lower().strip()
-                }
+                card_data = clean_card_data(data)
+                card_number, cvv = card_data['card_number'], card_data['cvv']
                 
                 # Criptează datele sensibile
-                card_data['card_number'] = encryption_service.encrypt(
-                    card_data['card_number'],
-                    card_data['encryption_type']
-                )
-                card_data['cvv'] = encryption_service.encrypt(
-                    card_data['cvv'],
-                    card_data['encryption_type']
-                )
+                (card_data['card_number'], card_data['cvv']), card_data['data_key'] = \
+                    encryption_service.encrypt_fields([card_number, cvv], card_data['encryption_type'])
+                card_data['key_id'] = encryption_service.key_id
                 
                 logging.info("Data validated and encrypted successfully")
             except Exception as e:
-                logging.error(f"Error encrypting data: {str(e)}\n{traceback.format_exc()}")
+                logging.error("Error encrypting data: %s", e, exc_info=True)
                 return jsonify({
                     "error": "Error encrypting data",
                     "details": str(e)
                 }), 500
             
-            # Adaugă cardul în baza de date
+            # Cu numere unice, verificarea prin indexul orb evită o eroare de constrângere
+            unique_number = current_app.config.get('CARDS_UNIQUE_NUMBER')
+            if unique_number:
+                owner = db_service.find_number_index_owners([card_data['card_number_index']])
+                if owner:
+                    return duplicate_card_response(owner[card_data['card_number_index']])
+            
+            # Adaugă cardul în baza de date; RETURNING fără textul criptat (valorile în clar sunt aici)
             try:
-                new_card = db_service.create_card(card_data)
+                new_card = db_service.create_card(card_data, columns=projection_columns(LIST_FIELDS, True))
+                cards_changed()
                 if not new_card:
                     logging.error("Database returned None after card creation")
                     return jsonify({
@@ -164,125 +655,198 @@ def init_routes(app):
                         "details": "Database operation failed"
                     }), 500
                 
-                # Decriptează pentru răspuns
-                result = dict(new_card)
-                result['card_number'] = encryption_service.decrypt(
-                    result['card_number'],
-                    result['encryption_type']
-                )
-                result['cvv'] = encryption_service.decrypt(
-                    result['cvv'],
-                    result['encryption_type']
-                )
-                
-                # Format card number for display (add spaces)
-                result['card_number'] = ' '.join([
-                    result['card_number'][i:i+4]
-                    for i in range(0, len(result['card_number']), 4)
-                ])
-                
-                # Formatează timestamp-urile pentru JSON
-                if isinstance(result.get('created_at'), str):
-                    result['created_at'] = result['created_at']
-                else:
-                    result['created_at'] = result['created_at'].isoformat() if result.get('created_at') else None
-                
-                if isinstance(result.get('updated_at'), str):
-                    result['updated_at'] = result['updated_at']
-                else:
-                    result['updated_at'] = result['updated_at'].isoformat() if result.get('updated_at') else None
-                
-                logging.info(f"Successfully created card with ID: {result.get('id')}")
-                return jsonify(result), 201
+                # Răspunsul folosește valorile în clar deja disponibile, fără decriptare
+                logging.info("Successfully created card with ID: %s", new_card.id)
+                return json_response(card_serializer()(new_card, card_number, cvv), 201)
                 
+            except DuplicateCardError:
+                # Inserare concurentă cu același număr, oprită de indexul unic
+                return duplicate_card_response()
             except Exception as e:
-                logging.error(f"Error saving to database: {str(e)}\n{traceback.format_exc()}")
+                logging.error("Error saving to database: %s", e, exc_info=True)
                 return jsonify({
                     "error": "Error saving card",
                     "details": str(e)
                 }), 500
             
         except Exception as e:
-            logging.error(f"Error creating card: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error creating card: %s", e, exc_info=True)
             return jsonify({
                 "error": "Error creating card",
                 "details": str(e)
             }), 500
     
-    @card_bp.route('/<int:card_id>', methods=['PUT'])
-    def update_card(card_id):
-        """Actualizează un card existent"""
+    @card_bp.route('/bulk', methods=['POST'])
+    def create_cards_bulk():
+        """Importă mai multe carduri într-o singură cerere"""
         try:
-            # Verifică dacă cardul există
-            existing_card = db_service.get_card_by_id(card_id)
-            if not existing_card:
-                return jsonify({"error": "Card negăsit"}), 404
+            try:
+                records = parse_bulk_body(request)
+            except ValueError as e:
+                return jsonify({"error": "Invalid request body", "details": str(e)}), 400
+            
+            max_rows = current_app.config.get('BULK_MAX_ROWS', 50000)
+            if len(records) > max_rows:
+                return jsonify({
+                    "error": "Too many records",
+                    "details": f"Maximum {max_rows} records per request"
+                }), 400
+            
+            chunk_size = current_app.config.get('BULK_CHUNK_SIZE', 1000)
+            unique_number = current_app.config.get('CARDS_UNIQUE_NUMBER')
+            # Indexurile orbe din rândurile deja acceptate ale cererii (duplicate în același import)
+            seen_indexes = set()
+            results = [None] * len(records)
+            for start in range(0, len(records), chunk_size):
+                # Validează și curăță rândurile din lot
+                valid = []
+                chunk = records[start:start + chunk_size]
+                for index, (data, validation_errors) in enumerate(zip(chunk, CardValidator.validate_batch(chunk)), start):
+                    if isinstance(data, Exception):
+                        results[index] = {"index": index, "errors": {"record": str(data)}}
+                        continue
+                    if validation_errors:
+                        results[index] = {"index": index, "errors": validation_errors}
+                        continue
+                    valid.append((index, clean_card_data(data)))
+                
+                if unique_number:
+                    owners = db_service.find_number_index_owners(
+                        [card_data['card_number_index'] for _, card_data in valid]
+                    )
+                    accepted = []
+                    for index, card_data in valid:
+                        number_index = card_data['card_number_index']
+                        if number_index in owners or number_index in seen_indexes:
+                            results[index] = {"index": index, "errors": {"card_number": "Numărul cardului există deja"}}
+                            continue
+                        seen_indexes.add(number_index)
+                        accepted.append((index, card_data))
+                    valid = accepted
+                
+                # Criptează lotul
+                encrypted = encryption_service.encrypt_many(
+                    ([card_data['card_number'], card_data['cvv']], card_data['encryption_type'])
+                    for _, card_data in valid
+                )
+                to_insert = []
+                for (index, card_data), outcome in zip(valid, encrypted):
+                    if isinstance(outcome, Exception):
+                        # Detaliile rămân în log; răspunsul per rând nu expune textul excepției
+                        logging.error("Error encrypting bulk record %s: %s", index, outcome)
+                        results[index] = {"index": index, "errors": {"encryption": "Error encrypting data"}}
+                        continue
+                    (card_data['card_number'], card_data['cvv']), card_data['data_key'] = outcome
+                    card_data['key_id'] = encryption_service.key_id
+                    to_insert.append((index, card_data))
+                
+                # O tranzacție (INSERT multi-rând) per lot
+                try:
+                    card_ids = db_service.create_cards([card_data for _, card_data in to_insert])
+                    for (index, _), card_id in zip(to_insert, card_ids):
+                        results[index] = {"index": index, "id": card_id}
+                except Exception as e:
+                    logging.error("Error saving bulk chunk starting at record %s: %s", start, e, exc_info=True)
+                    for index, _ in to_insert:
+                        results[index] = {"index": index, "errors": {"database": "Error saving card"}}
+            
+            created = sum(1 for result in results if 'id' in result)
+            if created:
+                cards_changed()
+            logging.info("Bulk import finished: %s created, %s failed", created, len(results) - created)
+            return jsonify({
+                "created": created,
+                "failed": len(results) - created,
+                "results": results
+            }), 200
             
+        except Exception as e:
+            logging.error("Error importing cards: %s", e, exc_info=True)
+            return jsonify({"error": "Error importing cards"}), 500
+    
+    @card_bp.route('/<int:card_id>', methods=['PUT', 'PATCH'])
+    def update_card(card_id):
+        """Actualizează un card existent (doar câmpurile trimise)"""
+        try:
             # Obține datele din cerere
             data = request.get_json()
+            if not data:
+                return jsonify({"error": "Nu au fost trimise date pentru actualizare"}), 400
             
-            # Validează datele
-            validation_errors = CardValidator.validate_card_data(data)
+            # Validează doar câmpurile prezente
+            validation_errors = CardValidator.validate_card_data(data, partial=True)
             if validation_errors:
                 return jsonify({"errors": validation_errors}), 400
             
-            # După validare, criptează datele sensibile
-            card_data = {
-                'card_holder_name': data['card_holder_name'],
-                'card_number': encryption_service.encrypt(
-                    data['card_number'].replace(' ', ''), data['encryption_type']
-                ),
-                'expiry_date': data['expiry_date'],
-                'cvv': encryption_service.encrypt(data['cvv'], data['encryption_type']),
-                'card_type': data['card_type'],
-                'encryption_type': data['encryption_type']
-            }
-            
-            # Actualizează cardul în baza de date
-            updated_card = db_service.update_card(card_id, card_data)
+            card_data = {}
+            if 'card_holder_name' in data:
+                card_data['card_holder_name'] = data['card_holder_name'].strip()
+            if 'expiry_date' in data:
+                card_data['expiry_date'] = data['expiry_date'].strip()
+            if 'card_type' in data:
+                card_data['card_type'] = data['card_type'].lower().strip()
             
-            if not updated_card:
-                return jsonify({"error": "Eroare la actualizarea cardului"}), 500
+            # Câmpurile sensibile se re-criptează doar dacă au fost trimise (împreună)
+            card_number = cvv = None
+            if 'card_number' in data:
+                card_number = data['card_number'].replace(' ', '')
+                cvv = str(data['cvv']).strip()
+                encryption_type = data['encryption_type'].lower().strip()
+                card_data.update(CardValidator.public_fields(card_number))
+                card_data['card_number_index'] = encryption_service.number_index(card_number)
+                if current_app.config.get('CARDS_UNIQUE_NUMBER'):
+                    owner = db_service.find_number_index_owners([card_data['card_number_index']])
+                    owner_id = owner.get(card_data['card_number_index'])
+                    if owner_id is not None and owner_id != card_id:
+                        return duplicate_card_response(owner_id)
+                (card_data['card_number'], card_data['cvv']), card_data['data_key'] = \
+                    encryption_service.encrypt_fields([card_number, cvv], encryption_type)
+                card_data['encryption_type'] = encryption_type
+                card_data['key_id'] = encryption_service.key_id
             
-            # Decriptează pentru răspuns
-            result = dict(updated_card)
-            result['card_number'] = encryption_service.decrypt(
-                result['card_number'], result['encryption_type']
-            )
-            result['cvv'] = encryption_service.decrypt(
-                result['cvv'], result['encryption_type']
-            )
+            if not card_data:
+                return jsonify({"error": "Nu au fost trimise câmpuri de actualizat"}), 400
             
-            # Formatează timestamp-urile pentru JSON
-            result['created_at'] = result['created_at'].isoformat() if result['created_at'] else None
-            result['updated_at'] = result['updated_at'].isoformat() if result['updated_at'] else None
+            # Un singur UPDATE ... RETURNING; lipsa rândului înseamnă 404. Textul criptat se
+            # întoarce doar dacă trebuie decriptat (numărul nu a fost trimis)
+            updated_card = db_service.update_card(
+                card_id, card_data,
+                columns=projection_columns(LIST_FIELDS, True) if card_number is not None else None
+            )
+            if not updated_card:
+                return jsonify({"error": "Card negăsit"}), 404
+            cards_changed(card_id)
             
-            return jsonify(result), 200
+            # Valorile în clar sunt deja disponibile dacă numărul a fost trimis
+            if card_number is None:
+                card_number, cvv = decrypt_card(updated_card)
+            return json_response(card_serializer()(updated_card, card_number, cvv))
             
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except DuplicateCardError:
+            return duplicate_card_response()
         except Exception as e:
-            app.logger.error(f"Eroare la actualizarea cardului: {str(e)}")
+            app.logger.error("Eroare la actualizarea cardului: %s", e)
             return jsonify({"error": "Eroare la actualizarea cardului"}), 500
     
     @card_bp.route('/<int:card_id>', methods=['DELETE'])
     def delete_card(card_id):
         """Șterge un card"""
         try:
-            # Verifică dacă cardul există
-            existing_card = db_service.get_card_by_id(card_id)
-            if not existing_card:
+            # Un singur DELETE; rowcount 0 înseamnă că nu există cardul
+            if not db_service.delete_card(card_id):
                 return jsonify({"error": "Card negăsit"}), 404
-            
-            # Șterge cardul din baza de date
-            success = db_service.delete_card(card_id)
-            
-            if not success:
-                return jsonify({"error": "Eroare la ștergerea cardului"}), 500
+            cards_changed(card_id)
             
             return jsonify({"message": "Card șters cu succes"}), 200
             
         except Exception as e:
-            app.logger.error(f"Eroare la ștergerea cardului: {str(e)}")
+            app.logger.error("Eroare la ștergerea cardului: %s", e)
             return jsonify({"error": "Eroare la ștergerea cardului"}), 500
     
     # Înregistrează blueprint-ul
-    app.register_blueprint(card_bp, url_prefix='/api/cards')
\ No newline at end of file
+    app.register_blueprint(card_bp, url_prefix='/api/cards')
+    
+    # Serviciile sunt create acum (eager), la prima cerere (lazy) sau în fundal
+    startup.start(lambda: init_services(app, startup))
\ No newline at end of file
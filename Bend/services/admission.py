@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from services.metrics import metrics
+
+# Bugetul de operații RSA al cererii curente (None în afara cererilor: CLI, fire de fundal)
+_request_budget = ContextVar('bcard_rsa_budget', default=None)
+
+
+class AdmissionRejected(Exception):
+    """Operația nu a fost admisă (coadă plină, așteptare prea lungă sau buget depășit)"""
+
+    def __init__(self, reason, retry_after, message):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Budget:
+    __slots__ = ('limit', 'used')
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+
+
+def begin_request(limit):
+    """Începe contorizarea operațiilor RSA pentru cererea curentă; întoarce un token"""
+    return _request_budget.set(_Budget(limit) if limit else None)
+
+
+def end_request(token):
+    try:
+        _request_budget.reset(token)
+    except ValueError:
+        _request_budget.set(None)
+
+
+class AdmissionController:
+    """Control de admitere pentru operațiile cu cheia privată RSA
+
+    - cel mult RSA_MAX_CONCURRENT apeluri RSA (individuale sau în lot) rulează simultan
+    - cel mult RSA_MAX_QUEUE apeluri așteaptă un loc, fiecare cel mult RSA_MAX_WAIT secunde
+    - o cerere poate consuma cel mult RSA_REQUEST_BUDGET operații RSA
+
+    Depășirea oricărei limite ridică AdmissionRejected înainte de orice operație RSA,
+    tradusă de rute în 503 cu Retry-After.
+    """
+
+    def __init__(self, config):
+        self.enabled = config.get('ADMISSION_ENABLED', True)
+        self.max_concurrent = config.get('RSA_MAX_CONCURRENT') or os.cpu_count() or 1
+        self.max_queue = config.get('RSA_MAX_QUEUE', 32)
+        self.max_wait = config.get('RSA_MAX_WAIT', 0.5)
+        self.retry_after = config.get('ADMISSION_RETRY_AFTER', 1)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+
+    def _reject(self, reason, message):
+        metrics.inc('bcard_admission_rejected_total', 1, (('reason', reason),))
+        raise AdmissionRejected(reason, self.retry_after, message)
+
+    def _check_budget(self, operations):
+        """Bugetul cererii curente, dacă mai are loc pentru `operations` (None în afara unei cereri)"""
+        budget = _request_budget.get()
+        if budget is None or not self.enabled:
+            return None
+        if budget.used + operations > budget.limit:
+            self._reject('budget', f"Cererea depășește bugetul de {budget.limit} operații RSA")
+        return budget
+
+    def charge(self, operations):
+        """Scade operațiile din bugetul cererii curente (fără efect în afara unei cereri)"""
+        budget = self._check_budget(operations)
+        if budget is not None:
+            budget.used += operations
+
+    @contextmanager
+    def admit(self, operations=1):
+        """Rulează blocul ca un apel RSA: verifică bugetul, ocupă un loc de execuție, apoi
+        scade operațiile din buget (un apel respins de coadă nu consumă bugetul cererii)"""
+        if not self.enabled:
+            yield
+            return
+        # Verificare fără consum: o cerere fără buget nu mai așteaptă un loc
+        self._check_budget(operations)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    queue_full = True
+                else:
+                    queue_full = False
+                    self._waiting += 1
+            if queue_full:
+                self._reject('queue_full', "Prea multe operații RSA în așteptare")
+            started = time.perf_counter()
+            try:
+                acquired = self._slots.acquire(timeout=self.max_wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            metrics.observe('bcard_admission_wait_seconds', time.perf_counter() - started)
+            if not acquired:
+                self._reject('timeout', f"Niciun loc RSA liber în {self.max_wait} s")
+        try:
+            self.charge(operations)
+        except AdmissionRejected:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'max_queue': self.max_queue
+            }
+
+
+metrics.describe('bcard_admission_rejected_total', 'counter',
+                 'Operatii RSA respinse de controlul de admitere, pe motiv (budget, queue_full, timeout)')
+metrics.describe('bcard_admission_wait_seconds', 'histogram',
+                 'Timpul de asteptare pentru un loc RSA liber')
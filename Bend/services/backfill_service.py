@@ -0,0 +1,54 @@
+import logging
+from utils.validators import CardValidator
+
+
+class DerivedFieldsBackfillService:
+    """Completează last4/brand și indexul orb pentru cardurile create înainte de migrările 006/007
+
+    Fiecare lot decriptează doar numărul cardului. Rândurile deja completate nu mai
+    sunt selectate, deci o rulare întreruptă poate fi reluată fără checkpoint. Rândurile
+    completate primesc un updated_at nou; dacă există response_cache, după fiecare lot sunt
+    invalidate lista și cardurile actualizate (vederea mascată se schimbă odată cu last4).
+    """
+
+    def __init__(self, db_service, encryption_service, config, response_cache=None):
+        self.db_service = db_service
+        self.encryption_service = encryption_service
+        self.response_cache = response_cache
+        self.batch_size = config.get('BACKFILL_BATCH_SIZE', 500)
+
+    def run(self, max_rows=None):
+        """Rulează până la capăt (sau până la max_rows); întoarce statisticile"""
+        stats = {'processed': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        last_id = 0
+        while max_rows is None or stats['processed'] < max_rows:
+            limit = self.batch_size if max_rows is None else min(self.batch_size, max_rows - stats['processed'])
+            cards = self.db_service.get_cards_to_backfill(last_id, limit)
+            if not cards:
+                break
+
+            plaintexts = self.encryption_service.decrypt_many([
+                (card['card_number'], card['encryption_type'], card.get('data_key'), card.get('key_id'))
+                for card in cards
+            ])
+            updates = []
+            for card, card_number in zip(cards, plaintexts):
+                if isinstance(card_number, Exception) or not card_number:
+                    logging.error("Error decrypting card %s for backfill: %s", card['id'], card_number)
+                    stats['failed'] += 1
+                    continue
+                updates.append({'id': card['id'], 'updated_at': card['updated_at'],
+                                'card_number_index': self.encryption_service.number_index(card_number),
+                                **CardValidator.public_fields(card_number)})
+
+            updated_ids = self.db_service.update_derived_fields(updates)
+            if updated_ids and self.response_cache is not None:
+                self.response_cache.invalidate(['cards'] + [f"card:{card_id}" for card_id in updated_ids])
+            last_id = cards[-1]['id']
+            stats['processed'] += len(cards)
+            stats['updated'] += len(updated_ids)
+            # Rânduri modificate concurent; scrierea lor a completat deja câmpurile derivate
+            stats['skipped'] += len(updates) - len(updated_ids)
+            logging.info("Backfilled derived fields up to id %s (%s updated, %s failed)", last_id, stats['updated'], stats['failed'])
+
+        return stats
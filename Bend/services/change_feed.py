@@ -0,0 +1,64 @@
+import threading
+from datetime import timedelta
+from heapq import merge
+
+
+class ChangesExpiredError(Exception):
+    """Poziția clientului este mai veche decât jurnalul ștergerilor (resincronizare completă)"""
+
+
+class ChangeFeed:
+    """Fluxul de modificări al tabelei cards (GET /api/cards/changes)
+
+    Poziția este perechea (timestamp, id) a ultimului eveniment trimis; cardurile
+    (updated_at) și ștergerile (deleted_at) sunt interclasate în ordinea (timestamp, id),
+    unică pentru că un ID șters nu mai apare în tabelă. Când pagina nu mai are
+    continuare, poziția avansează până la orizontul backend-ului.
+
+    Abonații (Server-Sent Events) așteaptă cu wait(); scrierile din acest proces îi
+    trezesc prin notify(), cele din alți workeri sunt văzute la următoarea interogare.
+    """
+
+    def __init__(self, storage, config):
+        self.storage = storage
+        self.retention = timedelta(seconds=config.get('CHANGES_TOMBSTONE_RETENTION', 7 * 24 * 3600))
+        self._cond = threading.Condition()
+        self._version = 0
+
+    def read(self, after=None, limit=500, columns=None):
+        """(carduri, ID-uri șterse, poziția următoare, mai există pagini)
+
+        Ridică ChangesExpiredError dacă ștergerile de după `after` ar putea lipsi din jurnal.
+        """
+        cards, deletions, horizon = self.storage.get_changes(after, limit + 1, columns)
+        if after is not None and after[0] < horizon - self.retention:
+            raise ChangesExpiredError(f"Poziția {after[0].isoformat()} este mai veche decât jurnalul ștergerilor")
+        events = list(merge(
+            (((card.updated_at, card.id), card) for card in cards),
+            (((deleted_at, card_id), None) for card_id, deleted_at in deletions),
+            key=lambda event: event[0]
+        ))
+        has_more = len(events) > limit
+        events = events[:limit]
+        if has_more:
+            position = events[-1][0]
+        else:
+            position = max(tuple(after), (horizon, 0)) if after else (horizon, 0)
+        changed = [card for _, card in events if card is not None]
+        deleted = [key[1] for key, card in events if card is None]
+        return changed, deleted, position, has_more
+
+    @property
+    def version(self):
+        return self._version
+
+    def notify(self):
+        """Trezește abonații după o scriere din acest proces"""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    def wait(self, version, timeout):
+        """Așteaptă o scriere ulterioară lui `version` (cel mult `timeout` secunde)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version != version, timeout)
@@ -0,0 +1,91 @@
+import zlib
+from services.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # fără brotli se oferă doar gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'application/msgpack',
+    'application/vnd.bcard.columnar+json', 'text/plain', 'text/html'
+))
+
+
+class ResponseCompressor:
+    """Compresie gzip/brotli negociată prin Accept-Encoding (hook after_request)
+
+    - răspunsurile obișnuite sunt comprimate doar peste COMPRESSION_MIN_SIZE octeți
+    - fluxurile (NDJSON) sunt comprimate incremental: fiecare bucată trimisă de generator
+      este comprimată și golită (sync flush), deci clientul o poate decomprima imediat
+    - ETag-ul devine slab (W/"..."), reprezentarea comprimată nefiind identică octet cu octet
+    """
+
+    def __init__(self, config):
+        self.enabled = config.get('COMPRESSION_ENABLED', True)
+        self.min_size = config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = config.get('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = config.get('COMPRESSION_BROTLI_QUALITY', 4)
+
+    def negotiate(self, accept_encodings):
+        """'br', 'gzip' sau None, după preferințele clientului (la egalitate, brotli)"""
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        best = max(candidates, key=lambda encoding: accept_encodings[encoding])
+        return best if accept_encodings[best] > 0 else None
+
+    def _compressor(self, encoding):
+        """(compress, flush, finish) pentru un flux nou"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_stream(self, chunks, encoding):
+        """Comprimă un iterabil de bucăți; închide sursa la final (sau la deconectarea clientului)"""
+        compress, flush, finish = self._compressor(encoding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compress(chunk) + flush()
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def process(self, response, accept_encodings):
+        """Comprimă răspunsul dacă este cazul; accept_encodings vine din request.accept_encodings"""
+        if not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code < 200 or response.status_code in (204, 304) or \
+                response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return response
+        encoding = self.negotiate(accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            with metrics.stage('compress'):
+                response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,274 @@
+import os
+import time
+import threading
+import logging
+import weakref
+from collections import deque
+import psycopg2
+from psycopg2 import extensions
+from services.metrics import metrics
+
+
+class PoolTimeoutError(Exception):
+    """Nu s-a putut obține o conexiune din pool în timpul permis"""
+
+
+# Pool-urile în viață din acest proces; referințele slabe nu țin în viață pool-urile
+# abandonate (benchmark-uri, reîncercări la pornire)
+_pools = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for pool in list(_pools):
+        pool._after_fork()
+
+
+# Workerii WSGI pre-fork moștenesc socket-urile părintelui; copilul trebuie să își deschidă
+# propriile conexiuni. Un singur hook pentru toate pool-urile (hook-urile nu pot fi șterse)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class ConnectionPool:
+    """Pool limitat de conexiuni PostgreSQL, sigur pentru fire de execuție și fork"""
+
+    # Fereastra (în secunde) folosită pentru calculul checkout-urilor pe secundă
+    RATE_WINDOW = 60
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=5.0,
+                 max_idle=300.0, check_after=5.0):
+        if max_size < 1:
+            raise ValueError("Dimensiunea maximă a pool-ului trebuie să fie cel puțin 1")
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._closed = False
+        self._reset()
+        _pools.add(self)
+
+    def _reset(self):
+        """Inițializează starea internă pentru procesul curent"""
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._warm = False
+        self._started_at = time.monotonic()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._rate_buckets = deque(maxlen=self.RATE_WINDOW)
+
+    def _after_fork(self):
+        # Conexiunile moștenite aparțin părintelui: nu le închidem (ar trimite
+        # Terminate pe socket-ul partajat), doar renunțăm la ele
+        self._reset()
+        logging.info("Connection pool re-created after fork in process %s", self._pid)
+
+    def _connect(self):
+        with metrics.stage('db_connect'):
+            return psycopg2.connect(**self.connect_kwargs)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logging.error("Error closing pooled connection: %s", e)
+
+    def _is_alive(self, conn, idle_since):
+        """Verifică dacă o conexiune din pool mai poate fi folosită"""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _warm_up(self):
+        """Deschide conexiunile minime pentru procesul curent
+
+        Pool-ul este marcat ca pregătit doar după reușită; o eroare este reîncercată
+        la următorul acquire().
+        """
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.min_size:
+                    break
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+        self._warm = True
+
+    def _record_checkout(self, waited):
+        now = time.monotonic()
+        self._checkouts += 1
+        self._wait_total += waited
+        if waited > self._wait_max:
+            self._wait_max = waited
+        second = int(now)
+        if self._rate_buckets and self._rate_buckets[-1][0] == second:
+            self._rate_buckets[-1][1] += 1
+        else:
+            self._rate_buckets.append([second, 1])
+
+    def acquire(self, timeout=None):
+        """Obține o conexiune din pool, așteptând cel mult `timeout` secunde"""
+        if self._pid != os.getpid():
+            self._after_fork()
+        if self._closed:
+            raise psycopg2.InterfaceError("Connection pool is closed")
+        if not self._warm:
+            self._warm_up()
+
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        conn = None
+        idle_since = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: refolosim conexiunea cea mai recentă
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {timeout}s waiting for a database connection "
+                        f"(max_size={self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self._record_checkout(time.monotonic() - start)
+
+        try:
+            if conn is not None and not self._is_alive(conn, idle_since):
+                logging.warning("Discarding dead pooled connection")
+                self._close_quietly(conn)
+                with self._cond:
+                    self._discarded += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard=False):
+        """Returnează o conexiune în pool (sau o închide dacă este stricată)"""
+        if self._pid != os.getpid():
+            # Conexiune obținută înainte de fork; nu aparține acestui pool
+            return
+
+        if not discard and not conn.closed:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        if discard or conn.closed or self._closed:
+            self._close_quietly(conn)
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                if discard:
+                    self._discarded += 1
+                self._cond.notify()
+            return
+
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, now))
+            # Închide conexiunile inactive prea vechi peste dimensiunea minimă
+            while (self._idle and self._size > self.min_size
+                   and now - self._idle[0][1] > self.max_idle):
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+            self._cond.notify()
+        for old_conn in expired:
+            self._close_quietly(old_conn)
+
+    def clear_idle(self):
+        """Închide conexiunile inactive (de exemplu după căderea serverului); pool-ul rămâne deschis"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def close(self):
+        """Închide toate conexiunile inactive și refuză checkout-uri noi"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    @property
+    def in_use(self):
+        """Conexiunile folosite acum în procesul curent (fără lock: o valoare orientativă)"""
+        return self._in_use if self._pid == os.getpid() else 0
+
+    def stats(self):
+        """Returnează statisticile pool-ului pentru procesul curent"""
+        with self._cond:
+            now = time.monotonic()
+            window_start = int(now) - self.RATE_WINDOW
+            recent = sum(count for second, count in self._rate_buckets if second > window_start)
+            elapsed = min(self.RATE_WINDOW, max(now - self._started_at, 1.0))
+            return {
+                'pid': self._pid,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'checkouts_per_second': round(recent / elapsed, 3),
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'wait_time_total': round(self._wait_total, 6),
+                'wait_time_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                'wait_time_max': round(self._wait_max, 6),
+            }
@@ -1,14 +1,177 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.errors
+from psycopg2.extras import RealDictCursor, execute_values
+from collections import OrderedDict
 from contextlib import contextmanager
+import functools
+import inspect
 import logging
-import traceback
+import uuid
+from datetime import datetime
+from models.card import Card
+from services import replica_router
+from services.connection_pool import ConnectionPool, PoolTimeoutError
+from services.metrics import metrics
+from services.queries import positional, render, statement_name
+from services.replica_router import ReplicaRouter, ReplicaUnavailableError
+from services.storage import CardStorage, DuplicateCardError
 
-class DatabaseService:
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor care înregistrează durata interogărilor (etapa db_query)"""
+    def execute(self, query, vars=None):
+        with metrics.stage('db_query'):
+            return super().execute(query, vars)
+
+class TimedRealDictCursor(RealDictCursor):
+    """Varianta RealDictCursor a lui TimedCursor"""
+    def execute(self, query, vars=None):
+        with metrics.stage('db_query'):
+            return super().execute(query, vars)
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Conexiune care ține minte instrucțiunile pregătite pe server (PREPARE/EXECUTE)
+    
+    Instrucțiunile trăiesc cât sesiunea: supraviețuiesc întoarcerii conexiunii în pool și
+    rollback-ului, dispar odată cu conexiunea (aruncată, expirată sau redeschisă după fork).
+    Peste `max_statements`, cea mai puțin folosită este eliberată (DEALLOCATE).
+    """
+    def __init__(self, dsn, *args, max_statements=100, **kwargs):
+        super().__init__(dsn, *args, **kwargs)
+        self.max_statements = max_statements
+        self.statements = OrderedDict()  # text SQL -> numele instrucțiunii pregătite
+        self.stale = False
+    
+    def execute_prepared(self, cursor, query, params=()):
+        """Rulează `query` (cu parametri %s) prin EXECUTE, pregătind-o la prima folosire"""
+        try:
+            if self.stale:
+                cursor.execute("DEALLOCATE ALL")
+                self.statements.clear()
+                self.stale = False
+                metrics.inc('bcard_db_prepared_statements_total', 1, (('event', 'reset'),))
+            name = self.statements.get(query)
+            if name is None:
+                name = statement_name(query)
+                cursor.execute(f"PREPARE {name} AS {positional(query)}")
+                self.statements[query] = name
+                metrics.inc('bcard_db_prepared_statements_total', 1, (('event', 'prepare'),))
+                if len(self.statements) > self.max_statements:
+                    _, evicted = self.statements.popitem(last=False)
+                    cursor.execute(f"DEALLOCATE {evicted}")
+                    metrics.inc('bcard_db_prepared_statements_total', 1, (('event', 'evict'),))
+            else:
+                self.statements.move_to_end(query)
+            if params:
+                cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+        except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.DuplicatePreparedStatement,
+                psycopg2.errors.FeatureNotSupported):
+            # Sesiunea nu mai corespunde cache-ului (DISCARD ALL venit din afară, un pooler în
+            # fața serverului) sau tabela s-a schimbat sub un plan ("cached plan must not change
+            # result type"): după rollback, următoarea interogare pornește de la zero
+            self.stale = True
+            raise
+
+def replica_read(method):
+    """Reia o dată citirea (pe primar sau pe altă replică) dacă replica a căzut în timpul ei
+    
+    Un generator este reluat doar dacă nu a produs încă niciun rând.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator(self, *args, **kwargs):
+            started = False
+            try:
+                for item in method(self, *args, **kwargs):
+                    started = True
+                    yield item
+            except ReplicaUnavailableError:
+                if started:
+                    raise
+                yield from method(self, *args, **kwargs)
+        return generator
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except ReplicaUnavailableError:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class DatabaseService(CardStorage):
+    """Backend-ul PostgreSQL (implicit), cu pool de conexiuni
+    
+    Cu DB_REPLICA_HOSTS, citirile care tolerează o mică întârziere (listare, card după ID,
+    versiunile pentru ETag, căutarea după index) merg la replici; scrierile, loturile de
+    re-criptare/completare și citirile de după o scriere a clientului merg la primar.
+    """
+    
+    # Expresia indexată (YYYYMM) folosită pentru filtrele pe data expirării (MM/YYYY)
+    EXPIRY_SORT_KEY = "(substring(expiry_date from 4 for 4) || substring(expiry_date from 1 for 2))"
+    
     def __init__(self, config):
         self.config = config
+        self.pool = self._create_pool(config['DB_HOST'], config['DB_PORT'])
+        # Replicile nu deschid conexiuni la pornire: una oprită nu blochează aplicația
+        self.replicas = None
+        if config.get('DB_REPLICA_HOSTS'):
+            self.replicas = ReplicaRouter(
+                [(host, self._create_pool(*self._parse_endpoint(host, config['DB_PORT']), replica=True))
+                 for host in config['DB_REPLICA_HOSTS']],
+                strategy=config.get('DB_REPLICA_STRATEGY', 'round_robin'),
+                max_lag=config.get('DB_REPLICA_MAX_LAG', 5.0),
+                check_interval=config.get('DB_REPLICA_CHECK_INTERVAL', 5.0),
+                retry_after=config.get('DB_REPLICA_RETRY_AFTER', 30.0)
+            )
+            if config.get('DB_READ_YOUR_WRITES_WINDOW', 5.0) < self.replicas.max_lag:
+                logging.warning("DB_READ_YOUR_WRITES_WINDOW is shorter than DB_REPLICA_MAX_LAG; "
+                                "clients may not see their own writes on a lagging replica")
         # Test connection on initialization
         self.test_connection()
+    
+    @staticmethod
+    def _parse_endpoint(endpoint, default_port):
+        """'host', 'host:port', '[ipv6]' sau '[ipv6]:port' -> (host, port)
+        
+        O adresă IPv6 fără paranteze (mai multe ':') este luată întreagă, cu portul implicit.
+        """
+        if endpoint.startswith('['):
+            host, separator, rest = endpoint[1:].partition(']')
+            if not separator or (rest and not rest.startswith(':')):
+                raise ValueError(f"Invalid database endpoint: {endpoint}")
+            port = rest[1:]
+        elif endpoint.count(':') == 1:
+            host, _, port = endpoint.partition(':')
+        else:
+            host, port = endpoint, ''
+        return host, int(port) if port else default_port
+    
+    def _create_pool(self, host, port, replica=False):
+        config = self.config
+        connect_kwargs = {
+            'host': host,
+            'port': port,
+            'dbname': config['DB_NAME'],
+            'user': config['DB_USER'],
+            'password': config['DB_PASSWORD'],
+            'cursor_factory': TimedCursor
+        }
+        if config.get('DB_PREPARED_STATEMENTS', True):
+            connect_kwargs['connection_factory'] = functools.partial(
+                PreparedConnection, max_statements=config.get('DB_PREPARED_STATEMENTS_MAX', 100)
+            )
+        if replica:
+            connect_kwargs['connect_timeout'] = config.get('DB_REPLICA_CONNECT_TIMEOUT', 2)
+        return ConnectionPool(
+            connect_kwargs,
+            min_size=0 if replica else config.get('DB_POOL_MIN_SIZE', 1),
+            max_size=config.get('DB_POOL_MAX_SIZE', 10),
+            timeout=config.get('DB_POOL_TIMEOUT', 5.0),
+            max_idle=config.get('DB_POOL_MAX_IDLE', 300.0),
+            check_after=config.get('DB_POOL_CHECK_AFTER', 5.0)
+        )
         
     def test_connection(self):
         """Testează conexiunea la baza de date"""
@@ -18,146 +181,427 @@ class DatabaseService:
                     cursor.execute('SELECT 1')
             logging.info("Database connection successful")
         except Exception as e:
-            logging.error(f"Database connection failed: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Database connection failed: %s", e, exc_info=True)
             raise
     
+    def _acquire(self, read_only):
+        """(pool, replică sau None, conexiune); o replică inaccesibilă cedează primarului"""
+        replica = None
+        if read_only and self.replicas is not None and not replica_router.reads_pinned():
+            replica = self.replicas.choose()
+        if replica is not None:
+            try:
+                return replica.pool, replica, replica.pool.acquire()
+            except PoolTimeoutError as e:
+                # Replica este doar ocupată: citirea aceasta merge la primar
+                logging.warning("Replica %s pool exhausted, reading from the primary: %s", replica.name, e)
+            except psycopg2.Error as e:
+                self.replicas.mark_down(replica, e)
+        return self.pool, None, self.pool.acquire()
+    
     @contextmanager
-    def get_connection(self):
-        """Context manager pentru conexiunea la baza de date"""
-        connection = None
-        try:
-            connection = psycopg2.connect(
-                host=self.config['DB_HOST'],
-                port=self.config['DB_PORT'],
-                dbname=self.config['DB_NAME'],
-                user=self.config['DB_USER'],
-                password=self.config['DB_PASSWORD']
-            )
+    def get_connection(self, read_only=False):
+        """Context manager pentru conexiunea la baza de date (din pool)
+        
+        read_only=True permite o replică (dacă există și clientul nu a scris recent).
+        """
+        with metrics.stage('db_acquire'):
+            pool, replica, connection = self._acquire(read_only)
+        discard = False
+        try:
             yield connection
         except Exception as e:
-            logging.error(f"Database connection error: {str(e)}\n{traceback.format_exc()}")
-            if connection:
-                connection.rollback()
+            metrics.error('db')
+            logging.error("Database connection error: %s", e, exc_info=True)
+            # Conexiunile stricate nu se mai întorc în pool
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                discard = True
+                if replica is not None:
+                    self.replicas.mark_down(replica, e)
+                    raise ReplicaUnavailableError(f"Replica {replica.name}: {e}") from e
+            else:
+                try:
+                    connection.rollback()
+                except Exception:
+                    discard = True
             raise
         finally:
-            if connection:
-                try:
-                    connection.close()
-                except Exception as e:
-                    logging.error(f"Error closing connection: {str(e)}")
+            pool.release(connection, discard=discard)
+    
+    def _commit(self, conn):
+        """Confirmă tranzacția și fixează citirile clientului pe primar (read-your-writes)"""
+        conn.commit()
+        replica_router.note_write()
+    
+    def pool_stats(self):
+        """Returnează statisticile pool-ului de conexiuni (și ale replicilor, dacă există)"""
+        stats = self.pool.stats()
+        if self.replicas is not None:
+            stats['replicas'] = self.replicas.stats()
+        return stats
+    
+    def close(self):
+        """Închide conexiunile inactive din pool-uri"""
+        self.pool.close()
+        if self.replicas is not None:
+            self.replicas.close()
+    
+    @staticmethod
+    def _execute(cursor, query, params=()):
+        """Rulează o interogare din registru (services/queries.py)
+        
+        Cu DB_PREPARED_STATEMENTS, interogarea este pregătită pe server la prima folosire pe
+        conexiune, iar apelurile următoare sar peste parsare și (cu planul generic) planificare.
+        """
+        if isinstance(cursor.connection, PreparedConnection):
+            cursor.connection.execute_prepared(cursor, query, params)
+        else:
+            cursor.execute(query, params)
     
-    def get_cards(self):
-        """Obține toate cardurile din baza de date"""
+    def _build_cards_query(self, limit=None, after=None, card_type=None, encryption_type=None,
+                           expires_from=None, expires_to=None, columns=None):
+        """Construiește interogarea de listare (filtre + paginare keyset pe created_at, id)
+        
+        `after` este perechea (created_at, id) a ultimului rând din pagina anterioară,
+        iar `expires_from`/`expires_to` sunt limite inclusive în formatul YYYYMM.
+        `columns` restrânge proiecția (implicit toate coloanele din CARD_COLUMNS).
+        """
+        conditions = []
+        params = []
+        if card_type:
+            conditions.append("card_type = %s")
+            params.append(card_type)
+        if encryption_type:
+            conditions.append("encryption_type = %s")
+            params.append(encryption_type)
+        if expires_from:
+            conditions.append(f"{self.EXPIRY_SORT_KEY} >= %s")
+            params.append(expires_from)
+        if expires_to:
+            conditions.append(f"{self.EXPIRY_SORT_KEY} <= %s")
+            params.append(expires_to)
+        if after:
+            conditions.append("(created_at, id) < (%s, %s)")
+            params.extend(after)
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # LIMIT este literal: cu LIMIT $n planul generic al instrucțiunii pregătite presupune
+        # 10% din tabelă, iar serverul ar replanifica fiecare execuție (dimensiunile de pagină
+        # folosite sunt puține, deci și variantele textului)
+        limit_clause = f"LIMIT {int(limit)}" if limit is not None else ""
+        
+        return render('cards_page', columns, where=where_clause, limit=limit_clause), params
+    
+    @replica_read
+    def get_cards(self, **filters):
+        """Obține cardurile din baza de date (vezi _build_cards_query pentru filtre)"""
+        query, params = self._build_cards_query(**filters)
         try:
-            with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute("""
-                        SELECT 
-                            id, card_holder_name, card_number, expiry_date, 
-                            cvv, card_type, encryption_type, 
-                            created_at, updated_at
-                        FROM cards
-                        ORDER BY created_at DESC
-                    """)
-                    results = cursor.fetchall()
-                    logging.info(f"Successfully fetched {len(results)} cards from database")
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, query, params)
+                    results = [Card(*row) for row in cursor.fetchall()]
+                    logging.info("Successfully fetched %s cards from database", len(results))
                     return results
         except Exception as e:
-            logging.error(f"Error fetching cards: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error fetching cards: %s", e, exc_info=True)
             raise
     
+    @replica_read
+    def iter_cards(self, batch_size=1000, **filters):
+        """Parcurge cardurile printr-un cursor server-side, câte `batch_size` rânduri odată
+        
+        Conexiunea rămâne ocupată până când generatorul este epuizat sau închis.
+        """
+        query, params = self._build_cards_query(**filters)
+        count = 0
+        try:
+            with self.get_connection(read_only=True) as conn:
+                # Cursorul numit trăiește pe server; clientul ține în memorie doar un lot
+                # (DECLARE nu acceptă EXECUTE, deci interogarea nu folosește instrucțiuni pregătite)
+                with conn.cursor(name=f"cards_stream_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = batch_size
+                    cursor.execute(query, params)
+                    for row in cursor:
+                        count += 1
+                        yield Card(*row)
+            logging.info("Successfully streamed %s cards from database", count)
+        except Exception as e:
+            logging.error("Error streaming cards: %s", e, exc_info=True)
+            raise
+    
+    @replica_read
     def get_card_by_id(self, card_id):
         """Obține un card după ID"""
         try:
-            with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute("""
-                        SELECT 
-                            id, card_holder_name, card_number, expiry_date, 
-                            cvv, card_type, encryption_type, 
-                            created_at, updated_at
-                        FROM cards
-                        WHERE id = %s
-                    """, (card_id,))
-                    result = cursor.fetchone()
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, render('card_by_id'), (card_id,))
+                    row = cursor.fetchone()
+                    result = Card(*row) if row else None
                     if result:
-                        logging.info(f"Successfully fetched card with ID {card_id}")
+                        logging.info("Successfully fetched card with ID %s", card_id)
                     else:
-                        logging.info(f"No card found with ID {card_id}")
+                        logging.info("No card found with ID %s", card_id)
                     return result
         except Exception as e:
-            logging.error(f"Error fetching card {card_id}: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error fetching card %s: %s", card_id, e, exc_info=True)
             raise
     
-    def create_card(self, card_data):
+    @replica_read
+    def get_cards_version(self):
+        """Întoarce (număr de rânduri, max(updated_at), max(id)) pentru tabela cards
+        
+        Interogarea folosește doar indexuri, fără a citi sau decripta datele cardurilor.
+        """
+        try:
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, render('cards_version'))
+                    return cursor.fetchone()
+        except Exception as e:
+            logging.error("Error fetching cards version: %s", e, exc_info=True)
+            raise
+    
+    @replica_read
+    def get_card_version(self, card_id):
+        """Întoarce updated_at pentru un card sau None dacă acesta nu există"""
+        try:
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, render('card_version'), (card_id,))
+                    row = cursor.fetchone()
+                    return row[0] if row else None
+        except Exception as e:
+            logging.error("Error fetching version of card %s: %s", card_id, e, exc_info=True)
+            raise
+    
+    def get_changes(self, after=None, limit=None, columns=None):
+        """Modificările de după `after` (vezi CardStorage.get_changes), citite de pe primar
+        
+        Orizontul este începutul celei mai vechi tranzacții de scriere încă în curs
+        (pg_stat_activity), cel mult acum minus CHANGES_SETTLE_SECONDS: updated_at este
+        CURRENT_TIMESTAMP, adică începutul tranzacției, deci un import în lot confirmat
+        mai târziu nu poate apărea în urma unei poziții deja trimise. Orizontul se citește
+        înaintea rândurilor, în instrucțiuni separate (snapshot-uri diferite).
+        """
+        # LIMIT literal, ca în _build_cards_query
+        limit = int(limit) if limit is not None else 'ALL'
+        cards_query = render('changes_cards', columns, limit=limit)
+        after = after or (datetime.min, 0)
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, render('changes_horizon'),
+                                  (self.config.get('CHANGES_SETTLE_SECONDS', 0.5),))
+                    horizon = cursor.fetchone()[0]
+                    self._execute(cursor, cards_query, (*after, horizon))
+                    cards = [Card(*row) for row in cursor.fetchall()]
+                    self._execute(cursor, render('changes_deletions', limit=limit), (*after, horizon))
+                    deletions = cursor.fetchall()
+                    return cards, deletions, horizon
+        except Exception as e:
+            logging.error("Error fetching card changes: %s", e, exc_info=True)
+            raise
+    
+    @replica_read
+    def find_cards_by_number_index(self, number_index, columns=None):
+        """Cardurile cu indexul orb dat, folosind idx_cards_number_index (fără decriptare)"""
+        query = render('cards_by_number_index', columns)
+        try:
+            with self.get_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, query, (number_index,))
+                    return [Card(*row) for row in cursor.fetchall()]
+        except Exception as e:
+            logging.error("Error looking up cards by number index: %s", e, exc_info=True)
+            raise
+    
+    def find_number_index_owners(self, number_indexes):
+        """Întoarce {index orb: id-ul cel mai mic} pentru indexurile deja folosite"""
+        if not number_indexes:
+            return {}
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, render('number_index_owners'), (list(number_indexes),))
+                    return dict(cursor.fetchall())
+        except Exception as e:
+            logging.error("Error checking card number indexes: %s", e, exc_info=True)
+            raise
+    
+    def create_card(self, card_data, columns=None):
         """Crează un nou card în baza de date"""
+        query = render('insert_card', columns)
         try:
             with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute("""
-                        INSERT INTO cards (
-                            card_holder_name, card_number, expiry_date, 
-                            cvv, card_type, encryption_type
-                        ) VALUES (%s, %s, %s, %s, %s, %s)
-                        RETURNING 
-                            id, card_holder_name, card_number, expiry_date, 
-                            cvv, card_type, encryption_type, 
-                            created_at, updated_at
-                    """, (
+                with conn.cursor() as cursor:
+                    self._execute(cursor, query, (
                         card_data['card_holder_name'],
                         card_data['card_number'],
                         card_data['expiry_date'],
                         card_data['cvv'],
                         card_data['card_type'],
-                        card_data['encryption_type']
+                        card_data['encryption_type'],
+                        card_data.get('data_key'),
+                        card_data['key_id'],
+                        card_data.get('last4'),
+                        card_data.get('brand'),
+                        card_data.get('card_number_index')
                     ))
-                    conn.commit()
-                    result = cursor.fetchone()
+                    self._commit(conn)
+                    row = cursor.fetchone()
+                    result = Card(*row) if row else None
                     if result:
-                        logging.info(f"Successfully created new card with ID {result['id']}")
+                        logging.info("Successfully created new card with ID %s", result.id)
                     return result
+        except psycopg2.errors.UniqueViolation as e:
+            raise DuplicateCardError(str(e)) from e
         except Exception as e:
-            logging.error(f"Error creating card: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error creating card: %s", e, exc_info=True)
             raise
     
-    def update_card(self, card_id, card_data):
-        """Actualizează un card existent"""
+    def create_cards(self, cards_data):
+        """Inserează mai multe carduri într-o singură tranzacție (INSERT multi-rând)
+        
+        Întoarce ID-urile noilor carduri, în ordinea din `cards_data`.
+        """
+        if not cards_data:
+            return []
         try:
             with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute("""
-                        UPDATE cards
-                        SET 
-                            card_holder_name = %s,
-                            card_number = %s,
-                            expiry_date = %s,
-                            cvv = %s,
-                            card_type = %s,
-                            encryption_type = %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                        RETURNING 
-                            id, card_holder_name, card_number, expiry_date, 
-                            cvv, card_type, encryption_type, 
-                            created_at, updated_at
-                    """, (
-                        card_data['card_holder_name'],
-                        card_data['card_number'],
-                        card_data['expiry_date'],
-                        card_data['cvv'],
-                        card_data['card_type'],
-                        card_data['encryption_type'],
-                        card_id
-                    ))
-                    conn.commit()
-                    result = cursor.fetchone()
+                with conn.cursor() as cursor:
+                    rows = execute_values(cursor, render('insert_cards'), [
+                        (
+                            card_data['card_holder_name'],
+                            card_data['card_number'],
+                            card_data['expiry_date'],
+                            card_data['cvv'],
+                            card_data['card_type'],
+                            card_data['encryption_type'],
+                            card_data.get('data_key'),
+                            card_data['key_id'],
+                            card_data.get('last4'),
+                            card_data.get('brand'),
+                            card_data.get('card_number_index')
+                        )
+                        for card_data in cards_data
+                    ], page_size=len(cards_data), fetch=True)
+                    self._commit(conn)
+                    ids = [row[0] for row in rows]
+                    logging.info("Successfully created %s cards in bulk", len(ids))
+                    return ids
+        except psycopg2.errors.UniqueViolation as e:
+            raise DuplicateCardError(str(e)) from e
+        except Exception as e:
+            logging.error("Error creating cards in bulk: %s", e, exc_info=True)
+            raise
+    
+    def update_card(self, card_id, card_data, columns=None):
+        """Actualizează doar coloanele prezente în card_data; întoarce rândul sau None dacă nu există"""
+        updated = [column for column in self.UPDATABLE_COLUMNS if column in card_data]
+        if not updated:
+            raise ValueError("Nu există câmpuri de actualizat")
+        query = render('update_card', columns, assignments=', '.join(f"{column} = %s" for column in updated))
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute(cursor, query, [card_data[column] for column in updated] + [card_id])
+                    self._commit(conn)
+                    row = cursor.fetchone()
+                    result = Card(*row) if row else None
                     if result:
-                        logging.info(f"Successfully updated card with ID {card_id}")
+                        logging.info("Successfully updated card with ID %s", card_id)
                     else:
-                        logging.warning(f"No card found to update with ID {card_id}")
+                        logging.warning("No card found to update with ID %s", card_id)
                     return result
+        except psycopg2.errors.UniqueViolation as e:
+            raise DuplicateCardError(str(e)) from e
+        except Exception as e:
+            logging.error("Error updating card %s: %s", card_id, e, exc_info=True)
+            raise
+    
+    def get_cards_to_reencrypt(self, after_id, limit, key_id, encryption_type=None):
+        """Următorul lot (ordonat după id) de carduri care nu folosesc cheia sau tipul țintă"""
+        if encryption_type:
+            query = render('cards_to_reencrypt', where="(key_id <> %s OR encryption_type <> %s)")
+            params = (after_id, key_id, encryption_type, limit)
+        else:
+            query = render('cards_to_reencrypt', where="key_id <> %s")
+            params = (after_id, key_id, limit)
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=TimedRealDictCursor) as cursor:
+                    self._execute(cursor, query, params)
+                    return cursor.fetchall()
         except Exception as e:
-            logging.error(f"Error updating card {card_id}: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error fetching cards to re-encrypt: %s", e, exc_info=True)
+            raise
+    
+    def update_encrypted_fields(self, cards_data):
+        """Rescrie câmpurile criptate pentru un lot de carduri într-o singură tranzacție
+        
+        Un rând este actualizat doar dacă updated_at nu s-a schimbat de la citire, astfel
+        încât modificările concurente nu sunt suprascrise; rândurile rescrise primesc un
+        updated_at nou. Întoarce ID-urile actualizate.
+        """
+        if not cards_data:
+            return []
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    rows = execute_values(cursor, render('update_encrypted_fields'), [
+                        (
+                            card_data['id'],
+                            card_data['card_number'],
+                            card_data['cvv'],
+                            card_data['encryption_type'],
+                            card_data.get('data_key'),
+                            card_data['key_id'],
+                            card_data['updated_at']
+                        )
+                        for card_data in cards_data
+                    ], template="(%s, %s, %s, %s, %s::text, %s, %s::timestamp)",
+                       page_size=len(cards_data), fetch=True)
+                    self._commit(conn)
+                    return [row[0] for row in rows]
+        except Exception as e:
+            logging.error("Error re-encrypting cards: %s", e, exc_info=True)
+            raise
+    
+    def get_cards_to_backfill(self, after_id, limit):
+        """Următorul lot (ordonat după id) de carduri fără last4/brand sau fără index orb"""
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=TimedRealDictCursor) as cursor:
+                    self._execute(cursor, render('cards_to_backfill'), (after_id, limit))
+                    return cursor.fetchall()
+        except Exception as e:
+            logging.error("Error fetching cards to backfill: %s", e, exc_info=True)
+            raise
+    
+    def update_derived_fields(self, cards_data):
+        """Completează last4/brand/card_number_index pentru un lot, dacă rândul nu s-a schimbat de la citire
+        
+        Întoarce ID-urile actualizate.
+        """
+        if not cards_data:
+            return []
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    rows = execute_values(cursor, render('update_derived_fields'), [
+                        (card_data['id'], card_data['last4'], card_data['brand'],
+                         card_data['card_number_index'], card_data['updated_at'])
+                        for card_data in cards_data
+                    ], template="(%s, %s, %s::text, %s::text, %s::timestamp)",
+                       page_size=len(cards_data), fetch=True)
+                    self._commit(conn)
+                    return [row[0] for row in rows]
+        except psycopg2.errors.UniqueViolation as e:
+            raise DuplicateCardError(str(e)) from e
+        except Exception as e:
+            logging.error("Error backfilling derived fields: %s", e, exc_info=True)
             raise
     
     def delete_card(self, card_id):
@@ -165,14 +609,21 @@ class DatabaseService:
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("DELETE FROM cards WHERE id = %s", (card_id,))
-                    conn.commit()
+                    self._execute(cursor, render('delete_card'), (card_id,))
                     deleted = cursor.rowcount > 0
                     if deleted:
-                        logging.info(f"Successfully deleted card with ID {card_id}")
+                        self._execute(cursor, render('prune_deletions'),
+                                      (self.config.get('CHANGES_TOMBSTONE_RETENTION', 7 * 24 * 3600),))
+                    self._commit(conn)
+                    if deleted:
+                        logging.info("Successfully deleted card with ID %s", card_id)
                     else:
-                        logging.warning(f"No card found to delete with ID {card_id}")
+                        logging.warning("No card found to delete with ID %s", card_id)
                     return deleted
         except Exception as e:
-            logging.error(f"Error deleting card {card_id}: {str(e)}\n{traceback.format_exc()}")
-            raise
\ No newline at end of file
+            logging.error("Error deleting card %s: %s", card_id, e, exc_info=True)
+            raise
+
+
+metrics.describe('bcard_db_prepared_statements_total', 'counter',
+                 'Instructiuni pregatite pe server, pe eveniment (prepare, evict, reset)')
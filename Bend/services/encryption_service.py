@@ -1,11 +1,96 @@
 import base64
+import hashlib
+import hmac
 import os
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from Crypto.Util.Padding import pad, unpad
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
 from config import Config
+from services.admission import AdmissionController
+from services.metrics import metrics
+
+# Cheile private RSA (pe versiuni) încărcate o singură dată în fiecare proces worker
+_worker_private_keys = {}
+
+# Cheile RSA parsate, pe cale; încărcate înainte de fork (gunicorn --preload) sunt
+# moștenite de toți workerii, fără a mai citi și parsa fișierele PEM în fiecare
+_rsa_keys = {}
+_rsa_keys_lock = threading.Lock()
+
+def load_rsa_key(path):
+    """Cheia RSA din fișierul PEM dat, parsată o singură dată per proces"""
+    with _rsa_keys_lock:
+        key = _rsa_keys.get(path)
+        if key is None:
+            with open(path, "rb") as key_file:
+                key = _rsa_keys[path] = RSA.import_key(key_file.read())
+        return key
+
+def load_key_material(config):
+    """Generează perechea RSA dacă lipsește și parsează toate cheile RSA (curente și anterioare)"""
+    Config.generate_rsa_keys()
+    for path in (config['RSA_PUBLIC_KEY_PATH'], config['RSA_PRIVATE_KEY_PATH'],
+                 *config.get('PREVIOUS_RSA_KEYS', {}).values()):
+        load_rsa_key(path)
+
+def _init_rsa_worker(private_key_paths):
+    """Inițializator pentru procesele din pool: încarcă cheile private RSA"""
+    for key_id, private_key_path in private_key_paths.items():
+        with open(private_key_path, "rb") as key_file:
+            _worker_private_keys[key_id] = RSA.import_key(key_file.read())
+
+def _decrypt_rsa_chunk(items):
+    """Decriptează un lot de perechi (valoare RSA, key_id) într-un proces worker (rezultate în bytes)"""
+    ciphers = {}
+    results = []
+    for encrypted_data, key_id in items:
+        try:
+            if key_id not in ciphers:
+                ciphers[key_id] = PKCS1_OAEP.new(_worker_private_keys[key_id])
+            results.append(ciphers[key_id].decrypt(base64.b64decode(encrypted_data)))
+        except Exception as e:
+            # Excepțiile sunt transmise înapoi ca valori, fără a opri restul lotului
+            results.append(ValueError(str(e)))
+    return results
+
+class DataKeyCache:
+    """Cache LRU, limitat în timp, pentru cheile de date hibride deja despachetate"""
+    
+    def __init__(self, max_size=1024, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, wrapped_key):
+        with self._lock:
+            entry = self._entries.get(wrapped_key)
+            if entry is None:
+                return None
+            key, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[wrapped_key]
+                return None
+            self._entries.move_to_end(wrapped_key)
+            return key
+    
+    def put(self, wrapped_key, key):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[wrapped_key] = (key, time.monotonic() + self.ttl)
+            self._entries.move_to_end(wrapped_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
 
 class EncryptionService:
     def __init__(self, config):
@@ -14,6 +99,24 @@ class EncryptionService:
         # Ensure the key is 32 bytes (256 bits)
         self.symmetric_key = self.symmetric_key.ljust(32)[:32]
         
+        # Versiunea cheilor curente; valorile criptate cu versiuni anterioare rămân lizibile
+        self.key_id = config.get('ENCRYPTION_KEY_ID', 'v1')
+        self.symmetric_keys = {
+            key_id: secret.encode('utf-8').ljust(32)[:32]
+            for key_id, secret in config.get('PREVIOUS_SYMMETRIC_KEYS', {}).items()
+        }
+        self.symmetric_keys[self.key_id] = self.symmetric_key
+        
+        # Cheia HMAC pentru indexul orb al numărului de card; trebuie să rămână aceeași
+        # la rotația cheilor de criptare, altfel căutarea nu mai găsește rândurile vechi
+        blind_index_key = config.get('BLIND_INDEX_KEY')
+        if blind_index_key:
+            self.blind_index_key = blind_index_key.encode('utf-8')
+        else:
+            logging.warning("BLIND_INDEX_KEY is not set; deriving it from SYMMETRIC_KEY "
+                            "(card lookups will break if SYMMETRIC_KEY is rotated)")
+            self.blind_index_key = hmac.new(self.symmetric_key, b'bcard-blind-index', hashlib.sha256).digest()
+        
         # Asigură existența cheilor RSA
         Config.generate_rsa_keys()
         
@@ -24,20 +127,53 @@ class EncryptionService:
         # Încarcă cheile RSA
         self.rsa_public_key = self._load_public_key()
         self.rsa_private_key = self._load_private_key()
+        
+        # Cheile private RSA pentru versiunile anterioare (doar pentru decriptare)
+        self.rsa_private_key_paths = dict(config.get('PREVIOUS_RSA_KEYS', {}))
+        self.rsa_private_key_paths[self.key_id] = self.rsa_private_key_path
+        self.rsa_private_keys = {}
+        for key_id, private_key_path in self.rsa_private_key_paths.items():
+            if key_id != self.key_id:
+                self.rsa_private_keys[key_id] = load_rsa_key(private_key_path)
+        self.rsa_private_keys[self.key_id] = self.rsa_private_key
+        
+        # Pool de procese pentru decriptarea RSA în lot (creat la prima utilizare)
+        self.rsa_workers = config.get('RSA_WORKERS') or os.cpu_count() or 1
+        self.rsa_parallel_min_batch = config.get('RSA_PARALLEL_MIN_BATCH', 16)
+        self._rsa_pool = None
+        self._rsa_pool_pid = None
+        atexit.register(self.shutdown)
+        
+        # Limitează operațiile cu cheia privată RSA (concurență, coadă, buget per cerere)
+        self.admission = AdmissionController(config)
+        
+        # Cheile de date hibride despachetate recent (evită operația RSA la citiri repetate)
+        self.data_key_cache = DataKeyCache(
+            max_size=config.get('HYBRID_KEY_CACHE_SIZE', 1024),
+            ttl=config.get('HYBRID_KEY_CACHE_TTL', 300.0)
+        )
     
     def _load_public_key(self):
-        with open(self.rsa_public_key_path, "rb") as key_file:
-            return RSA.import_key(key_file.read())
+        return load_rsa_key(self.rsa_public_key_path)
     
     def _load_private_key(self):
-        with open(self.rsa_private_key_path, "rb") as key_file:
-            return RSA.import_key(key_file.read())
+        return load_rsa_key(self.rsa_private_key_path)
     
-    # Criptare sincronă (AES)
-    def encrypt_sync(self, data):
-        if not data:
-            return None
-            
+    def _symmetric_key_for(self, key_id):
+        if key_id is None:
+            return self.symmetric_key
+        if key_id not in self.symmetric_keys:
+            raise ValueError(f"Cheie de criptare necunoscută: {key_id}")
+        return self.symmetric_keys[key_id]
+    
+    def _private_key_for(self, key_id):
+        if key_id is None:
+            return self.rsa_private_key
+        if key_id not in self.rsa_private_keys:
+            raise ValueError(f"Cheie de criptare necunoscută: {key_id}")
+        return self.rsa_private_keys[key_id]
+    
+    def _aes_encrypt(self, key, data):
         # Convertește datele în bytes
         data_bytes = data.encode('utf-8')
         
@@ -48,7 +184,7 @@ class EncryptionService:
         padded_data = pad(data_bytes, AES.block_size)
         
         # Inițializează cifrul
-        cipher = AES.new(self.symmetric_key, AES.MODE_CBC, iv)
+        cipher = AES.new(key, AES.MODE_CBC, iv)
         
         # Criptează datele
         encrypted_data = cipher.encrypt(padded_data)
@@ -57,11 +193,7 @@ class EncryptionService:
         result = base64.b64encode(iv + encrypted_data).decode('utf-8')
         return result
     
-    # Decriptare sincronă (AES)
-    def decrypt_sync(self, encrypted_data):
-        if not encrypted_data:
-            return None
-            
+    def _aes_decrypt(self, key, encrypted_data):
         # Decodează din base64
         binary_data = base64.b64decode(encrypted_data)
         
@@ -70,7 +202,7 @@ class EncryptionService:
         ciphertext = binary_data[16:]
         
         # Inițializează cifrul pentru decriptare
-        cipher = AES.new(self.symmetric_key, AES.MODE_CBC, iv)
+        cipher = AES.new(key, AES.MODE_CBC, iv)
         
         # Decriptează datele
         padded_data = cipher.decrypt(ciphertext)
@@ -80,6 +212,18 @@ class EncryptionService:
         
         return data.decode('utf-8')
     
+    # Criptare sincronă (AES)
+    def encrypt_sync(self, data):
+        if not data:
+            return None
+        return self._aes_encrypt(self.symmetric_key, data)
+    
+    # Decriptare sincronă (AES)
+    def decrypt_sync(self, encrypted_data, key_id=None):
+        if not encrypted_data:
+            return None
+        return self._aes_decrypt(self._symmetric_key_for(key_id), encrypted_data)
+    
     # Criptare asincronă (RSA)
     def encrypt_async(self, data):
         if not data:
@@ -98,7 +242,7 @@ class EncryptionService:
         return base64.b64encode(encrypted).decode('utf-8')
     
     # Decriptare asincronă (RSA)
-    def decrypt_async(self, encrypted_data):
+    def decrypt_async(self, encrypted_data, key_id=None):
         if not encrypted_data:
             return None
             
@@ -106,27 +250,238 @@ class EncryptionService:
         binary_data = base64.b64decode(encrypted_data)
         
         # Creează un cifru PKCS1_OAEP
-        cipher = PKCS1_OAEP.new(self.rsa_private_key)
+        cipher = PKCS1_OAEP.new(self._private_key_for(key_id))
         
         # Decriptează datele
-        decrypted = cipher.decrypt(binary_data)
+        with self.admission.admit():
+            decrypted = cipher.decrypt(binary_data)
         
         return decrypted.decode('utf-8')
     
+    # Criptare hibridă: o cheie AES per înregistrare, împachetată cu RSA
+    def generate_data_key(self):
+        """Generează o cheie de date nouă; întoarce (cheia, cheia împachetată RSA în base64)"""
+        key = get_random_bytes(32)
+        metrics.crypto_operation('wrap_key', 'hybrid')
+        cipher = PKCS1_OAEP.new(self.rsa_public_key)
+        wrapped_key = base64.b64encode(cipher.encrypt(key)).decode('utf-8')
+        self.data_key_cache.put(wrapped_key, key)
+        return key, wrapped_key
+    
+    def unwrap_data_key(self, wrapped_key, key_id=None):
+        """Despachetează o cheie de date (din cache sau printr-o operație RSA)"""
+        key = self.data_key_cache.get(wrapped_key)
+        if key is None:
+            metrics.crypto_operation('unwrap_key', 'hybrid')
+            cipher = PKCS1_OAEP.new(self._private_key_for(key_id))
+            with self.admission.admit():
+                key = cipher.decrypt(base64.b64decode(wrapped_key))
+            self.data_key_cache.put(wrapped_key, key)
+        return key
+    
+    def encrypt_hybrid(self, data, data_key):
+        if not data:
+            return None
+        if not data_key:
+            raise ValueError("Criptarea hibridă necesită o cheie de date")
+        return self._aes_encrypt(self.unwrap_data_key(data_key), data)
+    
+    def decrypt_hybrid(self, encrypted_data, data_key, key_id=None):
+        if not encrypted_data:
+            return None
+        if not data_key:
+            raise ValueError("Lipsește cheia de date pentru decriptarea hibridă")
+        return self._aes_decrypt(self.unwrap_data_key(data_key, key_id), encrypted_data)
+    
     # Metodă generică pentru criptare bazată pe tipul specificat
-    def encrypt(self, data, encryption_type):
+    def encrypt(self, data, encryption_type, data_key=None):
+        metrics.crypto_operation('encrypt', encryption_type)
+        with metrics.stage('encrypt'):
+            return self._encrypt(data, encryption_type, data_key)
+    
+    def _encrypt(self, data, encryption_type, data_key=None):
         if encryption_type == 'sync':
             return self.encrypt_sync(data)
         elif encryption_type == 'async':
             return self.encrypt_async(data)
+        elif encryption_type == 'hybrid':
+            return self.encrypt_hybrid(data, data_key)
         else:
             raise ValueError("Tip de criptare necunoscut")
     
     # Metodă generică pentru decriptare bazată pe tipul specificat
-    def decrypt(self, data, encryption_type):
+    # (key_id selectează versiunea cheilor; None înseamnă cheile curente)
+    def decrypt(self, data, encryption_type, data_key=None, key_id=None):
+        metrics.crypto_operation('decrypt', encryption_type)
+        with metrics.stage('decrypt'):
+            try:
+                return self._decrypt(data, encryption_type, data_key, key_id)
+            except Exception:
+                metrics.error('crypto')
+                raise
+    
+    def _decrypt(self, data, encryption_type, data_key=None, key_id=None):
         if encryption_type == 'sync':
-            return self.decrypt_sync(data)
+            return self.decrypt_sync(data, key_id)
         elif encryption_type == 'async':
-            return self.decrypt_async(data)
+            return self.decrypt_async(data, key_id)
+        elif encryption_type == 'hybrid':
+            return self.decrypt_hybrid(data, data_key, key_id)
         else:
-            raise ValueError("Tip de criptare necunoscut")
\ No newline at end of file
+            raise ValueError("Tip de criptare necunoscut")
+    
+    # Indexul orb pentru căutare și unicitate (cheie separată de cea de criptare)
+    def number_index(self, card_number):
+        """Indexul orb al numărului de card: HMAC-SHA256 (hex) peste cifrele numărului
+        
+        Determinist, deci permite căutarea și unicitatea fără a decripta rândurile.
+        """
+        digits = ''.join(ch for ch in str(card_number) if ch.isdigit())
+        return hmac.new(self.blind_index_key, digits.encode('utf-8'), hashlib.sha256).hexdigest()
+    
+    def encrypt_fields(self, values, encryption_type):
+        """Criptează câmpurile unei înregistrări; întoarce (valorile criptate, cheia de date)
+        
+        Pentru tipul 'hybrid' se generează o singură cheie de date pentru toate câmpurile,
+        fără nicio operație cu cheia privată.
+        """
+        metrics.crypto_operation('encrypt', encryption_type, len(values))
+        with metrics.stage('encrypt'):
+            if encryption_type != 'hybrid':
+                return [self._encrypt(value, encryption_type) for value in values], None
+            key, wrapped_key = self.generate_data_key()
+            return [self._aes_encrypt(key, value) if value else None for value in values], wrapped_key
+    
+    def encrypt_many(self, records):
+        """Criptează în lot o listă de perechi (valori, encryption_type)
+        
+        Întoarce, în aceeași ordine, rezultatul encrypt_fields pentru fiecare înregistrare
+        sau instanța excepției dacă înregistrarea nu a putut fi criptată. Criptarea RSA
+        folosește doar cheia publică, deci rulează direct în procesul curent.
+        """
+        results = []
+        for values, encryption_type in records:
+            try:
+                results.append(self.encrypt_fields(values, encryption_type))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    def _get_rsa_pool(self):
+        """Returnează pool-ul de procese pentru RSA, recreat după fork"""
+        if self._rsa_pool is None or self._rsa_pool_pid != os.getpid():
+            # forkserver evită fork-ul unui proces cu mai multe fire de execuție
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._rsa_pool = ProcessPoolExecutor(
+                max_workers=self.rsa_workers,
+                mp_context=context,
+                initializer=_init_rsa_worker,
+                initargs=({
+                    key_id: os.path.abspath(path)
+                    for key_id, path in self.rsa_private_key_paths.items()
+                },)
+            )
+            self._rsa_pool_pid = os.getpid()
+        return self._rsa_pool
+    
+    def shutdown(self):
+        """Oprește pool-ul de procese RSA"""
+        if self._rsa_pool is not None and self._rsa_pool_pid == os.getpid():
+            self._rsa_pool.shutdown(wait=False, cancel_futures=True)
+        self._rsa_pool = None
+    
+    def _rsa_decrypt_many(self, items):
+        """Decriptează RSA o listă de perechi (valoare base64, key_id), în paralel dacă lotul e suficient de mare"""
+        items = [(encrypted_data, key_id or self.key_id) for encrypted_data, key_id in items]
+        if self.rsa_workers > 1 and len(items) >= self.rsa_parallel_min_batch:
+            chunk_size = -(-len(items) // self.rsa_workers)
+            chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+            try:
+                return [
+                    value
+                    for chunk in self._get_rsa_pool().map(_decrypt_rsa_chunk, chunks)
+                    for value in chunk
+                ]
+            except Exception as e:
+                # Pool indisponibil (ex. worker oprit): revenim la decriptarea serială
+                logging.error("RSA worker pool failed, decrypting serially: %s", e)
+                self.shutdown()
+        
+        ciphers = {}
+        results = []
+        for encrypted_data, key_id in items:
+            try:
+                if key_id not in ciphers:
+                    ciphers[key_id] = PKCS1_OAEP.new(self._private_key_for(key_id))
+                results.append(ciphers[key_id].decrypt(base64.b64decode(encrypted_data)))
+            except Exception as e:
+                results.append(ValueError(str(e)))
+        return results
+    
+    # Decriptare în lot: RSA în paralel (pool de procese), AES direct în procesul curent
+    def decrypt_many(self, items):
+        """Decriptează o listă de tupluri (date, encryption_type[, data_key[, key_id]])
+        
+        Rezultatele păstrează ordinea intrărilor; un element care nu poate fi
+        decriptat produce instanța excepției în locul valorii, fără a afecta restul.
+        Cheile de date hibride sunt despachetate o singură dată per lot.
+        """
+        items = [tuple(item) + (None,) * (4 - len(item)) for item in items]
+        results = [None] * len(items)
+        
+        # Adună toate operațiile cu cheia privată: valori 'async' și chei hibride necunoscute
+        rsa_indexes = []
+        wrapped_keys = {}
+        pending_keys = []
+        for index, (data, encryption_type, data_key, key_id) in enumerate(items):
+            if not data:
+                continue
+            if encryption_type == 'async':
+                rsa_indexes.append(index)
+            elif encryption_type == 'hybrid' and data_key and data_key not in wrapped_keys:
+                wrapped_keys[data_key] = self.data_key_cache.get(data_key)
+                if wrapped_keys[data_key] is None:
+                    pending_keys.append((data_key, key_id))
+        
+        operations = Counter(encryption_type for data, encryption_type, _, _ in items if data)
+        for encryption_type, count in operations.items():
+            metrics.crypto_operation('decrypt', encryption_type, count)
+        metrics.crypto_operation('unwrap_key', 'hybrid', len(pending_keys))
+        
+        rsa_items = [(items[index][0], items[index][3]) for index in rsa_indexes] + pending_keys
+        decrypted = []
+        if rsa_items:
+            # Întregul lot este admis (sau respins) înainte de prima operație RSA
+            with self.admission.admit(len(rsa_items)), metrics.stage('rsa_decrypt'):
+                decrypted = self._rsa_decrypt_many(rsa_items)
+        
+        for index, value in zip(rsa_indexes, decrypted):
+            results[index] = value if isinstance(value, Exception) else value.decode('utf-8')
+        for (wrapped, _), key in zip(pending_keys, decrypted[len(rsa_indexes):]):
+            wrapped_keys[wrapped] = key
+            if not isinstance(key, Exception):
+                self.data_key_cache.put(wrapped, key)
+        
+        rsa_set = set(rsa_indexes)
+        with metrics.stage('aes_decrypt'):
+            for index, (data, encryption_type, data_key, key_id) in enumerate(items):
+                if index in rsa_set:
+                    continue
+                try:
+                    if encryption_type == 'hybrid' and data:
+                        key = wrapped_keys.get(data_key)
+                        if key is None:
+                            raise ValueError("Lipsește cheia de date pentru decriptarea hibridă")
+                        if isinstance(key, Exception):
+                            raise key
+                        results[index] = self._aes_decrypt(key, data)
+                    else:
+                        results[index] = self._decrypt(data, encryption_type, data_key, key_id)
+                except Exception as e:
+                    results[index] = e
+        
+        failed = sum(1 for value in results if isinstance(value, Exception))
+        if failed:
+            metrics.inc('bcard_errors_total', failed, (('component', 'crypto'),))
+        return results
\ No newline at end of file
@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from services.metrics import metrics
+
+# ID-ul cererii curente, atașat fiecărui eveniment de log emis în timpul cererii
+request_id_var = ContextVar('bcard_request_id', default=None)
+
+# Numere de card (13-19 cifre, cu spații sau cratime opționale) și valori CVV din mesaje
+PAN_PATTERN = re.compile(r'(?<![\w])(?:\d[ -]?){12,18}\d(?![\w])')
+CVV_PATTERN = re.compile(r'''(?i)(['"]?cvv['"]?\s*[:=]\s*['"]?)\d{3,4}''')
+REDACTED_FIELDS = frozenset(('card_number', 'cvv', 'data_key'))
+
+# Atributele standard ale unui LogRecord; restul provin din `extra` și ajung în JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'suppressed'
+}
+
+
+def _mask_pan(match):
+    digits = re.sub(r'\D', '', match.group(0))
+    return f"****{digits[-4:]}"
+
+
+def redact(text):
+    """Maschează numerele de card (păstrând ultimele 4 cifre) și valorile CVV dintr-un text"""
+    return CVV_PATTERN.sub(r'\1***', PAN_PATTERN.sub(_mask_pan, text))
+
+
+class RequestContextFilter(logging.Filter):
+    """Adaugă request_id pe fiecare înregistrare (rulează pe firul care emite)"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class ErrorSamplingFilter(logging.Filter):
+    """Limitează erorile repetate: cel mult `burst` pe fereastră pentru fiecare loc din cod
+
+    Erorile suprimate sunt numărate, iar numărul lor apare ca `suppressed` pe prima
+    eroare lăsată să treacă în fereastra următoare.
+    """
+
+    def __init__(self, burst=10, window=60.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno < logging.ERROR or self.burst <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (started, count, suppressed + 1)
+                metrics.inc('bcard_log_suppressed_total')
+                return False
+            self._windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formatul text obișnuit, cu numerele de card și CVV-urile mascate"""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+class JsonFormatter(logging.Formatter):
+    """Un eveniment JSON pe linie: ts, level, logger, message, request_id, câmpurile din `extra`"""
+
+    def format(self, record):
+        event = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        if getattr(record, 'request_id', None):
+            event['request_id'] = record.request_id
+        if getattr(record, 'suppressed', None):
+            event['suppressed'] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                event[key] = '[REDACTED]' if key in REDACTED_FIELDS else value
+        if record.exc_info:
+            # Traceback-ul este formatat o singură dată, pe firul de log
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            event['exc'] = redact(record.exc_text)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Pune înregistrările într-o coadă fără a le formata; formatarea și I/O au loc pe firul de log
+
+    Dacă coada este plină, înregistrarea este aruncată (și numărată) în loc să blocheze cererea.
+    """
+
+    def prepare(self, record):
+        # Mesajul (și traceback-ul) se formatează leneș, în QueueListener
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc('bcard_log_dropped_total')
+
+
+_listener = None
+
+
+def configure_logging(config):
+    """Configurează logger-ul rădăcină: coadă + fir de scriere (LOG_ASYNC) și format text sau JSON"""
+    global _listener
+    level = getattr(logging, str(config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    if config.get('LOG_FORMAT', 'json') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = RedactingFormatter(logging.BASIC_FORMAT)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    if config.get('LOG_ASYNC', True):
+        handler = AsyncQueueHandler(queue.Queue(config.get('LOG_QUEUE_SIZE', 10000)))
+        _listener = logging.handlers.QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = stream_handler
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(ErrorSamplingFilter(
+        burst=config.get('LOG_ERROR_SAMPLE_BURST', 10),
+        window=config.get('LOG_ERROR_SAMPLE_WINDOW', 60.0)
+    ))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork():
+    # Firul de scriere nu supraviețuiește fork-ului; workerii pornesc unul nou, cu o coadă nouă
+    if _listener is None:
+        return
+    fresh_queue = queue.Queue(_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, AsyncQueueHandler):
+            handler.queue = fresh_queue
+    _listener.queue = fresh_queue
+    _listener._thread = None
+    _listener.start()
+
+
+atexit.register(_stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+metrics.describe('bcard_log_dropped_total', 'counter',
+                 'Evenimente de log aruncate pentru ca coada de log era plina')
+metrics.describe('bcard_log_suppressed_total', 'counter',
+                 'Erori repetate suprimate de esantionare')
@@ -0,0 +1,282 @@
+import threading
+from datetime import datetime, timedelta
+from itertools import islice, takewhile
+from models.card import Card
+from services.storage import CardStorage, DuplicateCardError
+
+
+class InMemoryStorage(CardStorage):
+    """Backend în memoria procesului, fără latență de rețea (profilare, teste de încărcare)
+
+    Păstrează semantica backend-ului PostgreSQL: ordonare (created_at DESC, id DESC),
+    paginare keyset, filtre și rânduri întoarse la scriere. Datele se pierd la oprire
+    și nu sunt partajate între workeri.
+    """
+
+    def __init__(self, config=None):
+        self.unique_number = bool((config or {}).get('CARDS_UNIQUE_NUMBER'))
+        self.tombstone_retention = timedelta(seconds=(config or {}).get('CHANGES_TOMBSTONE_RETENTION', 7 * 24 * 3600))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, rows=()):
+        """Înlocuiește conținutul tabelei cu rândurile date (id și timestamp-uri noi)"""
+        with self._lock:
+            self._rows = {}
+            # Aceleași rânduri în ordinea (updated_at, id): timestamp-urile cresc strict, deci
+            # un rând modificat se mută la final (fluxul de modificări citește doar coada)
+            self._by_update = {}
+            # Indexul orb: card_number_index -> ID-urile cardurilor (ordonate)
+            self._number_index = {}
+            # Jurnalul ștergerilor: id -> deleted_at, în ordinea ștergerii (deci cronologică)
+            self._deletions = {}
+            self._next_id = 1
+            self._last_timestamp = None
+            self._max_updated_at = None
+            for row in rows:
+                self._insert(row)
+
+    def _now(self):
+        # Timestamp-uri strict crescătoare: ordinea inserării rămâne ordinea (created_at, id)
+        now = datetime.now()
+        if self._last_timestamp is not None and now <= self._last_timestamp:
+            now = self._last_timestamp + timedelta(microseconds=1)
+        self._last_timestamp = now
+        return now
+
+    def _check_unique(self, number_index, card_id=None):
+        if self.unique_number and number_index is not None and \
+                any(owner != card_id for owner in self._number_index.get(number_index, ())):
+            raise DuplicateCardError(f"Duplicate card_number_index {number_index}")
+
+    def _set_number_index(self, row, number_index):
+        if row.get('card_number_index') is not None:
+            self._number_index[row['card_number_index']].remove(row['id'])
+            if not self._number_index[row['card_number_index']]:
+                del self._number_index[row['card_number_index']]
+        row['card_number_index'] = number_index
+        if number_index is not None:
+            self._number_index.setdefault(number_index, []).append(row['id'])
+            self._number_index[number_index].sort()
+
+    def _card(self, row, columns=None):
+        # Cardurile întoarse au aceleași coloane ca la PostgreSQL (fără indexul orb);
+        # coloanele din afara proiecției rămân None
+        if columns is None:
+            return Card(*[row[column] for column in self.CARD_COLUMNS])
+        return Card(*[row[column] if column in columns else None for column in self.CARD_COLUMNS])
+
+    def _insert(self, card_data):
+        self._check_unique(card_data.get('card_number_index'))
+        now = self._now()
+        row = {
+            'id': self._next_id,
+            'card_holder_name': card_data['card_holder_name'],
+            'card_number': card_data['card_number'],
+            'expiry_date': card_data['expiry_date'],
+            'cvv': card_data['cvv'],
+            'card_type': card_data['card_type'],
+            'encryption_type': card_data['encryption_type'],
+            'data_key': card_data.get('data_key'),
+            'key_id': card_data.get('key_id', 'v1'),
+            'last4': card_data.get('last4'),
+            'brand': card_data.get('brand'),
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._rows[row['id']] = row
+        self._by_update[row['id']] = row
+        self._set_number_index(row, card_data.get('card_number_index'))
+        self._next_id += 1
+        self._max_updated_at = now
+        return row
+
+    def test_connection(self):
+        return True
+
+    def pool_stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'rows': len(self._rows)}
+
+    def _matches(self, row, after, card_type, encryption_type, expires_from, expires_to):
+        if card_type and row['card_type'] != card_type:
+            return False
+        if encryption_type and row['encryption_type'] != encryption_type:
+            return False
+        if expires_from or expires_to:
+            sort_key = row['expiry_date'][3:] + row['expiry_date'][:2]
+            if expires_from and sort_key < expires_from:
+                return False
+            if expires_to and sort_key > expires_to:
+                return False
+        if after and (row['created_at'], row['id']) >= tuple(after):
+            return False
+        return True
+
+    def get_cards(self, limit=None, after=None, card_type=None, encryption_type=None,
+                  expires_from=None, expires_to=None, columns=None):
+        columns = frozenset(columns) if columns else None
+        # Rândurile sunt inserate în ordinea created_at, deci parcurgerea inversă e deja sortată
+        with self._lock:
+            matching = (
+                self._card(row, columns) for row in reversed(self._rows.values())
+                if self._matches(row, after, card_type, encryption_type, expires_from, expires_to)
+            )
+            return list(islice(matching, limit))
+
+    def iter_cards(self, batch_size=1000, limit=None, after=None, **filters):
+        # Pagini keyset succesive: lock-ul nu este ținut cât timp consumatorul procesează
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            rows = self.get_cards(limit=size, after=after, **filters)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = (rows[-1].created_at, rows[-1].id)
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def get_card_by_id(self, card_id):
+        with self._lock:
+            row = self._rows.get(card_id)
+            return self._card(row) if row else None
+
+    def get_cards_version(self):
+        with self._lock:
+            return len(self._rows), self._max_updated_at, self._next_id - 1 if self._rows else None
+
+    def get_card_version(self, card_id):
+        with self._lock:
+            row = self._rows.get(card_id)
+            return row['updated_at'] if row else None
+
+    def get_changes(self, after=None, limit=None, columns=None):
+        columns = frozenset(columns) if columns else None
+        after = tuple(after) if after else (datetime.min, 0)
+        with self._lock:
+            # Scrierile țin lock-ul, deci tot ce este vizibil acum este confirmat
+            horizon = self._now()
+            rows = list(takewhile(lambda row: (row['updated_at'], row['id']) > after,
+                                  reversed(self._by_update.values())))
+            deletions = list(takewhile(lambda deletion: (deletion[1], deletion[0]) > after,
+                                       reversed(self._deletions.items())))
+            rows.reverse()
+            deletions.reverse()
+            return [self._card(row, columns) for row in rows[:limit]], deletions[:limit], horizon
+
+    def find_cards_by_number_index(self, number_index, columns=None):
+        columns = frozenset(columns) if columns else None
+        with self._lock:
+            return [
+                self._card(self._rows[card_id], columns)
+                for card_id in self._number_index.get(number_index, ())
+            ]
+
+    def find_number_index_owners(self, number_indexes):
+        with self._lock:
+            return {
+                number_index: self._number_index[number_index][0]
+                for number_index in number_indexes if number_index in self._number_index
+            }
+
+    def create_card(self, card_data, columns=None):
+        with self._lock:
+            return self._card(self._insert(card_data), frozenset(columns) if columns else None)
+
+    def create_cards(self, cards_data):
+        with self._lock:
+            # Lotul este atomic: duplicatele (față de tabelă sau în lot) sunt verificate înainte de inserare
+            if self.unique_number:
+                seen = set()
+                for card_data in cards_data:
+                    number_index = card_data.get('card_number_index')
+                    self._check_unique(number_index)
+                    if number_index is not None and number_index in seen:
+                        raise DuplicateCardError(f"Duplicate card_number_index {number_index}")
+                    seen.add(number_index)
+            return [self._insert(card_data)['id'] for card_data in cards_data]
+
+    def update_card(self, card_id, card_data, columns=None):
+        updated = [column for column in self.UPDATABLE_COLUMNS if column in card_data]
+        if not updated:
+            raise ValueError("Nu există câmpuri de actualizat")
+        with self._lock:
+            row = self._rows.get(card_id)
+            if row is None:
+                return None
+            if 'card_number_index' in card_data:
+                self._check_unique(card_data['card_number_index'], card_id)
+                self._set_number_index(row, card_data['card_number_index'])
+            row.update((column, card_data[column]) for column in updated)
+            row['updated_at'] = self._now()
+            self._by_update[card_id] = self._by_update.pop(card_id)
+            self._max_updated_at = row['updated_at']
+            return self._card(row, frozenset(columns) if columns else None)
+
+    def delete_card(self, card_id):
+        with self._lock:
+            row = self._rows.pop(card_id, None)
+            if row is None:
+                return False
+            del self._by_update[card_id]
+            self._set_number_index(row, None)
+            now = self._now()
+            self._deletions[card_id] = now
+            cutoff = now - self.tombstone_retention
+            while self._deletions and next(iter(self._deletions.values())) < cutoff:
+                del self._deletions[next(iter(self._deletions))]
+            return True
+
+    def get_cards_to_reencrypt(self, after_id, limit, key_id, encryption_type=None):
+        with self._lock:
+            matching = (
+                {column: row[column] for column in ('id', 'card_number', 'cvv', 'encryption_type',
+                                                    'data_key', 'key_id', 'updated_at')}
+                for card_id, row in sorted(self._rows.items())
+                if card_id > after_id and (
+                    row['key_id'] != key_id or (encryption_type and row['encryption_type'] != encryption_type)
+                )
+            )
+            return list(islice(matching, limit))
+
+    def update_encrypted_fields(self, cards_data):
+        updated_ids = []
+        with self._lock:
+            for card_data in cards_data:
+                row = self._rows.get(card_data['id'])
+                if row is None or row['updated_at'] != card_data['updated_at']:
+                    continue
+                for column in ('card_number', 'cvv', 'encryption_type', 'data_key', 'key_id'):
+                    row[column] = card_data.get(column)
+                row['updated_at'] = self._now()
+                self._by_update[row['id']] = self._by_update.pop(row['id'])
+                self._max_updated_at = row['updated_at']
+                updated_ids.append(row['id'])
+        return updated_ids
+
+    def get_cards_to_backfill(self, after_id, limit):
+        with self._lock:
+            matching = (
+                {column: row[column] for column in ('id', 'card_number', 'encryption_type',
+                                                    'data_key', 'key_id', 'updated_at')}
+                for card_id, row in sorted(self._rows.items())
+                if card_id > after_id and (row['last4'] is None or row['card_number_index'] is None)
+            )
+            return list(islice(matching, limit))
+
+    def update_derived_fields(self, cards_data):
+        updated_ids = []
+        with self._lock:
+            for card_data in cards_data:
+                row = self._rows.get(card_data['id'])
+                if row is None or row['updated_at'] != card_data['updated_at']:
+                    continue
+                self._check_unique(card_data['card_number_index'], row['id'])
+                self._set_number_index(row, card_data['card_number_index'])
+                row['last4'], row['brand'] = card_data['last4'], card_data['brand']
+                row['updated_at'] = self._now()
+                self._by_update[row['id']] = self._by_update.pop(row['id'])
+                self._max_updated_at = row['updated_at']
+                updated_ids.append(row['id'])
+        return updated_ids
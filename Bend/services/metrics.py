@@ -0,0 +1,222 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Limitele (în secunde) pentru histogramele de latență
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * (size + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """Context manager ieftin care înregistrează durata blocului într-o histogramă"""
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+# Duratele cumulate pe etape pentru cererea curentă (incluse în evenimentul de log al cererii)
+_request_stages = ContextVar('bcard_request_stages', default=None)
+
+
+class _StageTimer(_Timer):
+    """Ca _Timer, dar adaugă durata și la etapele cererii curente"""
+    __slots__ = ('stage',)
+
+    def __init__(self, registry, name, labels, stage):
+        super().__init__(registry, name, labels)
+        self.stage = stage
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.name, elapsed, self.labels)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[self.stage] = stages.get(self.stage, 0.0) + elapsed
+        return False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Contoare și histograme ținute în memoria procesului, exportate în format Prometheus
+
+    Înregistrarea unei valori înseamnă o căutare într-un dict și o actualizare sub un
+    singur lock, deci poate rămâne activă în producție. Fiecare proces (worker) își
+    expune propriile valori; agregarea se face în Prometheus.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def configure(self, config):
+        self.enabled = config.get('METRICS_ENABLED', True)
+
+    def describe(self, name, metric_type, help_text, buckets=DEFAULT_BUCKETS):
+        """Declară o metrică (tip 'counter' sau 'histogram') împreună cu descrierea ei"""
+        self._meta[name] = (metric_type, help_text, tuple(buckets) if metric_type == 'histogram' else None)
+
+    def inc(self, name, amount=1, labels=()):
+        """Incrementează un contor; labels este un tuplu de perechi (nume, valoare)"""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        """Adaugă o observație (în secunde) într-o histogramă"""
+        if not self.enabled:
+            return
+        buckets = self._meta[name][2]
+        key = (name, labels)
+        index = bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(buckets))
+            histogram.counts[index] += 1
+            histogram.total += value
+            histogram.count += 1
+
+    def timed(self, name, labels=()):
+        """Măsoară durata unui bloc `with` într-o histogramă"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    # Scurtături pentru metricile folosite de servicii
+    def stage(self, stage):
+        """Măsoară o etapă internă (ex. 'db_query', 'rsa_decrypt')"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, 'bcard_stage_duration_seconds', (('stage', stage),), stage)
+
+    def begin_request(self):
+        """Începe colectarea duratelor pe etape pentru cererea curentă; întoarce un token"""
+        return _request_stages.set({})
+
+    def end_request(self, token):
+        """Încheie colectarea; întoarce {etapă: secunde}"""
+        stages = _request_stages.get() or {}
+        try:
+            _request_stages.reset(token)
+        except ValueError:
+            # Token creat în alt context (ex. răspuns în flux); doar oprim colectarea
+            _request_stages.set(None)
+        return stages
+
+    def crypto_operation(self, operation, encryption_type, amount=1):
+        if amount:
+            self.inc('bcard_crypto_operations_total', amount,
+                     (('encryption_type', encryption_type), ('operation', operation)))
+
+    def error(self, component):
+        self.inc('bcard_errors_total', 1, (('component', component),))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=()):
+        """Exportă toate metricile în formatul text Prometheus (0.0.4)
+
+        gauges: valori instantanee adăugate la export, ca tupluri (nume, descriere, valoare).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(histogram.counts), histogram.total, histogram.count)
+                for key, histogram in self._histograms.items()
+            }
+
+        lines = []
+        for name, (metric_type, help_text, buckets) in sorted(self._meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registrul partajat de servicii și rute (unul per proces)
+metrics = MetricsRegistry()
+
+metrics.describe('bcard_http_request_duration_seconds', 'histogram',
+                 'Latenta cererilor HTTP pana la trimiterea headerelor, pe ruta, metoda si status')
+metrics.describe('bcard_http_errors_total', 'counter',
+                 'Cereri HTTP terminate cu status 5xx, pe ruta, metoda si status')
+metrics.describe('bcard_stage_duration_seconds', 'histogram',
+                 'Durata etapelor interne (db_acquire, db_connect, db_query, rsa_decrypt, aes_decrypt, encrypt, decrypt, serialize)')
+metrics.describe('bcard_crypto_operations_total', 'counter',
+                 'Operatii criptografice pe valori individuale, pe operatie si tip de criptare')
+metrics.describe('bcard_errors_total', 'counter',
+                 'Erori interne pe componenta (db, crypto)')
@@ -0,0 +1,177 @@
+import hashlib
+import re
+from functools import lru_cache
+from models.card import CARD_FIELDS
+
+# Registrul interogărilor PostgreSQL pentru tabela cards
+#
+# Fiecare text SQL este definit o singură dată, cu parametri %s (psycopg2) și cu locuri
+# {columns} (proiecția unui Card) sau {where}/{limit}/{assignments} (părțile dinamice;
+# LIMIT este un întreg literal, altfel planul generic al instrucțiunii pregătite l-ar ignora).
+# render() produce același obiect str pentru aceleași argumente, iar textul este cheia
+# cache-ului de instrucțiuni pregătite (PREPARE) al fiecărei conexiuni.
+CARD_COLUMNS = CARD_FIELDS
+
+# Coloanele scrise la inserare, în ordinea parametrilor
+INSERT_COLUMNS = (
+    'card_holder_name', 'card_number', 'expiry_date',
+    'cvv', 'card_type', 'encryption_type', 'data_key', 'key_id',
+    'last4', 'brand', 'card_number_index'
+)
+
+QUERIES = {
+    'cards_page': """
+        SELECT {columns}
+        FROM cards
+        {where}
+        ORDER BY created_at DESC, id DESC
+        {limit}
+    """,
+    'card_by_id': """
+        SELECT {columns}
+        FROM cards
+        WHERE id = %s
+    """,
+    'cards_version': "SELECT count(*), max(updated_at), max(id) FROM cards",
+    'card_version': "SELECT updated_at FROM cards WHERE id = %s",
+    'changes_horizon': """
+        SELECT LEAST(
+            statement_timestamp() - make_interval(secs => %s),
+            (SELECT min(xact_start) FROM pg_stat_activity
+             WHERE backend_xid IS NOT NULL AND datname = current_database())
+        )::timestamp
+    """,
+    'changes_cards': """
+        SELECT {columns}
+        FROM cards
+        WHERE (updated_at, id) > (%s, %s) AND updated_at < %s
+        ORDER BY updated_at, id
+        LIMIT {limit}
+    """,
+    'changes_deletions': """
+        SELECT card_id, deleted_at
+        FROM card_deletions
+        WHERE (deleted_at, card_id) > (%s, %s) AND deleted_at < %s
+        ORDER BY deleted_at, card_id
+        LIMIT {limit}
+    """,
+    'cards_by_number_index': """
+        SELECT {columns}
+        FROM cards
+        WHERE card_number_index = %s
+        ORDER BY id
+    """,
+    'number_index_owners': """
+        SELECT card_number_index, min(id)
+        FROM cards
+        WHERE card_number_index = ANY(%s)
+        GROUP BY card_number_index
+    """,
+    'insert_card': f"""
+        INSERT INTO cards ({', '.join(INSERT_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(INSERT_COLUMNS))})
+        RETURNING {{columns}}
+    """,
+    # execute_values: VALUES %s se extinde la un INSERT multi-rând (nu se pregătește)
+    'insert_cards': f"""
+        INSERT INTO cards ({', '.join(INSERT_COLUMNS)})
+        VALUES %s
+        RETURNING id
+    """,
+    'update_card': """
+        UPDATE cards
+        SET {assignments}, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+        RETURNING {columns}
+    """,
+    # Ștergerea și intrarea în jurnal sunt o singură instrucțiune (atomic)
+    'delete_card': """
+        WITH deleted AS (DELETE FROM cards WHERE id = %s RETURNING id)
+        INSERT INTO card_deletions (card_id)
+        SELECT id FROM deleted
+        ON CONFLICT (card_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at
+    """,
+    'prune_deletions': "DELETE FROM card_deletions WHERE deleted_at < CURRENT_TIMESTAMP - make_interval(secs => %s)",
+    'cards_to_reencrypt': """
+        SELECT id, card_number, cvv, encryption_type, data_key, key_id, updated_at
+        FROM cards
+        WHERE id > %s AND {where}
+        ORDER BY id
+        LIMIT %s
+    """,
+    # updated_at avansează: encryption_type se poate schimba, iar ETag-urile, cache-ul de
+    # răspunsuri și fluxul de modificări trebuie să vadă rândul rescris
+    'update_encrypted_fields': """
+        UPDATE cards AS c
+        SET
+            card_number = v.card_number,
+            cvv = v.cvv,
+            encryption_type = v.encryption_type,
+            data_key = v.data_key,
+            key_id = v.key_id,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v (
+            id, card_number, cvv, encryption_type, data_key, key_id, updated_at
+        )
+        WHERE c.id = v.id AND c.updated_at = v.updated_at
+        RETURNING c.id
+    """,
+    'cards_to_backfill': """
+        SELECT id, card_number, encryption_type, data_key, key_id, updated_at
+        FROM cards
+        WHERE (last4 IS NULL OR card_number_index IS NULL) AND id > %s
+        ORDER BY id
+        LIMIT %s
+    """,
+    # updated_at avansează, ca ETag-ul listei și fluxul de modificări să vadă rândul completat
+    'update_derived_fields': """
+        UPDATE cards AS c
+        SET last4 = v.last4, brand = v.brand, card_number_index = v.card_number_index,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v (id, last4, brand, card_number_index, updated_at)
+        WHERE c.id = v.id AND c.updated_at = v.updated_at
+        RETURNING c.id
+    """,
+}
+
+
+def check_columns(columns):
+    """Ridică ValueError pentru coloanele care nu sunt în CARD_COLUMNS"""
+    unknown = set(columns or ()) - set(CARD_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+
+@lru_cache(maxsize=256)
+def _projection(columns):
+    """Coloanele SELECT/RETURNING în ordinea CARD_COLUMNS; cele din afara proiecției sunt NULL,
+    astfel încât fiecare tuplu citit devine direct Card(*row)"""
+    if not columns:
+        return ', '.join(CARD_COLUMNS)
+    wanted = set(columns)
+    return ', '.join(column if column in wanted else f"NULL AS {column}" for column in CARD_COLUMNS)
+
+
+@lru_cache(maxsize=512)
+def _render(name, columns, parts):
+    return ' '.join(QUERIES[name].format(columns=_projection(columns), **dict(parts)).split())
+
+
+def render(name, columns=None, **parts):
+    """Textul interogării `name` pentru proiecția `columns` (implicit toate coloanele)
+
+    Spațiile sunt normalizate, ca aceeași interogare să aibă mereu același text.
+    """
+    check_columns(columns)
+    return _render(name, tuple(columns) if columns else None, tuple(sorted(parts.items())))
+
+
+def statement_name(query):
+    """Numele instrucțiunii pregătite pentru un text SQL (stabil între conexiuni și procese)"""
+    return f"bcard_{hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]}"
+
+
+def positional(query):
+    """Textul pentru PREPARE: parametrii %s devin $1, $2, ..., iar %% devine %"""
+    counter = iter(range(1, query.count('%s') + 1))
+    return re.sub(r'%[s%]', lambda match: f"${next(counter)}" if match.group() == '%s' else '%', query)
@@ -0,0 +1,223 @@
+import json
+import os
+import time
+import threading
+import logging
+
+try:
+    import fcntl
+except ImportError:  # fără fcntl (Windows) lock-ul nu exclude alte procese
+    fcntl = None
+
+
+class ReencryptionService:
+    """Re-criptează cardurile cu cheile curente (și opțional alt tip de criptare), pe loturi.
+
+    Rândurile rescrise primesc un updated_at nou; dacă există response_cache, după fiecare
+    lot sunt invalidate lista și cardurile actualizate (encryption_type apare în răspunsuri).
+    """
+
+    def __init__(self, db_service, encryption_service, config, response_cache=None):
+        self.db_service = db_service
+        self.encryption_service = encryption_service
+        self.response_cache = response_cache
+        self.batch_size = config.get('REENCRYPT_BATCH_SIZE', 500)
+        self.rows_per_second = config.get('REENCRYPT_ROWS_PER_SECOND', 200)
+        self.checkpoint_path = config.get('REENCRYPT_CHECKPOINT_PATH', 'reencrypt_checkpoint.json')
+        self.target_type = config.get('REENCRYPT_TARGET_TYPE')
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _load_checkpoint(self, target):
+        """Citește checkpoint-ul salvat, dacă aparține aceleiași migrări"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('target') != target:
+            logging.info("Ignoring re-encryption checkpoint for a different target: %s", checkpoint.get('target'))
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint):
+        # Scriere atomică: un crash în timpul scrierii nu corupe checkpoint-ul anterior
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _acquire_lock(self):
+        """Lock exclusiv pe checkpoint; întoarce fișierul deschis sau None dacă altă rulare îl deține.
+
+        Fiecare worker care pornește migrarea în fundal ar scrie altfel același checkpoint
+        (și același .tmp), așa că doar prima rulare continuă, celelalte se opresc imediat.
+        """
+        lock_file = open(f"{self.checkpoint_path}.lock", 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _reencrypt_batch(self, cards, target_type):
+        """Decriptează un lot cu cheile vechi și îl criptează cu cheile curente"""
+        items = []
+        for card in cards:
+            items.append((card['card_number'], card['encryption_type'], card['data_key'], card['key_id']))
+            items.append((card['cvv'], card['encryption_type'], card['data_key'], card['key_id']))
+        plaintexts = self.encryption_service.decrypt_many(items)
+
+        updates = []
+        failed = 0
+        for index, card in enumerate(cards):
+            card_number, cvv = plaintexts[2 * index], plaintexts[2 * index + 1]
+            encryption_type = target_type or card['encryption_type']
+            try:
+                for value in (card_number, cvv):
+                    if isinstance(value, Exception):
+                        raise value
+                (new_card_number, new_cvv), data_key = self.encryption_service.encrypt_fields(
+                    [card_number, cvv], encryption_type
+                )
+            except Exception as e:
+                logging.error("Error re-encrypting card %s: %s", card['id'], e)
+                failed += 1
+                continue
+            updates.append({
+                'id': card['id'],
+                'card_number': new_card_number,
+                'cvv': new_cvv,
+                'encryption_type': encryption_type,
+                'data_key': data_key,
+                'key_id': self.encryption_service.key_id,
+                'updated_at': card['updated_at']
+            })
+        return updates, failed
+
+    def run(self, target_type=None, reset=False, max_rows=None):
+        """Rulează migrarea până la capăt (sau până la stop()/max_rows); întoarce checkpoint-ul final.
+
+        Întoarce None fără să facă nimic dacă altă rulare (alt proces sau worker) deține lock-ul.
+        """
+        lock_file = self._acquire_lock()
+        if lock_file is None:
+            logging.info("Re-encryption already running for %s; not starting another run", self.checkpoint_path)
+            return None
+        try:
+            return self._run(target_type, reset, max_rows)
+        finally:
+            lock_file.close()
+
+    def _run(self, target_type, reset, max_rows):
+        target_type = target_type or self.target_type
+        target = {'key_id': self.encryption_service.key_id, 'encryption_type': target_type}
+        checkpoint = None if reset else self._load_checkpoint(target)
+        if checkpoint is None:
+            checkpoint = {'target': target, 'last_id': 0, 'processed': 0, 'updated': 0,
+                          'skipped': 0, 'failed': 0, 'pass': 1, 'pass_skipped': 0, 'pass_failed': 0,
+                          'done': False}
+        elif checkpoint.get('done'):
+            logging.info("Re-encryption already completed for this target")
+            return checkpoint
+        for key in ('pass_skipped', 'pass_failed'):
+            checkpoint.setdefault(key, 0)
+        checkpoint.setdefault('pass', 1)
+        logging.info("Starting re-encryption to %s from id %s", target, checkpoint['last_id'])
+
+        started = time.monotonic()
+        processed_this_run = 0
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            limit = self.batch_size
+            if max_rows is not None:
+                limit = min(limit, max_rows - processed_this_run)
+                if limit <= 0:
+                    break
+
+            cards = self.db_service.get_cards_to_reencrypt(
+                checkpoint['last_id'], limit, target['key_id'], target_type
+            )
+            if not cards:
+                if not self._finish_pass(checkpoint):
+                    continue
+                break
+
+            updates, failed = self._reencrypt_batch(cards, target_type)
+            updated_ids = self.db_service.update_encrypted_fields(updates)
+            if updated_ids and self.response_cache is not None:
+                self.response_cache.invalidate(['cards'] + [f"card:{card_id}" for card_id in updated_ids])
+
+            checkpoint['last_id'] = cards[-1]['id']
+            checkpoint['processed'] += len(cards)
+            checkpoint['updated'] += len(updated_ids)
+            # Rânduri modificate concurent între citire și scriere; sunt reluate la trecerea următoare
+            skipped = len(updates) - len(updated_ids)
+            checkpoint['skipped'] += skipped
+            checkpoint['failed'] += failed
+            checkpoint['pass_skipped'] += skipped
+            checkpoint['pass_failed'] += failed
+            self._save_checkpoint(checkpoint)
+            processed_this_run += len(cards)
+            logging.info("Re-encrypted batch up to id %s (%s updated, %s failed)",
+                         checkpoint['last_id'], checkpoint['updated'], checkpoint['failed'])
+
+            # Limitare la rows_per_second: așteaptă până când ritmul mediu coboară sub prag
+            if self.rows_per_second:
+                delay = processed_this_run / self.rows_per_second - (time.monotonic() - started)
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+        logging.info("Re-encryption stopped at id %s: %s", checkpoint['last_id'], checkpoint)
+        return checkpoint
+
+    def _finish_pass(self, checkpoint):
+        """Încheie o trecere prin tabelă; întoarce True dacă rularea se oprește aici.
+
+        Migrarea este gata doar dacă trecerea nu a lăsat rânduri cu cheile vechi. Rândurile
+        sărite din cauza unei scrieri concurente sunt reluate imediat, de la id 0; rândurile
+        eșuate (de regulă o cheie veche lipsă) nu se repară singure, așa că rularea se oprește
+        fără `done`, iar o rulare nouă le reia de la început.
+        """
+        pass_skipped, pass_failed = checkpoint['pass_skipped'], checkpoint['pass_failed']
+        if pass_skipped or pass_failed:
+            checkpoint['last_id'] = 0
+            checkpoint['pass'] += 1
+            checkpoint['pass_skipped'] = checkpoint['pass_failed'] = 0
+        else:
+            checkpoint['done'] = True
+        self._save_checkpoint(checkpoint)
+
+        if pass_skipped:
+            logging.info("Re-encryption pass left %s rows changed concurrently; rescanning from id 0",
+                         pass_skipped)
+            return False
+        if pass_failed:
+            logging.warning("Re-encryption pass left %s rows that failed; rerun after fixing the keys",
+                            pass_failed)
+        return True
+
+    def start_background(self, **kwargs):
+        """Pornește migrarea într-un fir de execuție separat"""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        def target():
+            try:
+                self.run(**kwargs)
+            except Exception as e:
+                logging.error("Background re-encryption failed: %s", e, exc_info=True)
+
+        self._thread = threading.Thread(target=target, name='reencryption', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """Oprește migrarea după lotul curent (checkpoint-ul rămâne salvat)"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
@@ -0,0 +1,204 @@
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from services.connection_pool import PoolTimeoutError
+from services.metrics import metrics
+
+# Starea citirilor pentru cererea curentă (None în afara cererilor: CLI, fire de fundal)
+_read_state = ContextVar('bcard_read_state', default=None)
+
+# Cookie-ul cu momentul ultimei scrieri a clientului (epoch, secunde)
+LAST_WRITE_COOKIE = 'bcard_last_write'
+
+# Întârzierea unei replici față de primar, în secunde (0 pe un server care nu este în recovery
+# sau când tot WAL-ul primit a fost aplicat, altfel vechimea ultimei tranzacții aplicate)
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+STRATEGIES = ('round_robin', 'least_connections')
+
+
+class ReplicaUnavailableError(Exception):
+    """Conexiunea la replică a căzut în timpul unei citiri (citirea poate fi reluată pe primar)"""
+
+
+class _ReadState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin_request(last_write, window):
+    """Începe cererea curentă; citirile merg la primar dacă clientul a scris în ultimele `window` secunde
+
+    last_write vine din cookie-ul LAST_WRITE_COOKIE (poate lipsi sau fi invalid). Întoarce un token.
+    """
+    try:
+        pinned = time.time() - float(last_write) < window
+    except (TypeError, ValueError):
+        pinned = False
+    return _read_state.set(_ReadState(pinned))
+
+
+def end_request(token):
+    try:
+        _read_state.reset(token)
+    except ValueError:
+        _read_state.set(None)
+
+
+def note_write():
+    """Marchează o scriere confirmată: restul citirilor cererii merg la primar"""
+    state = _read_state.get()
+    if state is not None:
+        state.pinned = True
+        state.wrote = True
+
+
+def reads_pinned():
+    state = _read_state.get()
+    return state is not None and state.pinned
+
+
+def wrote():
+    """Cererea curentă a scris ceva (răspunsul trebuie să reînnoiască cookie-ul)"""
+    state = _read_state.get()
+    return state is not None and state.wrote
+
+
+class _Replica:
+    __slots__ = ('name', 'pool', 'lag', 'checked_at', 'down_until', 'reads', 'failures')
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None
+        self.checked_at = None
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """Alegerea replicii pentru citiri (round_robin sau least_connections)
+
+    - o replică este verificată cel mult o dată la `check_interval` secunde (LAG_QUERY);
+      una cu întârzierea peste `max_lag` nu primește citiri până la următoarea verificare
+    - o replică la care conexiunea eșuează este ocolită `retry_after` secunde
+    - dacă nicio replică nu este disponibilă, choose() întoarce None și citirea merge la primar
+
+    least_connections compară conexiunile folosite din pool-urile procesului curent
+    (fiecare worker își alege replicile independent).
+    """
+
+    def __init__(self, pools, strategy='round_robin', max_lag=5.0, check_interval=5.0, retry_after=30.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Strategie necunoscută pentru replici: {strategy} (disponibile: {', '.join(STRATEGIES)})")
+        self.replicas = [_Replica(name, pool) for name, pool in pools]
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def _check(self, replica):
+        """Măsoară întârzierea replicii; o conexiune eșuată o scoate din rotație"""
+        try:
+            conn = replica.pool.acquire()
+        except PoolTimeoutError:
+            # Replica este doar ocupată, nu căzută: verificarea se reia la următoarea alegere
+            with self._lock:
+                replica.checked_at = None
+            return
+        except Exception as e:
+            self.mark_down(replica, e)
+            return
+        discard = False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                replica.lag = float(cursor.fetchone()[0])
+            conn.rollback()
+        except Exception as e:
+            discard = True
+            self.mark_down(replica, e)
+        finally:
+            replica.pool.release(conn, discard=discard)
+        if replica.lag is not None and replica.lag > self.max_lag:
+            logging.warning("Replica %s is lagging %.1fs behind the primary; reads go elsewhere",
+                            replica.name, replica.lag)
+
+    def _available(self, replica, now):
+        if replica.down_until > now:
+            return False
+        with self._lock:
+            due = replica.checked_at is None or now - replica.checked_at >= self.check_interval
+            if due:
+                # Un singur fir verifică replica; celelalte folosesc rezultatul anterior
+                replica.checked_at = now
+        if due:
+            self._check(replica)
+        return replica.down_until <= now and replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self):
+        """Replica pentru următoarea citire sau None (primarul)"""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        start = next(self._counter) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        if self.strategy == 'least_connections':
+            ordered.sort(key=lambda replica: replica.pool.in_use)
+        for replica in ordered:
+            if self._available(replica, now):
+                replica.reads += 1
+                return replica
+        metrics.inc('bcard_db_replica_fallbacks_total')
+        return None
+
+    def mark_down(self, replica, error):
+        """Scoate replica din rotație pentru `retry_after` secunde"""
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_after
+            replica.checked_at = None
+            replica.lag = None
+            replica.failures += 1
+        # Conexiunile inactive spre replica căzută ar eșua la următoarea folosire
+        replica.pool.clear_idle()
+        metrics.inc('bcard_db_replica_failures_total', 1, (('replica', replica.name),))
+        logging.warning("Replica %s is unavailable, using the primary for %ss: %s",
+                        replica.name, self.retry_after, error)
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            replica.name: {
+                'status': 'down' if replica.down_until > now else
+                          'lagging' if replica.lag is not None and replica.lag > self.max_lag else
+                          'unknown' if replica.lag is None else 'ok',
+                'lag_seconds': replica.lag,
+                'reads': replica.reads,
+                'failures': replica.failures,
+                'pool': replica.pool.stats()
+            }
+            for replica in self.replicas
+        }
+
+
+metrics.describe('bcard_db_replica_failures_total', 'counter',
+                 'Replici scoase din rotatie dupa o eroare de conexiune, pe replica')
+metrics.describe('bcard_db_replica_fallbacks_total', 'counter',
+                 'Citiri trimise la primar pentru ca nicio replica nu era disponibila')
@@ -0,0 +1,175 @@
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+
+class LocalVersionStore:
+    """Versiuni de invalidare ținute în memoria procesului (un singur worker sau teste)"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, namespaces):
+        with self._lock:
+            return [self._versions.get(namespace, 0) for namespace in namespaces]
+
+    def bump(self, namespaces):
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+
+class RedisVersionStore:
+    """Versiuni de invalidare partajate prin Redis, pentru mai mulți workeri
+
+    În Redis se păstrează doar contoarele de versiune, niciodată datele decriptate.
+    """
+
+    PREFIX = 'bcard:cache-version:'
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get_many(self, namespaces):
+        values = self._client.mget([self.PREFIX + namespace for namespace in namespaces])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, namespaces):
+        pipeline = self._client.pipeline()
+        for namespace in namespaces:
+            pipeline.incr(self.PREFIX + namespace)
+        pipeline.execute()
+
+
+class _CacheEntry:
+    __slots__ = ('ciphertext', 'nonce', 'tag', 'versions', 'expires_at')
+
+    def __init__(self, ciphertext, nonce, tag, versions, expires_at):
+        self.ciphertext = ciphertext
+        self.nonce = nonce
+        self.tag = tag
+        self.versions = versions
+        self.expires_at = expires_at
+
+    def zeroize(self):
+        self.ciphertext[:] = bytes(len(self.ciphertext))
+
+
+class ResponseCache:
+    """Cache LRU limitat în bytes pentru răspunsurile serializate cu carduri decriptate
+
+    Intrările sunt criptate cu o cheie AES-GCM aleatorie, generată per proces, și
+    suprascrise cu zerouri la evacuare. Fiecare intrare reține versiunile
+    namespace-urilor din care a fost construită; o scriere incrementează versiunea,
+    iar intrările vechi devin invalide (și în ceilalți workeri, cu RedisVersionStore).
+    """
+
+    def __init__(self, config):
+        self.enabled = config.get('RESPONSE_CACHE_ENABLED', False)
+        self.max_bytes = config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        self.ttl = config.get('RESPONSE_CACHE_TTL', 30.0)
+        redis_url = config.get('RESPONSE_CACHE_REDIS_URL')
+        self.version_store = RedisVersionStore(redis_url) if redis_url else LocalVersionStore()
+        self._key = get_random_bytes(32)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def versions(self, namespaces):
+        """Versiunile curente; se citesc înainte de a construi răspunsul care va fi salvat"""
+        if not self.enabled:
+            return None
+        try:
+            return self.version_store.get_many(namespaces)
+        except Exception as e:
+            logging.error("Error reading response cache versions: %s", e)
+            return None
+
+    def get(self, key, namespaces):
+        """Întoarce (body, metadate) pentru o intrare validă sau None"""
+        current = self.versions(namespaces)
+        if current is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.versions != current or entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            ciphertext, nonce, tag = bytes(entry.ciphertext), entry.nonce, entry.tag
+
+        plaintext = AES.new(self._key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ciphertext, tag)
+        meta_length = int.from_bytes(plaintext[:4], 'big')
+        meta = json.loads(plaintext[4:4 + meta_length])
+        return plaintext[4 + meta_length:], meta
+
+    def put(self, key, versions, body, meta):
+        """Salvează un răspuns construit sub `versions` (rezultatul lui versions())"""
+        if not self.enabled or versions is None:
+            return
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        plaintext = len(meta_bytes).to_bytes(4, 'big') + meta_bytes + body
+        if len(plaintext) > self.max_bytes:
+            return
+        cipher = AES.new(self._key, AES.MODE_GCM)
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        entry = _CacheEntry(bytearray(ciphertext), cipher.nonce, tag, versions, time.monotonic() + self.ttl)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.ciphertext)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.ciphertext)
+        entry.zeroize()
+
+    def invalidate(self, namespaces):
+        """Invalidează toate răspunsurile construite din namespace-urile date"""
+        if not self.enabled:
+            return
+        try:
+            self.version_store.bump(namespaces)
+            self.invalidations += 1
+        except Exception as e:
+            # Fără invalidare nu putem garanta coerența: golim cache-ul local
+            logging.error("Error invalidating response cache, clearing local entries: %s", e)
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
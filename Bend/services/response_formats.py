@@ -0,0 +1,45 @@
+from models.card import dumps
+
+try:
+    import msgpack
+except ImportError:  # fără msgpack formatul nu este oferit
+    msgpack = None
+
+# Formatele listei de carduri, după tipul media
+# - json: array de obiecte (implicit)
+# - columnar: {"columns": [...], "rows": [[...], ...]}, cheile trimise o singură dată
+# - msgpack: aceleași obiecte ca json, în MessagePack
+FORMATS = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.bcard.columnar+json',
+    'msgpack': 'application/msgpack',
+}
+MIMETYPE_ALIASES = {'application/x-msgpack': 'msgpack'}
+
+
+def available_formats():
+    return [name for name in FORMATS if name != 'msgpack' or msgpack is not None]
+
+
+def negotiate_format(req):
+    """Formatul cerut prin ?format= sau, în lipsă, prin Accept (implicit json)
+
+    Un ?format= necunoscut sau indisponibil ridică ValueError cu detaliile pentru 400.
+    """
+    formats = available_formats()
+    requested = req.args.get('format')
+    if requested:
+        if requested not in formats:
+            raise ValueError({"format": f"Formate disponibile: {', '.join(formats)}"})
+        return requested
+    offered = [FORMATS[name] for name in formats]
+    offered += [mimetype for mimetype, name in MIMETYPE_ALIASES.items() if name in formats]
+    best = req.accept_mimetypes.best_match(offered, default=FORMATS['json'])
+    return MIMETYPE_ALIASES.get(best) or next(name for name, mimetype in FORMATS.items() if mimetype == best)
+
+
+def encode(value, response_format):
+    """Corpul răspunsului (bytes) pentru formatul dat"""
+    if response_format == 'msgpack':
+        return msgpack.packb(value, use_bin_type=True)
+    return dumps(value)
@@ -0,0 +1,456 @@
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from models.card import Card
+from services.metrics import metrics
+from services.storage import CardStorage, DuplicateCardError
+
+# Schema echivalentă cu migrațiile PostgreSQL (001-009)
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cards (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        card_holder_name VARCHAR(100) NOT NULL,
+        card_number TEXT NOT NULL,
+        expiry_date VARCHAR(7) NOT NULL,
+        cvv TEXT NOT NULL,
+        card_type VARCHAR(10) NOT NULL,
+        encryption_type VARCHAR(10) NOT NULL,
+        data_key TEXT,
+        key_id VARCHAR(32) NOT NULL DEFAULT 'v1',
+        last4 VARCHAR(4),
+        brand VARCHAR(16),
+        card_number_index VARCHAR(64),
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cards_created_at_id ON cards (created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_cards_type_created_at ON cards (card_type, created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_cards_encryption_created_at ON cards (encryption_type, created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_cards_expiry_sort ON cards ((substr(expiry_date, 4, 4) || substr(expiry_date, 1, 2)));
+    CREATE INDEX IF NOT EXISTS idx_cards_updated_at_id ON cards (updated_at, id);
+    CREATE TABLE IF NOT EXISTS card_deletions (
+        card_id INTEGER PRIMARY KEY,
+        deleted_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_card_deletions_deleted_at ON card_deletions (deleted_at, card_id);
+"""
+
+# Coloane adăugate după prima versiune a schemei (fișierele existente sunt completate la pornire)
+ADDED_COLUMNS = (
+    ('last4', 'VARCHAR(4)'),
+    ('brand', 'VARCHAR(16)'),
+    ('card_number_index', 'VARCHAR(64)'),
+)
+
+COLUMNS = ', '.join(CardStorage.CARD_COLUMNS)
+
+
+def _to_db_timestamp(value):
+    # Lățime fixă, ca ordonarea textuală să coincidă cu cea cronologică
+    return value.isoformat(sep=' ', timespec='microseconds')
+
+
+def _from_db_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _is_duplicate(error):
+    return isinstance(error, sqlite3.IntegrityError) and 'card_number_index' in str(error)
+
+
+def _dict_row(cursor, row):
+    result = {column[0]: value for column, value in zip(cursor.description, row)}
+    for field in ('created_at', 'updated_at'):
+        if field in result:
+            result[field] = _from_db_timestamp(result[field])
+    return result
+
+
+class SQLiteStorage(CardStorage):
+    """Backend SQLite (fișier local sau ':memory:'), pentru CI și rulare fără server
+
+    O singură conexiune, serializată printr-un lock; timestamp-urile sunt generate
+    în Python (cu microsecunde), sub același lock ca scrierea, și păstrate ca text ISO.
+    """
+
+    EXPIRY_SORT_KEY = "(substr(expiry_date, 4, 4) || substr(expiry_date, 1, 2))"
+
+    # 13 parametri per rând; SQLite acceptă implicit cel mult 32766 parametri per instrucțiune
+    INSERT_BATCH_SIZE = 500
+
+    def __init__(self, config):
+        self.path = config.get('SQLITE_PATH', 'bcard.sqlite3')
+        self.tombstone_retention = timedelta(seconds=config.get('CHANGES_TOMBSTONE_RETENTION', 7 * 24 * 3600))
+        # Reentrant: scrierile iau timestamp-ul și execută instrucțiunea sub același lock
+        self._lock = threading.RLock()
+        self._clock_lock = threading.Lock()
+        self._last_timestamp = None
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = _dict_row
+        self._conn.execute("PRAGMA journal_mode=WAL" if self.path != ':memory:' else "PRAGMA journal_mode=MEMORY")
+        self._conn.executescript(SCHEMA)
+        existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(cards)").fetchall()}
+        for column, column_type in ADDED_COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE cards ADD COLUMN {column} {column_type}")
+        # Indexul orb (căutare după număr); unic doar cu CARDS_UNIQUE_NUMBER
+        if config.get('CARDS_UNIQUE_NUMBER'):
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_number_index_unique "
+                               "ON cards (card_number_index)")
+        else:
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_number_index ON cards (card_number_index)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_backfill_missing ON cards (id) "
+                           "WHERE last4 IS NULL OR card_number_index IS NULL")
+        self._conn.commit()
+        logging.info("SQLite storage ready at %s", self.path)
+
+    def _now(self):
+        # Timestamp-uri strict crescătoare în acest proces (CURRENT_TIMESTAMP are doar secunde)
+        with self._clock_lock:
+            now = datetime.now()
+            if self._last_timestamp is not None and now <= self._last_timestamp:
+                now = self._last_timestamp + timedelta(microseconds=1)
+            self._last_timestamp = now
+            return now
+
+    def _execute(self, query, params=(), write=False):
+        """Rulează o interogare sub lock; întoarce toate rândurile (și rowcount)"""
+        try:
+            with self._lock:
+                with metrics.stage('db_query'):
+                    cursor = self._conn.execute(query, params)
+                    rows = cursor.fetchall()
+                    rowcount = cursor.rowcount
+                    if write:
+                        self._conn.commit()
+                return rows, rowcount
+        except Exception as e:
+            metrics.error('db')
+            logging.error("SQLite error: %s", e, exc_info=True)
+            if write:
+                self._conn.rollback()
+            if _is_duplicate(e):
+                raise DuplicateCardError(str(e)) from e
+            raise
+
+    def test_connection(self):
+        self._execute("SELECT 1")
+
+    def pool_stats(self):
+        return {'backend': 'sqlite', 'path': self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _build_cards_query(self, limit=None, after=None, card_type=None, encryption_type=None,
+                           expires_from=None, expires_to=None, columns=None):
+        if columns and not set(columns) <= set(self.CARD_COLUMNS):
+            raise ValueError(f"Unknown columns: {sorted(set(columns) - set(self.CARD_COLUMNS))}")
+        conditions = []
+        params = []
+        if card_type:
+            conditions.append("card_type = ?")
+            params.append(card_type)
+        if encryption_type:
+            conditions.append("encryption_type = ?")
+            params.append(encryption_type)
+        if expires_from:
+            conditions.append(f"{self.EXPIRY_SORT_KEY} >= ?")
+            params.append(expires_from)
+        if expires_to:
+            conditions.append(f"{self.EXPIRY_SORT_KEY} <= ?")
+            params.append(expires_to)
+        if after:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend([_to_db_timestamp(after[0]), after[1]])
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        return f"""
+            SELECT {', '.join(columns) if columns else COLUMNS}
+            FROM cards
+            {where_clause}
+            ORDER BY created_at DESC, id DESC
+            {limit_clause}
+        """, params
+
+    def get_cards(self, **filters):
+        query, params = self._build_cards_query(**filters)
+        rows, _ = self._execute(query, params)
+        logging.info("Successfully fetched %s cards from database", len(rows))
+        return [Card.from_mapping(row) for row in rows]
+
+    def iter_cards(self, batch_size=1000, limit=None, after=None, **filters):
+        # Pagini keyset succesive: conexiunea nu rămâne ocupată între loturi
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            rows = self.get_cards(limit=size, after=after, **filters)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = (rows[-1].created_at, rows[-1].id)
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def get_card_by_id(self, card_id):
+        rows, _ = self._execute(f"SELECT {COLUMNS} FROM cards WHERE id = ?", (card_id,))
+        return Card.from_mapping(rows[0]) if rows else None
+
+    def get_cards_version(self):
+        rows, _ = self._execute("SELECT count(*) AS count, max(updated_at) AS updated_at, max(id) AS id FROM cards")
+        return rows[0]['count'], rows[0]['updated_at'], rows[0]['id']
+
+    def get_card_version(self, card_id):
+        rows, _ = self._execute("SELECT updated_at FROM cards WHERE id = ?", (card_id,))
+        return rows[0]['updated_at'] if rows else None
+
+    def get_changes(self, after=None, limit=None, columns=None):
+        select = self._returning(columns)
+        after = after or (datetime.min, 0)
+        after = (_to_db_timestamp(after[0]), after[1])
+        limit_clause = "LIMIT ?" if limit is not None else ""
+        limit_params = (limit,) if limit is not None else ()
+        with self._lock:
+            # Timestamp-urile se iau sub lock, deci toate cele mai mici decât orizontul sunt confirmate
+            horizon = self._now()
+            rows, _ = self._execute(f"""
+                SELECT {select} FROM cards
+                WHERE (updated_at, id) > (?, ?)
+                ORDER BY updated_at, id
+                {limit_clause}
+            """, (*after, *limit_params))
+            deletions, _ = self._execute(f"""
+                SELECT card_id, deleted_at FROM card_deletions
+                WHERE (deleted_at, card_id) > (?, ?)
+                ORDER BY deleted_at, card_id
+                {limit_clause}
+            """, (*after, *limit_params))
+        return ([Card.from_mapping(row) for row in rows],
+                [(row['card_id'], _from_db_timestamp(row['deleted_at'])) for row in deletions],
+                horizon)
+
+    def find_cards_by_number_index(self, number_index, columns=None):
+        columns = columns or self.CARD_COLUMNS
+        unknown = set(columns) - set(self.CARD_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        rows, _ = self._execute(f"""
+            SELECT {', '.join(columns)} FROM cards WHERE card_number_index = ? ORDER BY id
+        """, (number_index,))
+        return [Card.from_mapping(row) for row in rows]
+
+    def find_number_index_owners(self, number_indexes):
+        number_indexes = list(number_indexes)
+        owners = {}
+        # Aceeași limită de parametri ca la INSERT-ul multi-rând
+        for start in range(0, len(number_indexes), self.INSERT_BATCH_SIZE):
+            chunk = number_indexes[start:start + self.INSERT_BATCH_SIZE]
+            rows, _ = self._execute(f"""
+                SELECT card_number_index, min(id) AS id
+                FROM cards
+                WHERE card_number_index IN ({', '.join(['?'] * len(chunk))})
+                GROUP BY card_number_index
+            """, chunk)
+            owners.update((row['card_number_index'], row['id']) for row in rows)
+        return owners
+
+    def _insert_params(self, card_data, now):
+        return (
+            card_data['card_holder_name'],
+            card_data['card_number'],
+            card_data['expiry_date'],
+            card_data['cvv'],
+            card_data['card_type'],
+            card_data['encryption_type'],
+            card_data.get('data_key'),
+            card_data.get('key_id', 'v1'),
+            card_data.get('last4'),
+            card_data.get('brand'),
+            card_data.get('card_number_index'),
+            now,
+            now
+        )
+
+    def _returning(self, columns):
+        # Lista de coloane pentru SELECT/RETURNING (toate, dacă proiecția lipsește)
+        if columns and not set(columns) <= set(self.CARD_COLUMNS):
+            raise ValueError(f"Unknown columns: {sorted(set(columns) - set(self.CARD_COLUMNS))}")
+        return ', '.join(columns) if columns else COLUMNS
+
+    def create_card(self, card_data, columns=None):
+        with self._lock:
+            rows, _ = self._execute(f"""
+                INSERT INTO cards (
+                    card_holder_name, card_number, expiry_date,
+                    cvv, card_type, encryption_type, data_key, key_id, last4, brand, card_number_index,
+                    created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING {self._returning(columns)}
+            """, self._insert_params(card_data, _to_db_timestamp(self._now())), write=True)
+        logging.info("Successfully created new card with ID %s", rows[0]['id'])
+        return Card.from_mapping(rows[0])
+
+    def create_cards(self, cards_data):
+        if not cards_data:
+            return []
+        # INSERT-uri multi-rând (limitate de numărul maxim de parametri SQLite), într-o tranzacție
+        ids = []
+        with self._lock:
+            try:
+                for start in range(0, len(cards_data), self.INSERT_BATCH_SIZE):
+                    chunk = cards_data[start:start + self.INSERT_BATCH_SIZE]
+                    params = []
+                    for card_data in chunk:
+                        params.extend(self._insert_params(card_data, _to_db_timestamp(self._now())))
+                    with metrics.stage('db_query'):
+                        rows = self._conn.execute(f"""
+                            INSERT INTO cards (
+                                card_holder_name, card_number, expiry_date,
+                                cvv, card_type, encryption_type, data_key, key_id, last4, brand,
+                                card_number_index, created_at, updated_at
+                            ) VALUES {', '.join(['(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'] * len(chunk))}
+                            RETURNING id
+                        """, params).fetchall()
+                    # Ordinea rândurilor din RETURNING nu este garantată; ID-urile cresc cu ordinea valorilor
+                    ids.extend(sorted(row['id'] for row in rows))
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                metrics.error('db')
+                logging.error("Error creating cards in bulk: %s", e, exc_info=True)
+                if _is_duplicate(e):
+                    raise DuplicateCardError(str(e)) from e
+                raise
+        logging.info("Successfully created %s cards in bulk", len(ids))
+        return ids
+
+    def update_card(self, card_id, card_data, columns=None):
+        updated = [column for column in self.UPDATABLE_COLUMNS if column in card_data]
+        if not updated:
+            raise ValueError("Nu există câmpuri de actualizat")
+        assignments = ', '.join(f"{column} = ?" for column in updated)
+        with self._lock:
+            rows, _ = self._execute(f"""
+                UPDATE cards
+                SET {assignments}, updated_at = ?
+                WHERE id = ?
+                RETURNING {self._returning(columns)}
+            """, [card_data[column] for column in updated] + [_to_db_timestamp(self._now()), card_id], write=True)
+        return Card.from_mapping(rows[0]) if rows else None
+
+    def delete_card(self, card_id):
+        # Ștergerea, intrarea în jurnal și eliminarea intrărilor expirate, într-o tranzacție
+        with self._lock:
+            try:
+                with metrics.stage('db_query'):
+                    deleted = self._conn.execute("DELETE FROM cards WHERE id = ?", (card_id,)).rowcount > 0
+                    if deleted:
+                        now = self._now()
+                        self._conn.execute("INSERT OR REPLACE INTO card_deletions (card_id, deleted_at) VALUES (?, ?)",
+                                           (card_id, _to_db_timestamp(now)))
+                        self._conn.execute("DELETE FROM card_deletions WHERE deleted_at < ?",
+                                           (_to_db_timestamp(now - self.tombstone_retention),))
+                self._conn.commit()
+                return deleted
+            except Exception as e:
+                self._conn.rollback()
+                metrics.error('db')
+                logging.error("Error deleting card %s: %s", card_id, e, exc_info=True)
+                raise
+
+    def get_cards_to_reencrypt(self, after_id, limit, key_id, encryption_type=None):
+        conditions = ["id > ?"]
+        params = [after_id]
+        if encryption_type:
+            conditions.append("(key_id <> ? OR encryption_type <> ?)")
+            params.extend([key_id, encryption_type])
+        else:
+            conditions.append("key_id <> ?")
+            params.append(key_id)
+        params.append(limit)
+        rows, _ = self._execute(f"""
+            SELECT id, card_number, cvv, encryption_type, data_key, key_id, updated_at
+            FROM cards
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT ?
+        """, params)
+        return rows
+
+    def update_encrypted_fields(self, cards_data):
+        if not cards_data:
+            return []
+        # Rândurile modificate între citire și scriere (updated_at diferit) nu sunt atinse
+        updated_ids = []
+        with self._lock:
+            try:
+                for card_data in cards_data:
+                    cursor = self._conn.execute("""
+                        UPDATE cards
+                        SET card_number = ?, cvv = ?, encryption_type = ?, data_key = ?, key_id = ?,
+                            updated_at = ?
+                        WHERE id = ? AND updated_at = ?
+                    """, (
+                        card_data['card_number'],
+                        card_data['cvv'],
+                        card_data['encryption_type'],
+                        card_data.get('data_key'),
+                        card_data['key_id'],
+                        _to_db_timestamp(self._now()),
+                        card_data['id'],
+                        _to_db_timestamp(card_data['updated_at'])
+                    ))
+                    if cursor.rowcount:
+                        updated_ids.append(card_data['id'])
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                metrics.error('db')
+                logging.error("Error re-encrypting cards: %s", e, exc_info=True)
+                raise
+        return updated_ids
+
+    def get_cards_to_backfill(self, after_id, limit):
+        rows, _ = self._execute("""
+            SELECT id, card_number, encryption_type, data_key, key_id, updated_at
+            FROM cards
+            WHERE (last4 IS NULL OR card_number_index IS NULL) AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, limit))
+        return rows
+
+    def update_derived_fields(self, cards_data):
+        updated_ids = []
+        with self._lock:
+            try:
+                for card_data in cards_data:
+                    cursor = self._conn.execute("""
+                        UPDATE cards
+                        SET last4 = ?, brand = ?, card_number_index = ?, updated_at = ?
+                        WHERE id = ? AND updated_at = ?
+                    """, (
+                        card_data['last4'],
+                        card_data['brand'],
+                        card_data['card_number_index'],
+                        _to_db_timestamp(self._now()),
+                        card_data['id'],
+                        _to_db_timestamp(card_data['updated_at'])
+                    ))
+                    if cursor.rowcount:
+                        updated_ids.append(card_data['id'])
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                metrics.error('db')
+                logging.error("Error backfilling derived fields: %s", e, exc_info=True)
+                if _is_duplicate(e):
+                    raise DuplicateCardError(str(e)) from e
+                raise
+        return updated_ids
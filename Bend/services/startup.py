@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from services.metrics import metrics
+
+STARTUP_MODES = ('eager', 'lazy', 'background')
+
+
+class Startup:
+    """Inițializarea serviciilor (criptare, stocare, cache) și starea de disponibilitate
+
+    Moduri (STARTUP_MODE):
+    - eager: serviciile sunt create în create_app(); o eroare oprește pornirea
+    - lazy: serviciile sunt create la prima cerere care are nevoie de ele
+    - background: serviciile sunt create într-un fir separat, reîncercând până reușesc
+
+    Durata fiecărei etape este scrisă în log și în bcard_startup_phase_seconds. După o eroare
+    starea (publică, în /api/ready și în 503) conține doar etapa eșuată; excepția rămâne în log.
+    """
+
+    def __init__(self, config):
+        self.mode = config.get('STARTUP_MODE', 'eager')
+        if self.mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode: {self.mode}")
+        self.retry_interval = config.get('STARTUP_RETRY_INTERVAL', 5.0)
+        self.phases = {}
+        self.failed_phase = None
+        # Etapa în care a eșuat încercarea curentă (failed_phase se schimbă doar la final)
+        self._attempt_failure = None
+        self._started = time.perf_counter()
+        self._initializer = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @contextmanager
+    def phase(self, name):
+        """Măsoară o etapă a pornirii"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            # Etapele sunt imbricate: prima care iese cu eroare este cea mai specifică
+            if self._attempt_failure is None:
+                self._attempt_failure = name
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = round(elapsed, 6)
+            metrics.observe('bcard_startup_phase_seconds', elapsed, (('phase', name),))
+            logging.info("Startup phase %s took %.1f ms", name, elapsed * 1000)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self, initializer):
+        """Pornește inițializarea serviciilor conform modului ales
+
+        initializer este apelat o singură dată cu succes (reîncercat după o eroare).
+        """
+        self._initializer = initializer
+        if self.mode == 'eager':
+            self._run()
+        elif self.mode == 'background':
+            self._thread = threading.Thread(target=self._run_until_ready, name='bcard-startup', daemon=True)
+            self._thread.start()
+        else:
+            logging.info("Startup mode lazy: services will be initialized on first use")
+
+    def ensure(self):
+        """Întoarce True dacă serviciile sunt disponibile; în modul lazy le inițializează acum"""
+        if self._ready.is_set():
+            return True
+        if self.mode != 'lazy' or self._initializer is None:
+            return False
+        with self._lock:
+            if not self._ready.is_set():
+                try:
+                    self._run()
+                except Exception:
+                    # Etapa eșuată rămâne în status; următoarea cerere reîncearcă
+                    return False
+        return True
+
+    def _run(self):
+        self._attempt_failure = None
+        try:
+            with self.phase('services'):
+                self._initializer()
+        except Exception as e:
+            self.failed_phase = self._attempt_failure
+            logging.error("Error initializing services in phase %s: %s", self.failed_phase, e, exc_info=True)
+            raise
+        self.failed_phase = None
+        self._ready.set()
+        logging.info("Services ready after %.1f ms (startup mode %s)",
+                     (time.perf_counter() - self._started) * 1000, self.mode)
+
+    def after_fork(self):
+        """Apelat într-un worker nou: firul de inițializare din părinte nu este moștenit"""
+        self._lock = threading.Lock()
+        if self.mode == 'background' and self._initializer is not None and not self.ready:
+            self._thread = threading.Thread(target=self._run_until_ready, name='bcard-startup', daemon=True)
+            self._thread.start()
+
+    def _run_until_ready(self):
+        while not self._ready.is_set():
+            try:
+                self._run()
+            except Exception:
+                time.sleep(self.retry_interval)
+
+    def status(self):
+        """Starea pentru /api/ready"""
+        return {
+            'status': 'ready' if self.ready else ('failed' if self.failed_phase else 'starting'),
+            'mode': self.mode,
+            'failed_phase': self.failed_phase,
+            'phases': dict(self.phases)
+        }
+
+
+metrics.describe('bcard_startup_phase_seconds', 'histogram',
+                 'Durata etapelor de pornire (config, keys, routes, encryption, storage, services)',
+                 buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
@@ -0,0 +1,134 @@
+from models.card import CARD_FIELDS
+
+
+class DuplicateCardError(Exception):
+    """Numărul cardului există deja (indexul orb unic, CARDS_UNIQUE_NUMBER)"""
+
+
+class CardStorage:
+    """Interfața de stocare pentru carduri, implementată de fiecare backend
+
+    Citirile și scrierile întorc obiecte Card (models/card.py); coloanele din afara
+    proiecției cerute rămân None, iar created_at/updated_at sunt obiecte datetime.
+    Loturile pentru re-criptare și completare sunt dicționare. Listarea este ordonată
+    după (created_at DESC, id DESC), iar scrierile întorc rândul rezultat (echivalentul
+    RETURNING din PostgreSQL).
+    """
+
+    CARD_COLUMNS = CARD_FIELDS
+
+    # Coloanele care pot fi modificate printr-o actualizare parțială; card_number_index
+    # (HMAC-ul numărului, pentru căutare) se scrie, dar nu face parte din proiecție
+    UPDATABLE_COLUMNS = (
+        'card_holder_name', 'card_number', 'expiry_date', 'cvv',
+        'card_type', 'encryption_type', 'data_key', 'key_id', 'last4', 'brand',
+        'card_number_index'
+    )
+
+    def test_connection(self):
+        """Verifică faptul că backend-ul este disponibil (ridică excepție altfel)"""
+        raise NotImplementedError
+
+    def pool_stats(self):
+        """Statistici despre conexiuni (dicționar; poate fi gol)"""
+        return {}
+
+    def close(self):
+        """Eliberează conexiunile (la oprirea unui worker)"""
+
+    # Citire
+    def get_cards(self, limit=None, after=None, card_type=None, encryption_type=None,
+                  expires_from=None, expires_to=None, columns=None):
+        """Lista de carduri; `after` = (created_at, id), expires_* în formatul YYYYMM
+
+        `columns` restrânge proiecția la coloanele date (implicit CARD_COLUMNS).
+        """
+        raise NotImplementedError
+
+    def iter_cards(self, batch_size=1000, **filters):
+        """Ca get_cards, dar parcurge rezultatul câte `batch_size` rânduri"""
+        raise NotImplementedError
+
+    def get_card_by_id(self, card_id):
+        """Cardul cu ID-ul dat sau None"""
+        raise NotImplementedError
+
+    def get_cards_version(self):
+        """(număr de rânduri, max(updated_at), max(id)), folosit pentru ETag"""
+        raise NotImplementedError
+
+    def get_card_version(self, card_id):
+        """updated_at pentru un card sau None dacă nu există"""
+        raise NotImplementedError
+
+    def get_changes(self, after=None, limit=None, columns=None):
+        """Modificările de după poziția `after` = (timestamp, id), pentru GET /api/cards/changes
+
+        Întoarce (carduri, ștergeri, orizont): cardurile create sau modificate, ordonate după
+        (updated_at, id), și ștergerile [(id, deleted_at)] din jurnal, ordonate după
+        (deleted_at, id), fiecare listă cu cel mult `limit` elemente. Ambele conțin doar
+        evenimente anterioare orizontului: o modificare încă neconfirmată nu poate primi un
+        timestamp mai mic decât acesta, deci poziția poate avansa până la el fără pierderi.
+        """
+        raise NotImplementedError
+
+    def find_cards_by_number_index(self, number_index, columns=None):
+        """Cardurile cu indexul orb dat (ordonate după id), fără a decripta nimic"""
+        raise NotImplementedError
+
+    def find_number_index_owners(self, number_indexes):
+        """{index orb: id-ul primului card care îl folosește}, pentru indexurile date"""
+        raise NotImplementedError
+
+    # Scriere; cu indexul orb unic, un număr duplicat ridică DuplicateCardError
+    def create_card(self, card_data, columns=None):
+        """Inserează un card; întoarce rândul creat, restrâns la `columns` (implicit toate)"""
+        raise NotImplementedError
+
+    def create_cards(self, cards_data):
+        """Inserează mai multe carduri atomic; întoarce ID-urile, în ordinea intrării"""
+        raise NotImplementedError
+
+    def update_card(self, card_id, card_data, columns=None):
+        """Actualizează coloanele prezente; întoarce rândul (restrâns la `columns`) sau None dacă nu există"""
+        raise NotImplementedError
+
+    def delete_card(self, card_id):
+        """Șterge un card și îl trece în jurnalul ștergerilor; întoarce True dacă a existat
+
+        Intrările din jurnal mai vechi de CHANGES_TOMBSTONE_RETENTION secunde sunt eliminate.
+        """
+        raise NotImplementedError
+
+    # Re-criptare pe loturi
+    def get_cards_to_reencrypt(self, after_id, limit, key_id, encryption_type=None):
+        """Următorul lot (ordonat după id) de carduri care nu folosesc cheia sau tipul țintă"""
+        raise NotImplementedError
+
+    def update_encrypted_fields(self, cards_data):
+        """Rescrie câmpurile criptate (și avansează updated_at) dacă updated_at nu s-a schimbat; întoarce ID-urile actualizate"""
+        raise NotImplementedError
+
+    # Completarea câmpurilor derivate din număr (last4, brand, card_number_index) pentru rândurile vechi
+    def get_cards_to_backfill(self, after_id, limit):
+        """Următorul lot (ordonat după id) de carduri cu last4 sau card_number_index necompletat"""
+        raise NotImplementedError
+
+    def update_derived_fields(self, cards_data):
+        """Scrie last4/brand/card_number_index dacă updated_at nu s-a schimbat; întoarce ID-urile actualizate"""
+        raise NotImplementedError
+
+
+def create_storage(config):
+    """Creează backend-ul de stocare ales prin STORAGE_BACKEND (postgres, memory, sqlite)"""
+    backend = config.get('STORAGE_BACKEND', 'postgres')
+    if backend == 'postgres':
+        from services.db_service import DatabaseService
+        return DatabaseService(config)
+    if backend == 'memory':
+        from services.memory_storage import InMemoryStorage
+        return InMemoryStorage(config)
+    if backend == 'sqlite':
+        from services.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(config)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+BEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BEND_DIR)
+
+from config import Config  # noqa: E402
+
+SAMPLE_CARD = {
+    'card_holder_name': 'Ion Popescu',
+    'card_number': '4111 1111 1111 1111',
+    'expiry_date': '12/2030',
+    'cvv': '123',
+    'card_type': 'credit',
+    'encryption_type': 'sync'
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Aplicația completă cu backend-ul în memorie
+
+    Blueprint-ul de carduri se înregistrează o singură dată per proces, deci aplicația
+    este creată o dată pentru toată sesiunea; tabela este golită înaintea fiecărui test.
+    """
+    from app import create_app
+    Config.STORAGE_BACKEND = 'memory'
+    Config.STARTUP_MODE = 'eager'
+    Config.LOG_ASYNC = False
+    Config.LOG_REQUESTS = False
+    Config.REENCRYPT_IN_BACKGROUND = False
+    Config.RSA_PUBLIC_KEY_PATH = os.path.join(BEND_DIR, 'keys', 'public_key.pem')
+    Config.RSA_PRIVATE_KEY_PATH = os.path.join(BEND_DIR, 'keys', 'private_key.pem')
+    return create_app()
+
+
+@pytest.fixture
+def db(app):
+    storage = app.extensions['db_service']
+    storage.reset()
+    app.extensions['response_cache'].invalidate(['cards'])
+    return storage
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def sample_card():
+    return dict(SAMPLE_CARD)
+
+
+@pytest.fixture
+def seed(app, db):
+    """Inserează `count` carduri criptate (sync) direct în tabela din memorie; întoarce ID-urile"""
+    import routes.card_routes as card_routes
+
+    def insert(count, **overrides):
+        encryption_service = card_routes.encryption_service
+        card = dict(SAMPLE_CARD, **overrides)
+        card_number = card['card_number'].replace(' ', '')
+        (encrypted_number, encrypted_cvv), data_key = encryption_service.encrypt_fields(
+            [card_number, card['cvv']], card['encryption_type']
+        )
+        row = dict(card, card_number=encrypted_number, cvv=encrypted_cvv, data_key=data_key,
+                   key_id=encryption_service.key_id, last4=card_number[-4:], brand='visa',
+                   card_number_index=encryption_service.number_index(card_number))
+        return [db.create_card(row).id for _ in range(count)]
+    return insert
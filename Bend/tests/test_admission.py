@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected, begin_request, end_request
+
+
+@pytest.fixture
+def budget():
+    """Bugetul unei cereri (3 operații RSA) pe durata testului"""
+    token = begin_request(3)
+    yield
+    end_request(token)
+
+
+def make_controller(**config):
+    return AdmissionController({'RSA_MAX_CONCURRENT': 1, 'RSA_MAX_QUEUE': 1, 'RSA_MAX_WAIT': 0.01,
+                                'ADMISSION_RETRY_AFTER': 2, **config})
+
+
+def hold_slot(controller):
+    """Ocupă singurul loc RSA dintr-un alt fir până la release.set()"""
+    acquired, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit():
+            acquired.set()
+            release.wait(2)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    acquired.wait(2)
+    return release, thread
+
+
+def rejection(controller, operations=1):
+    with pytest.raises(AdmissionRejected) as error:
+        with controller.admit(operations):
+            pass
+    return error.value
+
+
+def test_request_budget_is_enforced(budget):
+    controller = make_controller()
+    with controller.admit(2):
+        assert controller.stats()['in_flight'] == 1
+    error = rejection(controller, 2)
+    assert (error.reason, error.retry_after) == ('budget', 2)
+    with controller.admit(1):
+        pass
+    assert rejection(controller).reason == 'budget'
+
+
+def test_timeout_does_not_consume_the_budget(budget):
+    controller = make_controller()
+    release, thread = hold_slot(controller)
+    try:
+        assert rejection(controller, 3).reason == 'timeout'
+    finally:
+        release.set()
+        thread.join()
+    with controller.admit(3):
+        pass
+
+
+def test_full_queue_is_rejected_without_waiting(budget):
+    controller = make_controller(RSA_MAX_QUEUE=0, RSA_MAX_WAIT=5)
+    release, thread = hold_slot(controller)
+    try:
+        assert rejection(controller).reason == 'queue_full'
+    finally:
+        release.set()
+        thread.join()
+    assert controller.stats() == {'max_concurrent': 1, 'in_flight': 0, 'waiting': 0, 'max_queue': 0}
+    with controller.admit(3):
+        pass
+
+
+def test_disabled_controller_admits_everything(budget):
+    controller = make_controller(ADMISSION_ENABLED=False)
+    with controller.admit(10), controller.admit(10):
+        pass
+
+
+def test_no_budget_outside_requests():
+    controller = make_controller()
+    with controller.admit(1000):
+        pass
+
+
+def test_route_answers_503_with_retry_after(client, seed, app, monkeypatch):
+    seed(2, encryption_type='async')
+    monkeypatch.setitem(app.config, 'RSA_REQUEST_BUDGET', 1)
+    response = client.get('/api/cards?view=full')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app.config['ADMISSION_RETRY_AFTER'])
+    assert response.get_json()['details']['reason'] == 'budget'
+
+    monkeypatch.setitem(app.config, 'RSA_REQUEST_BUDGET', 4)
+    assert client.get('/api/cards?view=full').status_code == 200
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def encryption_service(app):
+    import routes.card_routes as card_routes
+    return card_routes.encryption_service
+
+
+def test_bulk_reports_each_row(client, db, sample_card):
+    records = [sample_card, dict(sample_card, cvv='1'), 'not an object', dict(sample_card, encryption_type='hybrid')]
+    response = client.post('/api/cards/bulk', json=records)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (2, 2)
+    assert [sorted(result) for result in body['results']] == [['id', 'index'], ['errors', 'index'],
+                                                              ['errors', 'index'], ['id', 'index']]
+    assert set(body['results'][1]['errors']) == {'cvv'}
+    assert len(db.get_cards()) == 2
+
+
+def test_bulk_ndjson_reports_invalid_lines(client, sample_card):
+    body = '\n'.join([json.dumps(sample_card), '{not json', '', json.dumps(sample_card)])
+    response = client.post('/api/cards/bulk', data=body, content_type='application/x-ndjson')
+    results = response.get_json()['results']
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert 'JSON invalid' in results[1]['errors']['record']
+    assert 'id' in results[0] and 'id' in results[2]
+
+
+def test_bulk_spans_several_chunks(client, db, sample_card, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'BULK_CHUNK_SIZE', 2)
+    response = client.post('/api/cards/bulk', json=[sample_card] * 5)
+    assert response.get_json()['created'] == 5
+    assert len(db.get_cards()) == 5
+
+
+def test_bulk_rejects_too_many_records(client, sample_card, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'BULK_MAX_ROWS', 2)
+    response = client.post('/api/cards/bulk', json=[sample_card] * 3)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Too many records'
+
+
+def test_bulk_encryption_failure_hides_the_exception(client, db, sample_card, encryption_service, monkeypatch):
+    encrypt_many = encryption_service.encrypt_many
+
+    def fail_second(records):
+        results = encrypt_many(records)
+        results[1] = ValueError("RSA key /secret/path/private_key.pem unreadable")
+        return results
+
+    monkeypatch.setattr(encryption_service, 'encrypt_many', fail_second)
+    response = client.post('/api/cards/bulk', json=[sample_card] * 3)
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (2, 1)
+    assert body['results'][1] == {'index': 1, 'errors': {'encryption': 'Error encrypting data'}}
+    assert 'secret' not in response.get_data(as_text=True)
+
+
+def test_bulk_database_failure_fails_only_its_chunk(client, db, sample_card, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'BULK_CHUNK_SIZE', 2)
+    create_cards = db.create_cards
+    calls = []
+
+    def fail_second_chunk(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection to postgres://admin:secret@db failed")
+        return create_cards(rows)
+
+    monkeypatch.setattr(db, 'create_cards', fail_second_chunk)
+    response = client.post('/api/cards/bulk', json=[sample_card] * 5)
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (3, 2)
+    assert [result.get('errors') for result in body['results'][2:4]] == [{'database': 'Error saving card'}] * 2
+    assert 'secret' not in response.get_data(as_text=True)
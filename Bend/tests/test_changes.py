@@ -0,0 +1,40 @@
+def test_changes_feed_reports_updates_and_deletions(client, seed):
+    first, second = seed(2)
+    body = client.get('/api/cards/changes').get_json()
+    assert [card['id'] for card in body['changes']] == [first, second]
+    assert body['deleted'] == []
+    assert body['has_more'] is False
+
+    client.patch(f'/api/cards/{first}', json={'card_holder_name': 'Maria Ionescu'})
+    client.delete(f'/api/cards/{second}')
+    body = client.get(f"/api/cards/changes?since={body['next']}").get_json()
+    assert [card['id'] for card in body['changes']] == [first]
+    assert body['changes'][0]['card_holder_name'] == 'Maria Ionescu'
+    assert body['deleted'] == [second]
+
+    body = client.get(f"/api/cards/changes?since={body['next']}").get_json()
+    assert body['changes'] == [] and body['deleted'] == []
+
+
+def test_changes_rejects_invalid_token(client):
+    response = client.get('/api/cards/changes?since=abc')
+    assert response.status_code == 400
+    assert 'since' in response.get_json()['details']
+
+
+def test_event_stream_is_disabled_by_default(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CHANGES_STREAM_ENABLED', False)
+    response = client.get('/api/cards/changes', headers={'Accept': 'text/event-stream'})
+    assert response.status_code == 406
+    assert client.get('/api/cards/changes').status_code == 200
+
+
+def test_event_stream_sends_changes_when_enabled(client, seed, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CHANGES_STREAM_ENABLED', True)
+    monkeypatch.setitem(app.config, 'CHANGES_STREAM_MAX_DURATION', 0)
+    card_id, = seed(1)
+    response = client.get('/api/cards/changes', headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    event = response.get_data(as_text=True)
+    assert event.startswith('event: changes\n')
+    assert f'"id":{card_id}' in event.replace(' ', '')
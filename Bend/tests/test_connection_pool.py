@@ -0,0 +1,213 @@
+import gc
+import os
+import threading
+
+import pytest
+from psycopg2 import extensions
+
+from services import connection_pool
+from services.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """Conexiune falsă: răspunde la verificarea SELECT 1 cât timp `alive` este True"""
+
+    def __init__(self):
+        self.closed = 0
+        self.alive = True
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if not connection.alive:
+                    raise OSError("server closed the connection unexpectedly")
+
+        return Cursor()
+
+    def get_transaction_status(self):
+        return self.transaction_status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        self.connections = []
+        self.fail_connect = 0
+        super().__init__({}, **kwargs)
+
+    def _connect(self):
+        if self.fail_connect:
+            self.fail_connect -= 1
+            raise OSError("could not connect to server")
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        FakePool(max_size=0)
+
+
+def test_warm_up_opens_min_size_connections():
+    pool = FakePool(min_size=2, max_size=4)
+    conn = pool.acquire()
+    assert len(pool.connections) == 2
+    stats = pool.stats()
+    assert (stats['size'], stats['in_use'], stats['idle']) == (2, 1, 1)
+    pool.release(conn)
+
+
+def test_released_connection_is_reused():
+    pool = FakePool(min_size=0, max_size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(pool.connections) == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_acquire_times_out_when_the_pool_is_exhausted():
+    pool = FakePool(min_size=0, max_size=1)
+    pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waiting'] == 0
+
+
+def test_waiter_gets_the_released_connection():
+    pool = FakePool(min_size=0, max_size=1)
+    conn = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=2)))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(2)
+    assert acquired == [conn]
+
+
+def test_dead_idle_connection_is_replaced():
+    pool = FakePool(min_size=0, max_size=2, check_after=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed
+    stats = pool.stats()
+    assert (stats['discarded'], stats['size']) == (1, 1)
+
+
+def test_recent_connection_skips_the_liveness_check():
+    pool = FakePool(min_size=0, max_size=2, check_after=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    assert pool.acquire() is conn
+
+
+def test_release_rolls_back_an_open_transaction():
+    pool = FakePool(min_size=0, max_size=1)
+    conn = pool.acquire()
+    conn.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_discarded_connection_frees_its_slot():
+    pool = FakePool(min_size=0, max_size=1)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.closed
+    assert pool.acquire(timeout=0.05) is not conn
+
+
+def test_failed_connect_frees_its_slot():
+    pool = FakePool(min_size=0, max_size=1)
+    pool.fail_connect = 1
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()['size'] == 0
+    pool.acquire(timeout=0.05)
+
+
+def test_closed_pool_refuses_checkouts():
+    pool = FakePool(min_size=2, max_size=2)
+    conn = pool.acquire()
+    pool.close()
+    assert all(idle.closed for idle in pool.connections if idle is not conn)
+    pool.release(conn)
+    assert conn.closed
+    with pytest.raises(Exception, match="closed"):
+        pool.acquire()
+
+
+def test_pool_is_reset_in_a_forked_child():
+    pool = FakePool(min_size=1, max_size=2)
+    inherited = pool.acquire()
+    # Același efect ca într-un worker creat prin fork: PID-ul diferă de cel al pool-ului
+    pool._pid = -1
+
+    conn = pool.acquire()
+    assert conn is not inherited
+    assert not inherited.closed
+    stats = pool.stats()
+    assert (stats['size'], stats['in_use'], stats['checkouts']) == (1, 1, 1)
+
+
+def test_failed_warm_up_is_retried():
+    pool = FakePool(min_size=2, max_size=4)
+    pool.fail_connect = 1
+    with pytest.raises(OSError):
+        pool.acquire()
+
+    conn = pool.acquire()
+    stats = pool.stats()
+    assert (stats['size'], stats['in_use'], stats['idle']) == (2, 1, 1)
+    pool.release(conn)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="fork indisponibil")
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_fork_hook_resets_every_live_pool():
+    pools = [FakePool(min_size=1, max_size=2) for _ in range(2)]
+    for pool in pools:
+        pool.acquire()
+
+    pid = os.fork()
+    if pid == 0:
+        # Copilul: pool-urile sunt goale și aparțin noului proces, fără nicio cerere
+        ok = all(pool._pid == os.getpid() and pool.stats()['size'] == 0 for pool in pools)
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert all(pool.stats()['size'] == 1 for pool in pools)
+
+
+def test_discarded_pools_are_not_kept_alive():
+    pool = FakePool(min_size=0, max_size=1)
+    assert pool in connection_pool._pools
+    count = len(connection_pool._pools)
+    del pool
+    gc.collect()
+    assert len(connection_pool._pools) == count - 1
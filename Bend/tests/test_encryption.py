@@ -0,0 +1,124 @@
+import pytest
+
+from config import Config
+from services.encryption_service import EncryptionService
+
+
+@pytest.fixture
+def make_service(app):
+    """EncryptionService cu configurația aplicației de test, plus suprascrieri"""
+    services = []
+
+    def make(**overrides):
+        config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+        config.update({'ADMISSION_ENABLED': False, 'RSA_WORKERS': 1, **overrides})
+        service = EncryptionService(config)
+        services.append(service)
+        return service
+    yield make
+    for service in services:
+        service.shutdown()
+
+
+def test_decrypt_many_keeps_the_order(make_service):
+    service = make_service()
+    items = [
+        (service.encrypt_sync('4111111111111111'), 'sync'),
+        (service.encrypt_async('123'), 'async', None),
+        (None, 'sync'),
+        (service.encrypt_async('5555555555554444'), 'async', None, 'v1'),
+        (service.encrypt_sync('456'), 'sync', None, None),
+    ]
+    assert service.decrypt_many(items) == ['4111111111111111', '123', None, '5555555555554444', '456']
+
+
+def test_decrypt_many_isolates_failures(make_service):
+    service = make_service()
+    items = [
+        (service.encrypt_async('123'), 'async'),
+        ('bm90LXJzYQ==', 'async'),
+        ('not-base64!', 'sync'),
+        (service.encrypt_sync('456'), 'sync'),
+        (service.encrypt_sync('789'), 'sync', None, 'v9'),
+        (service.encrypt_sync('000'), 'rot13'),
+    ]
+    results = service.decrypt_many(items)
+    assert (results[0], results[3]) == ('123', '456')
+    assert all(isinstance(result, Exception) for result in results[1:3] + results[4:])
+
+
+def test_decrypt_many_in_the_process_pool(make_service):
+    serial = make_service()
+    parallel = make_service(RSA_WORKERS=2, RSA_PARALLEL_MIN_BATCH=2)
+    values = [str(number) for number in range(100, 106)]
+    items = [(serial.encrypt_async(value), 'async') for value in values] + [('bm90LXJzYQ==', 'async')]
+    results = parallel.decrypt_many(items)
+    assert results[:-1] == values
+    assert isinstance(results[-1], Exception)
+    assert parallel._rsa_pool is not None
+
+
+def test_decrypt_many_reads_previous_keys(make_service):
+    old = make_service(SYMMETRIC_KEY='cheia-veche', ENCRYPTION_KEY_ID='v0')
+    current = make_service(PREVIOUS_SYMMETRIC_KEYS={'v0': 'cheia-veche'})
+    encrypted = old.encrypt_sync('4111111111111111')
+    assert current.decrypt_many([(encrypted, 'sync', None, 'v0')]) == ['4111111111111111']
+    # AES-CBC fără autentificare: cu altă cheie rezultă o eroare sau alt text
+    assert current.decrypt_many([(encrypted, 'sync', None, 'v1')]) != ['4111111111111111']
+
+
+def test_hybrid_round_trip(make_service):
+    service = make_service()
+    (number, cvv), data_key = service.encrypt_fields(['4111111111111111', '123'], 'hybrid')
+    assert data_key and number != '4111111111111111'
+    assert service.decrypt(number, 'hybrid', data_key) == '4111111111111111'
+    # O altă instanță (alt worker) despachetează cheia de date cu cheia privată
+    other = make_service()
+    assert other.decrypt_many([(number, 'hybrid', data_key), (cvv, 'hybrid', data_key)]) == ['4111111111111111', '123']
+
+
+def test_hybrid_unwraps_each_data_key_once(make_service, monkeypatch):
+    writer, reader = make_service(), make_service()
+    records = [writer.encrypt_fields([str(value), '123'], 'hybrid') for value in (1, 2)]
+    rsa_batches = []
+    rsa_decrypt_many = reader._rsa_decrypt_many
+
+    def recording(items):
+        rsa_batches.append(len(items))
+        return rsa_decrypt_many(items)
+
+    monkeypatch.setattr(reader, '_rsa_decrypt_many', recording)
+
+    items = [(value, 'hybrid', data_key) for values, data_key in records for value in values]
+    assert reader.decrypt_many(items) == ['1', '123', '2', '123']
+    assert rsa_batches == [2]
+    # Cheile despachetate rămân în cache: a doua citire nu mai face operații RSA
+    assert reader.decrypt_many(items) == ['1', '123', '2', '123']
+    assert rsa_batches == [2]
+
+
+def test_hybrid_without_cache_still_decrypts(make_service):
+    writer, reader = make_service(), make_service(HYBRID_KEY_CACHE_SIZE=0)
+    (number,), data_key = writer.encrypt_fields(['4111111111111111'], 'hybrid')
+    assert reader.decrypt(number, 'hybrid', data_key) == '4111111111111111'
+    assert reader.decrypt_many([(number, 'hybrid', data_key)]) == ['4111111111111111']
+
+
+def test_hybrid_errors(make_service):
+    service = make_service()
+    (number,), data_key = service.encrypt_fields(['4111111111111111'], 'hybrid')
+    (_,), other_key = service.encrypt_fields(['5555555555554444'], 'hybrid')
+    with pytest.raises(ValueError):
+        service.decrypt(number, 'hybrid', None)
+    missing, wrong_key, invalid_key = service.decrypt_many([
+        (number, 'hybrid', None), (number, 'hybrid', other_key), (number, 'hybrid', 'bm90LXJzYQ==')
+    ])
+    assert isinstance(missing, ValueError) and isinstance(invalid_key, Exception)
+    assert wrong_key != '4111111111111111'
+
+
+def test_hybrid_card_through_the_api(client, sample_card):
+    created = client.post('/api/cards', json=dict(sample_card, encryption_type='hybrid')).get_json()
+    card = client.get(f"/api/cards/{created['id']}").get_json()
+    assert (card['encryption_type'], card['card_number'], card['cvv']) == ('hybrid', '4111 1111 1111 1111', '123')
+    assert 'data_key' not in card
@@ -0,0 +1,54 @@
+import pytest
+
+
+def test_etag_revalidation(client, seed):
+    seed(2)
+    response = client.get('/api/cards')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = client.get('/api/cards', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('write', ['create', 'update', 'delete'])
+def test_writes_change_the_list_etag(client, seed, sample_card, write):
+    card_id = seed(1)[0]
+    etag = client.get('/api/cards').headers['ETag']
+
+    if write == 'create':
+        response = client.post('/api/cards', json=sample_card)
+        assert response.status_code == 201
+    elif write == 'update':
+        response = client.patch(f'/api/cards/{card_id}', json={'card_holder_name': 'Maria Ionescu'})
+        assert response.status_code == 200
+    else:
+        response = client.delete(f'/api/cards/{card_id}')
+        assert response.status_code == 200
+
+    response = client.get('/api/cards', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_get_card_etag_and_missing_card(client, seed):
+    card_id = seed(1)[0]
+    response = client.get(f'/api/cards/{card_id}')
+    assert response.status_code == 200
+    assert response.get_json()['card_number'] == '4111 1111 1111 1111'
+    assert client.get(f'/api/cards/{card_id}', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/api/cards/999').status_code == 404
+
+
+def test_stream_revalidation(client, seed):
+    seed(2)
+    etag = client.get('/api/cards?stream=1').headers['ETag']
+    assert client.get('/api/cards?stream=1', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_stream_rejects_invalid_batch_size(client, seed):
+    seed(1)
+    response = client.get('/api/cards?stream=1&batch_size=abc')
+    assert response.status_code == 400
+    assert 'batch_size' in response.get_json()['details']
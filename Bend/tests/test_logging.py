@@ -0,0 +1,84 @@
+import json
+import logging
+import queue
+import sys
+import time
+
+import pytest
+
+from services.logging_service import (AsyncQueueHandler, ErrorSamplingFilter, JsonFormatter, RedactingFormatter,
+                                      RequestContextFilter, redact, request_id_var)
+
+
+def make_record(msg, args=(), level=logging.ERROR, exc_info=None, **extra):
+    record = logging.LogRecord('bcard', level, __file__, 10, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('card 4111 1111 1111 1111 rejected', 'card ****1111 rejected'),
+    ('card 4111-1111-1111-1111', 'card ****1111'),
+    ('amex 378282246310005', 'amex ****0005'),
+    ("{'cvv': '123', 'id': 42}", "{'cvv': '***', 'id': 42}"),
+    ('CVV=4321', 'CVV=***'),
+    ('card 42 created in 1234567 us', 'card 42 created in 1234567 us'),
+    ('request 41111111111111114b1f0c2e9d8a47e6', 'request 41111111111111114b1f0c2e9d8a47e6'),
+])
+def test_redact(text, expected):
+    assert redact(text) == expected
+
+
+def test_json_formatter_redacts_message_fields_and_traceback():
+    try:
+        raise ValueError("bad card 5555555555554444")
+    except ValueError:
+        exc_info = sys.exc_info()
+    record = make_record('Error for %s', ({'card_number': '4111111111111111', 'cvv': '123'},),
+                         exc_info=exc_info, card_number='4111111111111111', data_key='wrapped',
+                         route='/api/cards', request_id='req-1')
+    event = json.loads(JsonFormatter().format(record))
+    assert '4111111111111111' not in event['message'] and "'cvv': '***'" in event['message']
+    assert (event['card_number'], event['data_key'], event['route']) == ('[REDACTED]', '[REDACTED]', '/api/cards')
+    assert event['request_id'] == 'req-1'
+    assert '****4444' in event['exc'] and '5555555555554444' not in event['exc']
+
+
+def test_text_formatter_redacts():
+    assert RedactingFormatter('%(message)s').format(make_record('pan %s', ('4111111111111111',))) == 'pan ****1111'
+
+
+def test_request_id_is_attached():
+    token = request_id_var.set('req-2')
+    try:
+        record = make_record('x')
+        RequestContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+    assert record.request_id == 'req-2'
+
+
+def test_repeated_errors_are_sampled():
+    sampler = ErrorSamplingFilter(burst=2, window=0.05)
+    assert [sampler.filter(make_record('boom')) for _ in range(4)] == [True, True, False, False]
+    assert sampler.filter(make_record('info', level=logging.INFO))
+    time.sleep(0.06)
+    record = make_record('boom')
+    assert sampler.filter(record) and record.suppressed == 2
+
+
+def test_full_log_queue_drops_records():
+    log_queue = queue.Queue(maxsize=1)
+    handler = AsyncQueueHandler(log_queue)
+    handler.enqueue(make_record('first'))
+    handler.enqueue(make_record('second'))
+    assert log_queue.qsize() == 1 and log_queue.get().msg == 'first'
+
+
+def test_request_logs_do_not_contain_card_data(client, sample_card, caplog):
+    with caplog.at_level(logging.INFO):
+        client.post('/api/cards', json=dict(sample_card, cvv='12'))
+    formatter = JsonFormatter()
+    output = '\n'.join(formatter.format(record) for record in caplog.records)
+    assert 'Validation errors' in output
+    assert '4111111111111111' not in output.replace(' ', '')
@@ -0,0 +1,96 @@
+import pytest
+
+OTHER_NUMBER = '5555 5555 5555 4444'
+
+
+@pytest.fixture
+def encryption_service(app):
+    import routes.card_routes as card_routes
+    return card_routes.encryption_service
+
+
+@pytest.fixture
+def unique_numbers(app, db, monkeypatch):
+    """CARDS_UNIQUE_NUMBER activat: verificarea din rute și constrângerea din stocare"""
+    monkeypatch.setitem(app.config, 'CARDS_UNIQUE_NUMBER', True)
+    monkeypatch.setattr(db, 'unique_number', True)
+
+
+def test_number_index_ignores_formatting(encryption_service):
+    index = encryption_service.number_index('4111 1111 1111 1111')
+    assert index == encryption_service.number_index('4111111111111111')
+    assert index != encryption_service.number_index(OTHER_NUMBER)
+    assert len(index) == 64 and '4111' not in index
+
+
+def test_lookup_finds_cards_by_number(client, seed):
+    ids = seed(2)
+    seed(1, card_number=OTHER_NUMBER)
+    response = client.post('/api/cards/lookup', json={'card_number': '4111111111111111'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    cards = response.get_json()['cards']
+    assert [card['id'] for card in cards] == ids
+    assert cards[0]['card_number'] == '**** **** **** 1111'
+    assert 'cvv' not in cards[0]
+
+
+def test_lookup_by_query_string(client, seed):
+    card_id, = seed(1, card_number=OTHER_NUMBER)
+    response = client.get('/api/cards/lookup?card_number=5555555555554444')
+    assert [card['id'] for card in response.get_json()['cards']] == [card_id]
+    assert client.get('/api/cards/lookup?card_number=4111111111111111').get_json()['cards'] == []
+
+
+@pytest.mark.parametrize('body', [{}, {'card_number': '4111'}, {'card_number': 4111111111111111}])
+def test_lookup_rejects_invalid_numbers(client, body):
+    response = client.post('/api/cards/lookup', json=body)
+    assert response.status_code == 400
+    assert 'card_number' in response.get_json()['details']
+
+
+def test_lookup_follows_updates(client, seed):
+    card_id, = seed(1)
+    client.patch(f'/api/cards/{card_id}', json={'card_number': OTHER_NUMBER, 'cvv': '321', 'encryption_type': 'sync'})
+    assert client.post('/api/cards/lookup', json={'card_number': '4111111111111111'}).get_json()['cards'] == []
+    cards = client.post('/api/cards/lookup', json={'card_number': OTHER_NUMBER}).get_json()['cards']
+    assert [card['id'] for card in cards] == [card_id]
+
+
+def test_duplicate_create_is_rejected(client, sample_card, unique_numbers):
+    first = client.post('/api/cards', json=sample_card)
+    assert first.status_code == 201
+    response = client.post('/api/cards', json=dict(sample_card, encryption_type='hybrid'))
+    assert response.status_code == 409
+    assert response.get_json()['id'] == first.get_json()['id']
+
+
+def test_duplicate_update_is_rejected(client, seed, unique_numbers):
+    first, = seed(1)
+    second, = seed(1, card_number=OTHER_NUMBER)
+    response = client.patch(f'/api/cards/{second}',
+                            json={'card_number': '4111111111111111', 'cvv': '123', 'encryption_type': 'sync'})
+    assert (response.status_code, response.get_json()['id']) == (409, first)
+    # Același număr pe același card nu este un duplicat
+    response = client.patch(f'/api/cards/{first}',
+                            json={'card_number': '4111111111111111', 'cvv': '999', 'encryption_type': 'sync'})
+    assert response.status_code == 200
+
+
+def test_bulk_rejects_existing_and_repeated_numbers(client, sample_card, seed, unique_numbers):
+    seed(1)
+    other = dict(sample_card, card_number=OTHER_NUMBER)
+    body = client.post('/api/cards/bulk', json=[sample_card, other, other]).get_json()
+    assert (body['created'], body['failed']) == (1, 2)
+    assert body['results'][0]['errors'] == {'card_number': 'Numărul cardului există deja'}
+    assert 'id' in body['results'][1]
+    assert body['results'][2]['errors'] == {'card_number': 'Numărul cardului există deja'}
+
+
+def test_concurrent_duplicate_is_stopped_by_storage(client, sample_card, db, unique_numbers, monkeypatch):
+    client.post('/api/cards', json=sample_card)
+    # Verificarea din rută nu vede celălalt rând (inserare concurentă): constrângerea îl oprește
+    monkeypatch.setattr(db, 'find_number_index_owners', lambda number_indexes: {})
+    response = client.post('/api/cards', json=sample_card)
+    assert response.status_code == 409
+    assert len(db.get_cards()) == 1
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_list_is_masked_by_default(client, seed):
+    seed(3)
+    response = client.get('/api/cards')
+    assert response.status_code == 200
+    cards = response.get_json()
+    assert [card['id'] for card in cards] == [3, 2, 1]
+    assert cards[0]['card_number'] == '**** **** **** 1111'
+    assert 'cvv' not in cards[0]
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_full_view_decrypts(client, seed):
+    seed(1)
+    card = client.get('/api/cards?view=full').get_json()[0]
+    assert card['card_number'] == '4111 1111 1111 1111'
+    assert card['cvv'] == '123'
+
+
+@pytest.mark.parametrize('query, field', [
+    ('view=secret', 'view'),
+    ('fields=id,data_key', 'fields'),
+])
+def test_invalid_projection(client, query, field):
+    response = client.get(f'/api/cards?{query}')
+    assert response.status_code == 400
+    assert field in response.get_json()['details']
+
+
+def test_fields_projection(client, seed):
+    seed(1)
+    card = client.get('/api/cards?fields=id,last4,cvv').get_json()[0]
+    assert card == {'id': 1, 'last4': '1111', 'cvv': '123'}
@@ -0,0 +1,80 @@
+import re
+
+from services.metrics import MetricsRegistry
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    registry.describe('jobs_total', 'counter', 'Joburi')
+    registry.describe('job_seconds', 'histogram', 'Durata', buckets=(0.1, 1.0))
+    return registry
+
+
+def sample(text, series):
+    """Valoarea unei serii din exportul Prometheus (0 dacă lipsește)"""
+    match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_render_counters_and_histograms():
+    registry = make_registry()
+    registry.inc('jobs_total', 2, (('queue', 'a"b'),))
+    registry.inc('jobs_total', 1, (('queue', 'a"b'),))
+    for value in (0.05, 0.5, 3.0):
+        registry.observe('job_seconds', value)
+    text = registry.render([('workers', 'Workeri', 4)])
+    assert text.splitlines() == [
+        '# HELP job_seconds Durata',
+        '# TYPE job_seconds histogram',
+        'job_seconds_bucket{le="0.1"} 1',
+        'job_seconds_bucket{le="1.0"} 2',
+        'job_seconds_bucket{le="+Inf"} 3',
+        'job_seconds_sum 3.55',
+        'job_seconds_count 3',
+        '# HELP jobs_total Joburi',
+        '# TYPE jobs_total counter',
+        'jobs_total{queue="a\\"b"} 3',
+        '# HELP workers Workeri',
+        '# TYPE workers gauge',
+        'workers 4',
+    ]
+
+
+def test_disabled_registry_records_nothing():
+    registry = make_registry()
+    registry.configure({'METRICS_ENABLED': False})
+    registry.inc('jobs_total')
+    registry.observe('job_seconds', 0.5)
+    with registry.timed('job_seconds'), registry.stage('db_query'):
+        pass
+    assert all(line.startswith('#') for line in registry.render().splitlines())
+
+
+def test_stages_are_collected_per_request():
+    registry = MetricsRegistry()
+    registry.describe('bcard_stage_duration_seconds', 'histogram', 'Etape')
+    token = registry.begin_request()
+    with registry.stage('db_query'):
+        pass
+    with registry.stage('db_query'):
+        pass
+    stages = registry.end_request(token)
+    assert list(stages) == ['db_query'] and stages['db_query'] >= 0
+    assert 'bcard_stage_duration_seconds_count{stage="db_query"} 2' in registry.render()
+
+
+def test_metrics_endpoint(client, sample_card):
+    before = client.get('/api/metrics').get_data(as_text=True)
+    client.post('/api/cards', json=sample_card)
+    client.get('/api/cards')
+    response = client.get('/api/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+
+    encrypt = 'bcard_crypto_operations_total{encryption_type="sync",operation="encrypt"}'
+    assert sample(text, encrypt) == sample(before, encrypt) + 2
+    requests = 'bcard_http_request_duration_seconds_count{method="GET",route="/api/cards",status="200"}'
+    assert sample(text, requests) >= sample(before, requests) + 1
+    assert sample(text, 'bcard_ready') == 1
+    assert re.search(r'^bcard_db_pool_size \d+$', text, re.MULTILINE)
+    assert '/api/cards/1' not in text
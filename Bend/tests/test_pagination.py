@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+from utils.pagination import decode_cursor, encode_cursor, expiry_to_sort_key
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 13, 45, 12, 123456)
+    token = encode_cursor(created_at, 42)
+    assert '=' not in token
+    assert decode_cursor(token) == (created_at, 42)
+
+
+def test_cursor_round_trip_without_microseconds():
+    created_at = datetime(2024, 1, 1)
+    assert decode_cursor(encode_cursor(created_at, 1)) == (created_at, 1)
+
+
+@pytest.mark.parametrize('token', ['', 'abc', 'bm90LWpzb24', encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize('value, expected', [('01/2030', '203001'), ('12/2029', '202912')])
+def test_expiry_sort_key(value, expected):
+    assert expiry_to_sort_key(value) == expected
+
+
+@pytest.mark.parametrize('value', ['13/2030', '1/2030', '2030-01', '01/30'])
+def test_invalid_expiry_sort_key(value):
+    with pytest.raises(ValueError):
+        expiry_to_sort_key(value)
+
+
+def test_cursor_pages_cover_every_card_once(client, seed):
+    ids = seed(7)
+    seen = []
+    url = '/api/cards?limit=3'
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen += [card['id'] for card in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        url = f'/api/cards?limit=3&after={cursor}'
+    assert seen == sorted(ids, reverse=True)
+
+
+@pytest.mark.parametrize('query, field', [
+    ('limit=0', 'limit'),
+    ('limit=abc', 'limit'),
+    ('after=not-a-cursor', 'after'),
+    ('card_type=gold', 'card_type'),
+    ('expires_from=2030-12', 'expires_from'),
+])
+def test_invalid_list_arguments(client, query, field):
+    response = client.get(f'/api/cards?{query}')
+    assert response.status_code == 400
+    assert field in response.get_json()['details']
@@ -0,0 +1,160 @@
+import functools
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.errors
+import pytest
+
+from config import Config
+from services.connection_pool import ConnectionPool
+from services.db_service import PreparedConnection
+from services.queries import positional, render, statement_name
+
+QUERY = render('card_version')
+
+
+class RecordingCursor:
+    """Cursor fals: păstrează instrucțiunile trimise și poate eșua o dată pe un EXECUTE"""
+
+    def __init__(self, fail_with=None):
+        self.executed = []
+        self.fail_with = fail_with
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if self.fail_with is not None and sql.startswith('EXECUTE'):
+            error, self.fail_with = self.fail_with, None
+            raise error
+
+
+def connection(max_statements=100):
+    """Starea unei PreparedConnection noi, fără server (execute_prepared nu folosește altceva)"""
+    return SimpleNamespace(statements=OrderedDict(), max_statements=max_statements, stale=False)
+
+
+def execute(conn, cursor, query, params=(1,)):
+    PreparedConnection.execute_prepared(conn, cursor, query, params)
+
+
+def test_positional_parameters():
+    assert positional("SELECT %s, %s WHERE name LIKE 'a%%'") == "SELECT $1, $2 WHERE name LIKE 'a%'"
+
+
+def test_prepares_once_then_executes():
+    conn, cursor = connection(), RecordingCursor()
+    execute(conn, cursor, QUERY)
+    execute(conn, cursor, QUERY)
+    name = statement_name(QUERY)
+    assert cursor.executed == [
+        f"PREPARE {name} AS {positional(QUERY)}",
+        f"EXECUTE {name} (%s)",
+        f"EXECUTE {name} (%s)",
+    ]
+
+
+def test_least_recently_used_statement_is_deallocated():
+    conn, cursor = connection(max_statements=2), RecordingCursor()
+    first, second, third = render('card_version'), render('card_by_id'), render('cards_version')
+    execute(conn, cursor, first)
+    execute(conn, cursor, second)
+    execute(conn, cursor, first)
+    execute(conn, cursor, third, ())
+    assert f"DEALLOCATE {statement_name(second)}" in cursor.executed
+    assert list(conn.statements) == [first, third]
+
+
+@pytest.mark.parametrize('error', [
+    psycopg2.errors.InvalidSqlStatementName,
+    psycopg2.errors.DuplicatePreparedStatement,
+    psycopg2.errors.FeatureNotSupported,
+])
+def test_session_mismatch_resets_the_cache(error):
+    conn = connection()
+    execute(conn, RecordingCursor(), QUERY)
+
+    with pytest.raises(error):
+        execute(conn, RecordingCursor(fail_with=error('prepared statement does not exist')), QUERY)
+    assert conn.stale
+
+    cursor = RecordingCursor()
+    execute(conn, cursor, QUERY)
+    assert cursor.executed[0] == "DEALLOCATE ALL"
+    assert cursor.executed[1].startswith("PREPARE ")
+    assert not conn.stale
+
+
+@pytest.fixture
+def pool():
+    connect_kwargs = {
+        'host': Config.DB_HOST,
+        'port': Config.DB_PORT,
+        'dbname': Config.DB_NAME,
+        'user': Config.DB_USER,
+        'password': Config.DB_PASSWORD,
+        'connect_timeout': 2,
+        'connection_factory': functools.partial(PreparedConnection, max_statements=10)
+    }
+    try:
+        psycopg2.connect(**connect_kwargs).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL indisponibil: {e}")
+    pool = ConnectionPool(connect_kwargs, min_size=0, max_size=1)
+    yield pool
+    pool.close()
+
+
+def server_statements(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM pg_prepared_statements")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def run(conn, query="SELECT %s::int + 1", params=(1,)):
+    with conn.cursor() as cursor:
+        conn.execute_prepared(cursor, query, params)
+        return cursor.fetchone()[0]
+
+
+def test_reconnect_starts_with_an_empty_cache(pool):
+    conn = pool.acquire()
+    assert run(conn) == 2
+    assert statement_name("SELECT %s::int + 1") in server_statements(conn)
+    pool.release(conn, discard=True)
+
+    conn = pool.acquire()
+    try:
+        assert not conn.statements
+        assert run(conn) == 2
+        assert statement_name("SELECT %s::int + 1") in server_statements(conn)
+    finally:
+        pool.release(conn)
+
+
+def test_statements_survive_the_return_to_the_pool(pool):
+    conn = pool.acquire()
+    run(conn)
+    pool.release(conn)
+
+    same = pool.acquire()
+    try:
+        assert same is conn
+        assert run(same, params=(41,)) == 42
+        assert len(same.statements) == 1
+    finally:
+        pool.release(same)
+
+
+def test_statements_dropped_behind_our_back_are_prepared_again(pool):
+    conn = pool.acquire()
+    try:
+        run(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+        with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+            run(conn)
+        conn.rollback()
+        assert run(conn) == 2
+        assert not conn.stale
+    finally:
+        pool.release(conn)
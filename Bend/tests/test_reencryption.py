@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from services.reencryption_service import ReencryptionService
+
+
+class RecordingCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, namespaces):
+        self.invalidated += namespaces
+
+
+@pytest.fixture
+def encryption_service(app):
+    import routes.card_routes as card_routes
+    return card_routes.encryption_service
+
+
+@pytest.fixture
+def make_service(db, encryption_service, tmp_path):
+    config = {
+        'REENCRYPT_BATCH_SIZE': 2,
+        'REENCRYPT_ROWS_PER_SECOND': 0,
+        'REENCRYPT_CHECKPOINT_PATH': str(tmp_path / 'checkpoint.json')
+    }
+
+    def make(storage=db, response_cache=None):
+        return ReencryptionService(storage, encryption_service, config, response_cache)
+    return make
+
+
+def plaintext(db, encryption_service, card_id):
+    card = db.get_card_by_id(card_id)
+    return card.encryption_type, encryption_service.decrypt(
+        card.card_number, card.encryption_type, card.data_key, card.key_id
+    )
+
+
+def test_run_reencrypts_every_card(db, seed, encryption_service, make_service):
+    ids = seed(5)
+    cache = RecordingCache()
+    checkpoint = make_service(response_cache=cache).run(target_type='hybrid')
+
+    assert checkpoint['done']
+    assert (checkpoint['processed'], checkpoint['updated'], checkpoint['failed']) == (5, 5, 0)
+    assert all(plaintext(db, encryption_service, card_id) == ('hybrid', '4111111111111111') for card_id in ids)
+    assert set(cache.invalidated) == {'cards'} | {f"card:{card_id}" for card_id in ids}
+
+
+def test_run_resumes_from_the_checkpoint(db, seed, make_service, tmp_path):
+    ids = seed(5)
+    first = make_service().run(target_type='hybrid', max_rows=2)
+    assert (first['last_id'], first['done']) == (ids[1], False)
+    assert json.loads((tmp_path / 'checkpoint.json').read_text())['last_id'] == ids[1]
+
+    second = make_service().run(target_type='hybrid')
+    assert second['done']
+    assert (second['processed'], second['updated']) == (5, 5)
+    assert make_service().run(target_type='hybrid') == second
+
+
+def test_rows_changed_concurrently_are_rescanned(db, seed, encryption_service, make_service):
+    ids = seed(3)
+
+    class ConcurrentWriter:
+        """Modifică un card între citirea și scrierea primului lot"""
+
+        def __init__(self):
+            self.writes = 0
+
+        def __getattr__(self, name):
+            return getattr(db, name)
+
+        def update_encrypted_fields(self, cards_data):
+            self.writes += 1
+            if self.writes == 1:
+                db.update_card(ids[0], {'card_holder_name': 'Maria Ionescu'})
+            return db.update_encrypted_fields(cards_data)
+
+    checkpoint = make_service(ConcurrentWriter()).run(target_type='hybrid')
+    assert checkpoint['done']
+    assert (checkpoint['skipped'], checkpoint['pass']) == (1, 2)
+    assert plaintext(db, encryption_service, ids[0]) == ('hybrid', '4111111111111111')
+
+
+def test_failed_rows_keep_the_job_open(db, seed, encryption_service, make_service, monkeypatch):
+    ids = seed(3)
+
+    def fail(values, encryption_type):
+        raise ValueError("cheie lipsă")
+
+    monkeypatch.setattr(encryption_service, 'encrypt_fields', fail)
+    checkpoint = make_service().run(target_type='hybrid')
+    assert (checkpoint['done'], checkpoint['last_id'], checkpoint['failed']) == (False, 0, 3)
+
+    monkeypatch.undo()
+    checkpoint = make_service().run(target_type='hybrid')
+    assert checkpoint['done']
+    assert all(plaintext(db, encryption_service, card_id)[0] == 'hybrid' for card_id in ids)
+
+
+def test_only_one_run_holds_the_checkpoint(db, seed, make_service, tmp_path):
+    seed(2)
+    holder = make_service()
+    lock_file = holder._acquire_lock()
+    try:
+        assert make_service().run(target_type='hybrid') is None
+        assert not (tmp_path / 'checkpoint.json').exists()
+    finally:
+        lock_file.close()
+    assert make_service().run(target_type='hybrid')['done']
@@ -0,0 +1,222 @@
+import time
+
+import psycopg2
+import pytest
+
+from services import replica_router
+from services.connection_pool import PoolTimeoutError
+from services.db_service import DatabaseService, replica_read
+from services.replica_router import ReplicaRouter
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        pool = self.pool
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                pass
+
+            def fetchone(self):
+                return (pool.lag,)
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+    def read(self):
+        if self.pool.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        return self.pool.name
+
+
+class FakePool:
+    """Pool fals: `lag` este întârzierea raportată, `down` face acquire() să eșueze"""
+
+    def __init__(self, name, lag=0.0):
+        self.name = name
+        self.lag = lag
+        self.down = False
+        self.busy = False
+        self.broken = False
+        self.in_use = 0
+        self.cleared = 0
+
+    def acquire(self):
+        if self.down:
+            raise psycopg2.OperationalError(f"could not connect to {self.name}")
+        if self.busy:
+            raise PoolTimeoutError("pool exhausted")
+        self.in_use += 1
+        return FakeConnection(self)
+
+    def release(self, conn, discard=False):
+        self.in_use -= 1
+
+    def clear_idle(self):
+        self.cleared += 1
+
+    def stats(self):
+        return {'in_use': self.in_use}
+
+    def close(self):
+        pass
+
+
+def make_router(*pools, **kwargs):
+    return ReplicaRouter([(pool.name, pool) for pool in pools], **kwargs)
+
+
+def chosen(router, count):
+    return [getattr(router.choose(), 'name', None) for _ in range(count)]
+
+
+@pytest.mark.parametrize('endpoint, expected', [
+    ('db1', ('db1', 5432)),
+    ('db1:6432', ('db1', 6432)),
+    ('10.0.0.5:6433', ('10.0.0.5', 6433)),
+    ('[::1]', ('::1', 5432)),
+    ('[fd00::5]:6432', ('fd00::5', 6432)),
+    ('fd00::5', ('fd00::5', 5432)),
+])
+def test_parse_endpoint(endpoint, expected):
+    assert DatabaseService._parse_endpoint(endpoint, 5432) == expected
+
+
+@pytest.mark.parametrize('endpoint', ['[fd00::5', '[fd00::5]6432', 'db1:port'])
+def test_parse_invalid_endpoint(endpoint):
+    with pytest.raises(ValueError):
+        DatabaseService._parse_endpoint(endpoint, 5432)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        make_router(FakePool('a'), strategy='random')
+
+
+def test_round_robin_alternates():
+    router = make_router(FakePool('a'), FakePool('b'))
+    assert chosen(router, 4) == ['a', 'b', 'a', 'b']
+    assert router.stats()['a']['reads'] == 2
+
+
+def test_least_connections_prefers_the_idle_replica():
+    busy, idle = FakePool('busy'), FakePool('idle')
+    busy.in_use = 3
+    router = make_router(busy, idle, strategy='least_connections')
+    assert chosen(router, 3) == ['idle'] * 3
+
+
+def test_lagging_replica_gets_no_reads():
+    lagging = FakePool('lagging', lag=60)
+    router = make_router(lagging, FakePool('ok'), max_lag=5, check_interval=0)
+    assert chosen(router, 3) == ['ok'] * 3
+    assert router.stats()['lagging']['status'] == 'lagging'
+    lagging.lag = 0
+    assert 'lagging' in chosen(router, 2)
+
+
+def test_lag_is_checked_once_per_interval():
+    pool = FakePool('a', lag=60)
+    router = make_router(pool, max_lag=5, check_interval=60)
+    assert router.choose() is None
+    pool.lag = 0
+    assert router.choose() is None
+
+
+def test_unreachable_replica_falls_back_to_the_primary():
+    pool = FakePool('a')
+    pool.down = True
+    router = make_router(pool, retry_after=60)
+    assert router.choose() is None
+    stats = router.stats()['a']
+    assert (stats['status'], stats['failures']) == ('down', 1)
+    assert pool.cleared == 1
+    pool.down = False
+    assert router.choose() is None
+
+
+def test_down_replica_returns_after_retry_after():
+    pool = FakePool('a')
+    router = make_router(pool, retry_after=0.01)
+    router.mark_down(router.replicas[0], OSError("connection reset"))
+    assert router.choose() is None
+    time.sleep(0.02)
+    assert router.choose().name == 'a'
+
+
+def test_recent_write_pins_reads_to_the_primary():
+    assert not replica_router.reads_pinned()
+    token = replica_router.begin_request(str(time.time() - 1), window=5)
+    try:
+        assert replica_router.reads_pinned() and not replica_router.wrote()
+    finally:
+        replica_router.end_request(token)
+
+    token = replica_router.begin_request('not-a-timestamp', window=5)
+    try:
+        assert not replica_router.reads_pinned()
+        replica_router.note_write()
+        assert replica_router.reads_pinned() and replica_router.wrote()
+    finally:
+        replica_router.end_request(token)
+
+
+class RoutedService(DatabaseService):
+    """DatabaseService cu pool-uri false (fără conexiune la PostgreSQL)"""
+
+    def __init__(self, primary, *replicas):
+        self.config = {}
+        self.pool = primary
+        self.replicas = make_router(*replicas)
+
+    @replica_read
+    def read(self):
+        with self.get_connection(read_only=True) as conn:
+            return conn.read()
+
+    def write(self):
+        with self.get_connection() as conn:
+            return conn.read()
+
+
+@pytest.fixture
+def request_state():
+    token = replica_router.begin_request(None, window=5)
+    yield
+    replica_router.end_request(token)
+
+
+def test_reads_go_to_replicas_and_writes_to_the_primary(request_state):
+    service = RoutedService(FakePool('primary'), FakePool('replica'))
+    assert (service.read(), service.write()) == ('replica', 'primary')
+    replica_router.note_write()
+    assert service.read() == 'primary'
+
+
+def test_busy_replica_sends_the_read_to_the_primary(request_state):
+    replica = FakePool('replica')
+    replica.busy = True
+    service = RoutedService(FakePool('primary'), replica)
+    assert service.read() == 'primary'
+    assert service.replicas.stats()['replica']['failures'] == 0
+    replica.busy = False
+    assert service.read() == 'replica'
+
+
+def test_replica_failing_mid_read_is_retried_on_the_primary(request_state):
+    replica = FakePool('replica')
+    replica.broken = True
+    service = RoutedService(FakePool('primary'), replica)
+    assert service.read() == 'primary'
+    assert service.replicas.stats()['replica']['status'] == 'down'
@@ -0,0 +1,13 @@
+def test_response_cache_is_invalidated_by_writes(app, client, seed, sample_card, monkeypatch):
+    import routes.card_routes as card_routes
+    from services.response_cache import ResponseCache
+    monkeypatch.setattr(card_routes, 'response_cache', ResponseCache(dict(app.config, RESPONSE_CACHE_ENABLED=True)))
+    seed(1)
+
+    first = client.get('/api/cards')
+    assert client.get('/api/cards').get_data() == first.get_data()
+    assert card_routes.response_cache.stats()['hits'] == 1
+
+    client.post('/api/cards', json=dict(sample_card, card_holder_name='Maria Ionescu'))
+    cards = client.get('/api/cards').get_json()
+    assert [card['card_holder_name'] for card in cards] == ['Maria Ionescu', 'Ion Popescu']
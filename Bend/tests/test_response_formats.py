@@ -0,0 +1,150 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response
+
+from services import compression, response_formats
+from services.compression import ResponseCompressor
+
+
+def negotiate(query='', accept=None):
+    headers = {'Accept': accept} if accept else {}
+    with Flask(__name__).test_request_context(f'/?{query}', headers=headers) as context:
+        return response_formats.negotiate_format(context.request)
+
+
+@pytest.mark.parametrize('query, accept, expected', [
+    ('', None, 'json'),
+    ('', 'application/vnd.bcard.columnar+json', 'columnar'),
+    ('', 'application/x-msgpack', 'msgpack'),
+    ('', 'text/html, application/msgpack;q=0.5', 'msgpack'),
+    ('', 'text/html', 'json'),
+    ('format=columnar', 'application/msgpack', 'columnar'),
+])
+def test_negotiate_format(monkeypatch, query, accept, expected):
+    monkeypatch.setattr(response_formats, 'msgpack', object())
+    assert negotiate(query, accept) == expected
+
+
+def test_msgpack_is_not_offered_without_the_library(monkeypatch):
+    monkeypatch.setattr(response_formats, 'msgpack', None)
+    assert 'msgpack' not in response_formats.available_formats()
+    assert negotiate(accept='application/msgpack') == 'json'
+    with pytest.raises(ValueError):
+        negotiate('format=msgpack')
+
+
+def test_unknown_format_is_rejected(client):
+    response = client.get('/api/cards?format=xml')
+    assert response.status_code == 400
+    assert 'format' in response.get_json()['details']
+
+
+def test_columnar_list_matches_json(client, seed):
+    seed(3)
+    objects = client.get('/api/cards').get_json()
+    response = client.get('/api/cards?format=columnar')
+    assert response.mimetype == 'application/vnd.bcard.columnar+json'
+    body = response.get_json()
+    assert [dict(zip(body['columns'], row)) for row in body['rows']] == objects
+
+
+def test_msgpack_list_matches_json(client, seed):
+    msgpack = pytest.importorskip('msgpack')
+    seed(2)
+    objects = client.get('/api/cards').get_json()
+    response = client.get('/api/cards', headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.get_data(), raw=False) == objects
+
+
+def test_formats_have_distinct_etags(client, seed):
+    seed(1)
+    etags = {client.get(f'/api/cards?format={name}').headers['ETag'] for name in ('json', 'columnar')}
+    assert len(etags) == 2
+
+
+@pytest.fixture
+def compressor():
+    return ResponseCompressor({'COMPRESSION_MIN_SIZE': 10})
+
+
+def accept_encodings(header):
+    with Flask(__name__).test_request_context('/', headers={'Accept-Encoding': header}) as context:
+        return context.request.accept_encodings
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, br', 'br'),
+    ('gzip;q=1, br;q=0.5', 'gzip'),
+    ('identity', None),
+    ('gzip;q=0', None),
+    ('*', 'br'),
+])
+def test_negotiate_encoding(monkeypatch, compressor, header, expected):
+    monkeypatch.setattr(compression, 'brotli', object())
+    assert compressor.negotiate(accept_encodings(header)) == expected
+
+
+def test_gzip_only_without_brotli(monkeypatch, compressor):
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert compressor.negotiate(accept_encodings('br, gzip;q=0.1')) == 'gzip'
+    assert compressor.negotiate(accept_encodings('br')) is None
+
+
+def test_response_is_compressed_with_a_weak_etag(compressor):
+    body = json.dumps([{'id': index} for index in range(50)]).encode()
+    response = Response(body, mimetype='application/json')
+    response.set_etag('abc')
+    compressor.process(response, accept_encodings('gzip'))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == body
+    assert response.get_etag() == ('abc', True)
+    assert 'Accept-Encoding' in response.vary
+
+
+@pytest.mark.parametrize('body, mimetype, status', [
+    (b'[]', 'application/json', 200),
+    (b'x' * 100, 'image/png', 200),
+    (b'', 'application/json', 304),
+])
+def test_response_is_left_alone(compressor, body, mimetype, status):
+    response = Response(body, status=status, mimetype=mimetype)
+    compressor.process(response, accept_encodings('gzip'))
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == body
+
+
+def test_stream_chunks_decompress_as_they_arrive(compressor):
+    closed = []
+
+    def chunks():
+        try:
+            yield b'{"id": 1}\n'
+            yield b'{"id": 2}\n'
+        finally:
+            closed.append(True)
+
+    decompressor = gzip.zlib.decompressobj(31)
+    output = compressor.compress_stream(chunks(), 'gzip')
+    assert decompressor.decompress(next(output)) == b'{"id": 1}\n'
+    assert decompressor.decompress(b''.join(output)) == b'{"id": 2}\n'
+    assert closed == [True]
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+def test_card_list_is_compressed(client, seed, encoding):
+    decompress = gzip.decompress if encoding == 'gzip' else pytest.importorskip('brotli').decompress
+    seed(20)
+    plain = client.get('/api/cards').get_data()
+    response = client.get('/api/cards', headers={'Accept-Encoding': encoding})
+    assert response.headers['Content-Encoding'] == encoding
+    assert decompress(response.get_data()) == plain
+
+
+def test_identity_is_not_compressed(client, seed):
+    seed(20)
+    response = client.get('/api/cards', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert isinstance(response.get_json(), list)
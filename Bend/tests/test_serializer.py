@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from models import card as card_module
+from models.card import (CARD_FIELDS, LIST_FIELDS, MASKED_FIELDS, Card, _build_serializer,
+                         card_serializer, dumps, public_fields)
+
+CREATED_AT = datetime(2024, 5, 17, 13, 45, 12, 123456)
+
+
+def make_card(**overrides):
+    values = dict(id=7, card_holder_name='Ion Popescu', card_number='ciphertext', expiry_date='12/2030',
+                  cvv='ciphertext', card_type='credit', encryption_type='hybrid', data_key='wrapped',
+                  key_id='v1', last4='1111', brand='visa', created_at=CREATED_AT, updated_at='2024-05-18T00:00:00')
+    values.update(overrides)
+    return Card(**values)
+
+
+@pytest.mark.parametrize('fields, masked', [(LIST_FIELDS, False), (MASKED_FIELDS, True)])
+@pytest.mark.parametrize('layout', ['object', 'row'])
+@pytest.mark.parametrize('card', [make_card(), make_card(last4=None, created_at=None)])
+def test_fast_paths_match_the_generic_serializer(fields, masked, layout, card):
+    fast = card_serializer(fields, masked, layout)
+    assert fast in card_module._FAST_SERIALIZERS.values()
+    generic = _build_serializer(public_fields(fields), masked, layout)
+    assert fast(card, '4111111111111111', '123') == generic(card, '4111111111111111', '123')
+
+
+def test_full_card_uses_the_list_fast_path():
+    assert card_serializer() is card_serializer(LIST_FIELDS)
+    assert card_serializer(CARD_FIELDS) is card_module._list_object
+
+
+def test_full_view_formats_number_and_timestamps():
+    row = card_serializer()(make_card(), '4111111111111111', '123')
+    assert list(row) == list(LIST_FIELDS)
+    assert row['card_number'] == '4111 1111 1111 1111'
+    assert row['cvv'] == '123'
+    assert row['created_at'] == '2024-05-17T13:45:12.123456'
+    assert row['updated_at'] == '2024-05-18T00:00:00'
+
+
+def test_masked_view_uses_last4():
+    serialize = card_serializer(MASKED_FIELDS, True)
+    assert serialize(make_card())['card_number'] == '**** **** **** 1111'
+    assert serialize(make_card(last4=None))['card_number'] == '**** **** **** ****'
+    assert 'cvv' not in serialize(make_card())
+
+
+def test_projection_keeps_order_and_drops_private_fields():
+    serialize = card_serializer(('last4', 'id', 'key_id', 'data_key', 'created_at'))
+    assert serialize(make_card()) == {'last4': '1111', 'id': 7, 'created_at': '2024-05-17T13:45:12.123456'}
+    assert card_serializer(('id',), layout='row')(make_card()) == (7,)
+
+
+@pytest.mark.parametrize('kwargs', [{'fields': ('id', 'pin')}, {'layout': 'xml'}])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        card_serializer(**kwargs)
+
+
+def test_dumps_without_orjson_matches(monkeypatch):
+    value = [card_serializer()(make_card(card_holder_name='Ștefan Ionescu'), '4111111111111111', '123')]
+    encoded = dumps(value)
+    monkeypatch.setattr(card_module, 'orjson', None)
+    assert json.loads(dumps(value)) == json.loads(encoded)
+    assert 'Ștefan'.encode('utf-8') in dumps(value)
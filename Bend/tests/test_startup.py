@@ -0,0 +1,90 @@
+import pytest
+
+from services.startup import Startup
+
+
+class Initializer:
+    """Eșuează în etapa `storage` de `failures` ori, apoi reușește"""
+
+    def __init__(self, startup, failures=0):
+        self.startup = startup
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        with self.startup.phase('storage'):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("could not connect to server at 10.0.0.5 (password=secret)")
+
+
+def make_startup(mode, **config):
+    return Startup({'STARTUP_MODE': mode, 'STARTUP_RETRY_INTERVAL': 0.01, **config})
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        make_startup('later')
+
+
+def test_eager_runs_in_start():
+    startup = make_startup('eager')
+    startup.start(Initializer(startup))
+    assert startup.ready
+    status = startup.status()
+    assert (status['status'], status['failed_phase']) == ('ready', None)
+    assert set(status['phases']) == {'storage', 'services'}
+
+
+def test_eager_failure_stops_start():
+    startup = make_startup('eager')
+    with pytest.raises(OSError):
+        startup.start(Initializer(startup, failures=1))
+    assert startup.status()['status'] == 'failed'
+
+
+def test_lazy_initializes_on_first_use_and_retries():
+    startup = make_startup('lazy')
+    initializer = Initializer(startup, failures=1)
+    startup.start(initializer)
+    assert initializer.calls == 0
+    assert startup.status()['status'] == 'starting'
+
+    assert not startup.ensure()
+    assert (startup.status()['status'], startup.status()['failed_phase']) == ('failed', 'storage')
+    assert startup.ensure()
+    assert startup.ensure()
+    assert initializer.calls == 2
+    assert startup.status()['failed_phase'] is None
+
+
+def test_background_retries_until_ready():
+    startup = make_startup('background')
+    initializer = Initializer(startup, failures=2)
+    startup.start(initializer)
+    startup._thread.join(2)
+    assert startup.ready
+    assert initializer.calls == 3
+
+
+def test_status_does_not_expose_the_exception():
+    startup = make_startup('lazy')
+    startup.start(Initializer(startup, failures=1))
+    startup.ensure()
+    status = startup.status()
+    assert status == {'status': 'failed', 'mode': 'lazy', 'failed_phase': 'storage', 'phases': status['phases']}
+    assert 'secret' not in repr(status)
+
+
+def test_not_ready_response(app):
+    from routes.card_routes import not_ready_response
+    startup = make_startup('lazy', STARTUP_RETRY_INTERVAL=3)
+    startup.start(Initializer(startup, failures=1))
+    startup.ensure()
+    with app.test_request_context():
+        response = not_ready_response(startup)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert response.get_json()['details']['failed_phase'] == 'storage'
+    assert 'secret' not in response.get_data(as_text=True)
@@ -0,0 +1,146 @@
+import pytest
+
+from services.storage import create_storage
+
+
+def card_row(index, **overrides):
+    """Un rând de test; valorile „criptate” sunt opace pentru backend"""
+    row = {
+        'card_holder_name': f'Titular {index}',
+        'card_number': f'enc-number-{index}',
+        'expiry_date': '12/2030',
+        'cvv': f'enc-cvv-{index}',
+        'card_type': 'credit',
+        'encryption_type': 'sync',
+        'data_key': None,
+        'key_id': 'v1',
+        'last4': '1111',
+        'brand': 'visa',
+        'card_number_index': f'index-{index}'
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path):
+    config = {
+        'STORAGE_BACKEND': request.param,
+        'SQLITE_PATH': str(tmp_path / 'bcard.sqlite3'),
+        'CHANGES_TOMBSTONE_RETENTION': 3600
+    }
+    storage = create_storage(config)
+    yield storage
+    storage.close()
+
+
+def test_keyset_pages(storage):
+    ids = storage.create_cards([card_row(index) for index in range(7)])
+    seen, after = [], None
+    while True:
+        page = storage.get_cards(limit=3, after=after, columns=['id', 'created_at'])
+        seen += [card.id for card in page]
+        if len(page) < 3:
+            break
+        after = (page[-1].created_at, page[-1].id)
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_iter_cards_matches_get_cards(storage):
+    storage.create_cards([card_row(index, card_type='debit' if index % 2 else 'credit') for index in range(9)])
+    expected = [card.id for card in storage.get_cards(card_type='debit')]
+    assert [card.id for card in storage.iter_cards(batch_size=2, card_type='debit')] == expected
+    assert [card.id for card in storage.iter_cards(batch_size=2, limit=3)] == [9, 8, 7]
+
+
+def test_projection_leaves_other_columns_empty(storage):
+    storage.create_card(card_row(1))
+    card = storage.get_cards(columns=['id', 'last4'])[0]
+    assert card.last4 == '1111'
+    assert card.card_number is None and card.cvv is None
+
+
+def test_expiry_filters(storage):
+    storage.create_cards([card_row(1, expiry_date='01/2030'), card_row(2, expiry_date='06/2031')])
+    assert [card.id for card in storage.get_cards(expires_from='203101')] == [2]
+    assert [card.id for card in storage.get_cards(expires_to='203012')] == [1]
+
+
+def test_version_changes_on_every_write(storage):
+    first_id = storage.create_card(card_row(0)).id
+    initial = storage.get_cards_version()
+    card_id = storage.create_card(card_row(1)).id
+    created = storage.get_cards_version()
+    storage.update_card(card_id, {'card_holder_name': 'Maria Ionescu'})
+    updated = storage.get_cards_version()
+    storage.delete_card(first_id)
+    deleted = storage.get_cards_version()
+    assert len({initial, created, updated, deleted}) == 4
+
+
+def test_changes_after_position(storage):
+    first, second, third = storage.create_cards([card_row(index) for index in range(3)])
+    cards, deletions, horizon = storage.get_changes()
+    assert [card.id for card in cards] == [first, second, third]
+    assert deletions == []
+
+    storage.update_card(first, {'card_holder_name': 'Maria Ionescu'})
+    storage.delete_card(second)
+    cards, deletions, _ = storage.get_changes((horizon, 0))
+    assert [card.id for card in cards] == [first]
+    assert [card_id for card_id, _ in deletions] == [second]
+
+
+def test_backfill_advances_updated_at(storage):
+    card_id = storage.create_card(card_row(1, last4=None, brand=None, card_number_index=None)).id
+    version = storage.get_cards_version()
+    pending = storage.get_cards_to_backfill(0, 10)
+    assert [row['id'] for row in pending] == [card_id]
+
+    updated = storage.update_derived_fields([{
+        'id': card_id, 'last4': '1111', 'brand': 'visa', 'card_number_index': 'index-1',
+        'updated_at': pending[0]['updated_at']
+    }])
+    assert updated == [card_id]
+    card = storage.get_card_by_id(card_id)
+    assert (card.last4, card.brand) == ('1111', 'visa')
+    assert card.updated_at > pending[0]['updated_at']
+    assert storage.get_cards_version() != version
+    assert storage.get_cards_to_backfill(0, 10) == []
+
+
+def test_backfill_skips_rows_changed_meanwhile(storage):
+    card_id = storage.create_card(card_row(1, last4=None, card_number_index=None)).id
+    pending = storage.get_cards_to_backfill(0, 10)
+    storage.update_card(card_id, {'card_holder_name': 'Maria Ionescu'})
+    assert storage.update_derived_fields([{
+        'id': card_id, 'last4': '1111', 'brand': 'visa', 'card_number_index': 'index-1',
+        'updated_at': pending[0]['updated_at']
+    }]) == []
+
+
+def test_reencryption_advances_updated_at(storage):
+    card_id = storage.create_card(card_row(1, key_id='v0')).id
+    version = storage.get_cards_version()
+    pending = storage.get_cards_to_reencrypt(0, 10, 'v1')
+    assert [row['id'] for row in pending] == [card_id]
+
+    updated = storage.update_encrypted_fields([{
+        'id': card_id, 'card_number': 'enc-number-new', 'cvv': 'enc-cvv-new', 'encryption_type': 'sync',
+        'data_key': None, 'key_id': 'v1', 'updated_at': pending[0]['updated_at']
+    }])
+    assert updated == [card_id]
+    card = storage.get_card_by_id(card_id)
+    assert (card.card_number, card.key_id) == ('enc-number-new', 'v1')
+    assert card.updated_at > pending[0]['updated_at']
+    assert storage.get_cards_version() != version
+    cards, _, _ = storage.get_changes((pending[0]['updated_at'], card_id))
+    assert [card.id for card in cards] == [card_id]
+    assert storage.get_cards_to_reencrypt(0, 10, 'v1') == []
+
+
+def test_changes_honour_the_projection(storage):
+    storage.create_card(card_row(1))
+    cards, _, _ = storage.get_changes(columns=['id', 'last4', 'updated_at'])
+    assert (cards[0].last4, cards[0].card_number, cards[0].card_holder_name) == ('1111', None, None)
+    assert cards[0].updated_at is not None
@@ -0,0 +1,27 @@
+import json
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def test_stream_returns_one_line_per_card(client, seed):
+    seed(5)
+    response = client.get('/api/cards?stream=1&batch_size=2')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['ETag']
+    assert [card['id'] for card in ndjson(response)] == [5, 4, 3, 2, 1]
+
+
+def test_stream_negotiated_through_accept(client, seed):
+    seed(2)
+    response = client.get('/api/cards', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert len(ndjson(response)) == 2
+
+
+def test_stream_honours_explicit_limit(client, seed):
+    seed(5)
+    response = client.get('/api/cards?stream=1&limit=3&batch_size=2')
+    assert [card['id'] for card in ndjson(response)] == [5, 4, 3]
@@ -0,0 +1,113 @@
+import pytest
+
+from utils.validators import CardValidator
+
+VALID_CARD = {
+    'card_holder_name': 'Ion Popescu',
+    'card_number': '4111 1111 1111 1111',
+    'expiry_date': '12/2030',
+    'cvv': '123',
+    'card_type': 'credit',
+    'encryption_type': 'sync'
+}
+
+
+@pytest.mark.parametrize('digits, valid', [
+    ('4111111111111111', True),
+    ('5555555555554444', True),
+    ('6011111111111117', True),
+    ('0000000000000000', True),
+    ('4111111111111112', False),
+    ('5555555555554440', False),
+])
+def test_luhn(digits, valid):
+    assert CardValidator.is_valid_luhn(digits) is valid
+
+
+@pytest.mark.parametrize('card_number, brand', [
+    ('4111 1111 1111 1111', 'visa'),
+    ('5555555555554444', 'mastercard'),
+    ('2221000000000009', 'mastercard'),
+    ('2720990000000007', 'mastercard'),
+    ('6011111111111117', 'discover'),
+    ('6445644564456445', 'discover'),
+    ('378282246310005', 'amex'),
+    ('3530111333300000', 'other'),
+])
+def test_detect_brand(card_number, brand):
+    assert CardValidator.detect_brand(card_number) == brand
+
+
+@pytest.mark.parametrize('card_number, message', [
+    ('4111 1111 1111 1111', None),
+    ('4111-1111-1111-1111', 'trebuie să conțină 16 cifre'),
+    ('411111111111111', 'trebuie să conțină 16 cifre'),
+    (4111111111111111, 'trebuie să conțină 16 cifre'),
+    ('4111111111111112', 'cifra de control'),
+    ('3530111333300000', 'nu este acceptată'),
+])
+def test_card_number_error(card_number, message):
+    error = CardValidator.card_number_error(card_number)
+    if message is None:
+        assert error is None
+    else:
+        assert message in error
+
+
+def test_public_fields():
+    assert CardValidator.public_fields('5555 5555 5555 4444') == {'last4': '4444', 'brand': 'mastercard'}
+
+
+@pytest.mark.parametrize('expiry_date, valid', [
+    ('06/2025', True),
+    ('05/2025', False),
+    ('04/2025', False),
+    ('12/2024', False),
+    ('01/2026', True),
+    ('13/2025', False),
+    ('6/2025', False),
+    ('06/25', False),
+    ('06/2025 ', False),
+    (None, False),
+])
+def test_expiry_date(expiry_date, valid):
+    assert CardValidator.is_valid_expiry_date(expiry_date, current_month=(2025, 5)) is valid
+
+
+@pytest.mark.parametrize('cvv, valid', [
+    ('123', True), ('1234', True), ('12', False), ('12345', False), ('12a', False), (123, False)
+])
+def test_cvv(cvv, valid):
+    assert CardValidator.is_valid_cvv(cvv) is valid
+
+
+def test_valid_card_has_no_errors():
+    assert CardValidator.validate_card_data(VALID_CARD) == {}
+
+
+def test_missing_fields_are_reported():
+    assert set(CardValidator.validate_card_data({})) == set(VALID_CARD)
+
+
+def test_partial_update_validates_only_present_fields():
+    assert CardValidator.validate_card_data({'card_holder_name': 'Maria Ionescu'}, partial=True) == {}
+    assert 'card_type' in CardValidator.validate_card_data({'card_type': 'gold'}, partial=True)
+
+
+def test_partial_update_requires_sensitive_fields_together():
+    errors = CardValidator.validate_card_data({'card_number': VALID_CARD['card_number']}, partial=True)
+    assert set(errors) == {'cvv', 'encryption_type'}
+
+
+def test_validate_batch_reports_each_record():
+    records = [VALID_CARD, dict(VALID_CARD, cvv='1'), 'not an object']
+    errors = list(CardValidator.validate_batch(iter(records)))
+    assert errors[0] == {}
+    assert set(errors[1]) == {'cvv'}
+    assert set(errors[2]) == {'record'}
+
+
+def test_create_rejects_invalid_card(client, sample_card):
+    response = client.post('/api/cards', json=dict(sample_card, card_number='4111 1111 1111 1112'))
+    assert response.status_code == 400
+    assert 'card_number' in response.get_json()['details']
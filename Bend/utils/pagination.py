@@ -0,0 +1,33 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+# Format MM/YYYY acceptat pentru filtrele pe data expirării
+EXPIRY_FILTER_PATTERN = re.compile(r'^(0[1-9]|1[0-2])/(\d{4})$')
+
+
+def encode_cursor(created_at, card_id):
+    """Construiește un cursor opac din poziția (created_at, id) a ultimului rând"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, card_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decodează un cursor produs de encode_cursor; ridică ValueError dacă este invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, card_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(card_id)
+    except Exception:
+        raise ValueError("Cursor de paginare invalid")
+
+
+def expiry_to_sort_key(expiry_date):
+    """Transformă MM/YYYY în YYYYMM (forma indexată pentru comparații pe interval)"""
+    match = EXPIRY_FILTER_PATTERN.match(expiry_date or '')
+    if not match:
+        raise ValueError("Data expirării trebuie să fie în formatul MM/YYYY")
+    return match.group(2) + match.group(1)
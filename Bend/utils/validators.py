@@ -1,75 +1,186 @@
 import re
 from datetime import datetime
 
+# Expresiile regulate sunt compilate o singură dată, la importul modulului
+CARD_NUMBER_PATTERN = re.compile(r'[0-9]{16}')
+EXPIRY_DATE_PATTERN = re.compile(r'(0[1-9]|1[0-2])/(20[2-9][0-9])')
+CVV_PATTERN = re.compile(r'[0-9]{3,4}')
+
+CARD_TYPES = frozenset(('credit', 'debit'))
+ENCRYPTION_TYPES = frozenset(('sync', 'async', 'hybrid'))
+# Rețelele ale căror carduri au 16 cifre (American Express are 15)
+ACCEPTED_BRANDS = frozenset(('visa', 'mastercard', 'discover'))
+
+# Algoritmul Luhn pe octeți: cifrele ASCII sunt traduse direct în valoarea lor, respectiv în
+# suma cifrelor dublului lor (ex. 7 -> 14 -> 5), iar sum() rulează în C
+_LUHN_DIGITS = bytes.maketrans(b'0123456789', bytes(range(10)))
+_LUHN_DOUBLED = bytes.maketrans(b'0123456789', bytes((0, 2, 4, 6, 8, 1, 3, 5, 7, 9)))
+_SENSITIVE_FIELDS = ('card_number', 'cvv', 'encryption_type')
+
+
+def _current_month():
+    now = datetime.now()
+    return now.year, now.month
+
+
 class CardValidator:
     @staticmethod
-    def validate_card_data(data):
-        """Validează datele cardului"""
+    def validate_card_data(data, partial=False):
+        """Validează datele cardului
+
+        Cu partial=True (PATCH/PUT) se validează doar câmpurile prezente, dar numărul
+        cardului, CVV-ul și tipul criptării trebuie trimise împreună, fiind criptate
+        cu aceeași cheie.
+        """
+        return CardValidator._validate(data, partial, _current_month())
+
+    @staticmethod
+    def validate_batch(records, partial=False):
+        """Validează un șir de înregistrări (listă, generator, cititor de fișier)
+
+        Este un generator: produce, în ordine, câte un dicționar de erori pentru fiecare
+        înregistrare (gol dacă este validă) și nu păstrează nimic între înregistrări, deci
+        memoria folosită nu depinde de numărul lor. Data curentă este citită o singură dată.
+        """
+        current_month = _current_month()
+        validate = CardValidator._validate
+        for data in records:
+            if not isinstance(data, dict):
+                yield {'record': "Înregistrarea trebuie să fie un obiect JSON"}
+                continue
+            yield validate(data, partial, current_month)
+
+    @staticmethod
+    def _validate(data, partial, current_month):
         errors = {}
-        
+
+        if partial:
+            present = [field for field in _SENSITIVE_FIELDS if field in data]
+            if present and len(present) < len(_SENSITIVE_FIELDS):
+                for field in _SENSITIVE_FIELDS:
+                    if field not in data:
+                        errors[field] = "Numărul cardului, CVV-ul și tipul criptării trebuie trimise împreună"
+
         # Validează numele deținătorului cardului
-        if not data.get('card_holder_name'):
-            errors['card_holder_name'] = "Numele deținătorului cardului este obligatoriu"
-        elif len(data.get('card_holder_name', '')) < 3:
-            errors['card_holder_name'] = "Numele deținătorului trebuie să aibă cel puțin 3 caractere"
-        elif len(data.get('card_holder_name', '')) > 100:
-            errors['card_holder_name'] = "Numele deținătorului nu poate depăși 100 caractere"
-        
+        if not partial or 'card_holder_name' in data:
+            name = data.get('card_holder_name')
+            if not name:
+                errors['card_holder_name'] = "Numele deținătorului cardului este obligatoriu"
+            elif not isinstance(name, str) or len(name) < 3:
+                errors['card_holder_name'] = "Numele deținătorului trebuie să aibă cel puțin 3 caractere"
+            elif len(name) > 100:
+                errors['card_holder_name'] = "Numele deținătorului nu poate depăși 100 caractere"
+
         # Validează numărul cardului
-        if not data.get('card_number'):
-            errors['card_number'] = "Numărul cardului este obligatoriu"
-        elif not CardValidator.is_valid_card_number(data.get('card_number', '')):
-            errors['card_number'] = "Numărul cardului este invalid (trebuie să conțină 16 cifre)"
-        
+        if not partial or 'card_number' in data:
+            card_number = data.get('card_number')
+            if not card_number:
+                errors['card_number'] = "Numărul cardului este obligatoriu"
+            else:
+                error = CardValidator.card_number_error(card_number)
+                if error:
+                    errors['card_number'] = error
+
         # Validează data expirării
-        if not data.get('expiry_date'):
-            errors['expiry_date'] = "Data expirării este obligatorie"
-        elif not CardValidator.is_valid_expiry_date(data.get('expiry_date', '')):
-            errors['expiry_date'] = "Data expirării trebuie să fie în formatul MM/YYYY și să fie în viitor"
-        
+        if not partial or 'expiry_date' in data:
+            expiry_date = data.get('expiry_date')
+            if not expiry_date:
+                errors['expiry_date'] = "Data expirării este obligatorie"
+            elif not CardValidator.is_valid_expiry_date(expiry_date, current_month):
+                errors['expiry_date'] = "Data expirării trebuie să fie în formatul MM/YYYY și să fie în viitor"
+
         # Validează CVV
-        if not data.get('cvv'):
-            errors['cvv'] = "CVV este obligatoriu"
-        elif not CardValidator.is_valid_cvv(data.get('cvv', '')):
-            errors['cvv'] = "CVV trebuie să conțină 3 sau 4 cifre"
-        
+        if not partial or 'cvv' in data:
+            cvv = data.get('cvv')
+            if not cvv:
+                errors['cvv'] = "CVV este obligatoriu"
+            elif not CardValidator.is_valid_cvv(cvv):
+                errors['cvv'] = "CVV trebuie să conțină 3 sau 4 cifre"
+
         # Validează tipul cardului
-        if not data.get('card_type'):
-            errors['card_type'] = "Tipul cardului este obligatoriu"
-        elif data.get('card_type') not in ['credit', 'debit']:
-            errors['card_type'] = "Tipul cardului trebuie să fie credit sau debit"
-        
+        if not partial or 'card_type' in data:
+            card_type = data.get('card_type')
+            if not card_type:
+                errors['card_type'] = "Tipul cardului este obligatoriu"
+            elif not isinstance(card_type, str) or card_type not in CARD_TYPES:
+                errors['card_type'] = "Tipul cardului trebuie să fie credit sau debit"
+
         # Validează tipul criptării
-        if not data.get('encryption_type'):
-            errors['encryption_type'] = "Tipul criptării este obligatoriu"
-        elif data.get('encryption_type') not in ['sync', 'async']:
-            errors['encryption_type'] = "Tipul criptării trebuie să fie sync sau async"
-        
+        if not partial or 'encryption_type' in data:
+            encryption_type = data.get('encryption_type')
+            if not encryption_type:
+                errors['encryption_type'] = "Tipul criptării este obligatoriu"
+            elif not isinstance(encryption_type, str) or encryption_type not in ENCRYPTION_TYPES:
+                errors['encryption_type'] = "Tipul criptării trebuie să fie sync, async sau hybrid"
+
         return errors
-    
+
     @staticmethod
     def is_valid_card_number(card_number):
-        """Validează numărul cardului"""
-        # Elimină spațiile și verifică dacă sunt doar cifre și dacă lungimea este 16
+        """Validează formatul numărului cardului (16 cifre, spațiile sunt ignorate)"""
+        return isinstance(card_number, str) and CARD_NUMBER_PATTERN.fullmatch(card_number.replace(' ', '')) is not None
+
+    @staticmethod
+    def is_valid_luhn(digits):
+        """Verifică cifra de control (algoritmul Luhn) a unui număr format doar din cifre"""
+        encoded = digits.encode('ascii')
+        total = sum(encoded[-1::-2].translate(_LUHN_DIGITS)) + sum(encoded[-2::-2].translate(_LUHN_DOUBLED))
+        return total % 10 == 0
+
+    @staticmethod
+    def card_number_error(card_number):
+        """Mesajul de eroare pentru un număr de card (None dacă este valid)
+
+        Verificările ieftine (format, cifra de control, rețeaua) resping numerele greșite
+        înainte de criptare.
+        """
+        digits = card_number.replace(' ', '') if isinstance(card_number, str) else None
+        if digits is None or CARD_NUMBER_PATTERN.fullmatch(digits) is None:
+            return "Numărul cardului este invalid (trebuie să conțină 16 cifre)"
+        if not CardValidator.is_valid_luhn(digits):
+            return "Numărul cardului este invalid (cifra de control nu corespunde)"
+        if CardValidator.detect_brand(digits) not in ACCEPTED_BRANDS:
+            return "Rețeaua cardului nu este acceptată (Visa, Mastercard sau Discover)"
+        return None
+
+    @staticmethod
+    def detect_brand(card_number):
+        """Determină rețeaua cardului după prefixul numărului (IIN)"""
+        card_number = card_number.replace(' ', '')
+        if card_number.startswith('4'):
+            return 'visa'
+        if card_number[:2] in ('34', '37'):
+            return 'amex'
+        if '51' <= card_number[:2] <= '55' or '2221' <= card_number[:4] <= '2720':
+            return 'mastercard'
+        if card_number.startswith('6011') or card_number.startswith('65') or '644' <= card_number[:3] <= '649':
+            return 'discover'
+        return 'other'
+
+    @staticmethod
+    def public_fields(card_number):
+        """Câmpurile nesecrete derivate din numărul cardului (last4, brand), stocate în clar"""
         card_number = card_number.replace(' ', '')
-        return card_number.isdigit() and len(card_number) == 16
-    
+        return {'last4': card_number[-4:], 'brand': CardValidator.detect_brand(card_number)}
+
     @staticmethod
-    def is_valid_expiry_date(expiry_date):
-        """Validează data expirării cardului"""
+    def is_valid_expiry_date(expiry_date, current_month=None):
+        """Validează data expirării cardului
+
+        current_month este perechea (an, lună) de comparat; implicit luna curentă.
+        """
         # Verifică formatul MM/YYYY
-        if not re.match(r'^(0[1-9]|1[0-2])/20[2-9]\d$', expiry_date):
+        match = EXPIRY_DATE_PATTERN.fullmatch(expiry_date) if isinstance(expiry_date, str) else None
+        if match is None:
             return False
-        
-        # Verifică dacă data este în viitor
-        current_date = datetime.now()
-        month, year = expiry_date.split('/')
-        expiry_date = datetime(int(year), int(month), 1)
-        
-        return expiry_date > current_date
-    
+
+        # Verifică dacă data este în viitor (cardul expiră la începutul lunii indicate)
+        if current_month is None:
+            current_month = _current_month()
+        return (int(match.group(2)), int(match.group(1))) > current_month
+
     @staticmethod
     def is_valid_cvv(cvv):
         """Validează codul CVV"""
         # CVV trebuie să conțină doar cifre și să aibă 3 sau 4 caractere
-        return cvv.isdigit() and (len(cvv) == 3 or len(cvv) == 4)
\ No newline at end of file
+        return isinstance(cvv, str) and CVV_PATTERN.fullmatch(cvv) is not None
@@ -0,0 +1,5 @@
+from app import create_app
+
+# Punctul de intrare WSGI pentru producție: gunicorn -c gunicorn.conf.py wsgi:app
+# Cu preload_app, aplicația (și cheile RSA parsate) este creată o singură dată, în master
+app = create_app()
@@ -7,14 +7,89 @@ const apiClient = axios.create({
     'Content-Type': 'application/json',
     'Accept': 'application/json'
   },
-  timeout: 10000
+  timeout: 10000,
+  // Cookie-ul cu momentul ultimei scrieri: citirile de după o modificare vin de pe primar
+  withCredentials: true
 });
 
+// Modificările se cer periodic (implicit la 5 s); SSE doar cu VITE_CHANGES_SSE=true, pentru că
+// fiecare flux ține ocupat un fir al serverului (vezi Bend/benchmarks/SERVING.md)
+export const CHANGES_SSE = import.meta.env.VITE_CHANGES_SSE === 'true';
+const CHANGES_POLL_INTERVAL = Number(import.meta.env.VITE_CHANGES_POLL_INTERVAL) || 5000;
+
 // Serviciul pentru operațiunile cu carduri
 export default {
-  // Obține toate cardurile
-  getCards() {
-    return apiClient.get('/cards');
+  // Obține o pagină de carduri (limit, after, card_type, encryption_type, expires_from, expires_to,
+  // view=masked|full, fields); implicit lista este mascată (ultimele 4 cifre, fără CVV);
+  // cursorul pentru pagina următoare vine în header-ul X-Next-Cursor;
+  // format=columnar|msgpack cere un corp mai compact (implicit json, array de obiecte)
+  getCards(params = {}) {
+    return apiClient.get('/cards', { params });
+  },
+  
+  // Modificările de la poziția `since` (fără since: toate cardurile, pe pagini):
+  // { changes, deleted, next, has_more }; 410 dacă poziția a expirat (resincronizare)
+  getChanges(since = null, params = {}) {
+    return apiClient.get('/cards/changes', { params: since ? { ...params, since } : params });
+  },
+  
+  // Abonare la modificări prin Server-Sent Events; onChanges primește același corp ca getChanges,
+  // onReset este apelat când poziția a expirat, onClosed când serverul refuză fluxul (SSE
+  // dezactivat, 406) și EventSource renunță la reconectare. Întoarce EventSource-ul (close() la final)
+  subscribeChanges(since, onChanges, onReset, onClosed) {
+    const url = new URL(`${apiClient.defaults.baseURL}/cards/changes`);
+    url.searchParams.set('since', since);
+    const source = new EventSource(url, { withCredentials: true });
+    source.addEventListener('changes', event => onChanges(JSON.parse(event.data)));
+    source.addEventListener('reset', () => {
+      source.close();
+      onReset();
+    });
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED) {
+        onClosed();
+      }
+    });
+    return source;
+  },
+  
+  // Urmărirea modificărilor prin cereri periodice la getChanges; aceleași callback-uri ca
+  // subscribeChanges. Paginile cu has_more sunt cerute imediat. Întoarce un obiect cu close()
+  pollChanges(since, onChanges, onReset, interval = CHANGES_POLL_INTERVAL) {
+    let timer = null;
+    let closed = false;
+    const poll = async () => {
+      let delay = interval;
+      try {
+        const { data } = await apiClient.get('/cards/changes', { params: { since } });
+        if (closed) return;
+        since = data.next;
+        if (data.changes.length || data.deleted.length) {
+          onChanges(data);
+        }
+        if (data.has_more) {
+          delay = 0;
+        }
+      } catch (error) {
+        if (closed) return;
+        if (error.response?.status === 410) {
+          closed = true;
+          onReset();
+          return;
+        }
+        console.error('Eroare la verificarea modificărilor:', error);
+      }
+      if (!closed) {
+        timer = setTimeout(poll, delay);
+      }
+    };
+    timer = setTimeout(poll, interval);
+    return {
+      close() {
+        closed = true;
+        clearTimeout(timer);
+      }
+    };
   },
   
   // Obține un card după ID
@@ -22,6 +97,11 @@ export default {
     return apiClient.get(`/cards/${id}`);
   },
   
+  // Caută cardurile după număr (indexul orb, vederea mascată); numărul se trimite în corp, nu în URL
+  lookupCards(cardNumber) {
+    return apiClient.post('/cards/lookup', { card_number: cardNumber });
+  },
+  
   // Crează un card nou
   createCard(card) {
     return apiClient.post('/cards', card);